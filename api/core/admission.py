@@ -0,0 +1,110 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from api.core.metrics import Counter
+
+
+# Limits are per worker process (multiply by SERVER_WORKERS for the instance)
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "20"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "5"))
+RATE_LIMIT_MAX_USERS = int(os.getenv("RATE_LIMIT_MAX_USERS", "10000"))
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "32"))
+CHAT_OVERLOAD_RETRY_AFTER = int(os.getenv("CHAT_OVERLOAD_RETRY_AFTER", "1"))
+
+ADMISSIONS = Counter(
+    "hajjibot_admission_total",
+    "Admission decisions for chat requests (admitted, rate_limited, overloaded)",
+    ("endpoint", "outcome"),
+)
+
+
+class Rejection:
+    """Why a request was shed and when the client may retry (seconds, for Retry-After)"""
+
+    __slots__ = ("reason", "retry_after")
+
+    def __init__(self, reason: str, retry_after: int):
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Token bucket per email (RATE_LIMIT_PER_MINUTE refill, RATE_LIMIT_BURST capacity)
+    plus a non-blocking global cap on requests doing Mongo/LLM work at once.
+    """
+
+    def __init__(
+        self,
+        per_minute: float = RATE_LIMIT_PER_MINUTE,
+        burst: float = RATE_LIMIT_BURST,
+        max_concurrency: int = CHAT_MAX_CONCURRENCY,
+        max_users: int = RATE_LIMIT_MAX_USERS,
+    ):
+        self.rate = per_minute / 60
+        self.burst = max(burst, 1)
+        self.max_users = max_users
+        # email -> [tokens, last refill (monotonic)], least recently seen first
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency > 0 else None
+
+    def take_token(self, email: str) -> Optional[int]:
+        """Spend one token for this user → None, or seconds until the next token"""
+        if self.rate <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(email)
+            if bucket is None:
+                bucket = self._buckets[email] = [self.burst, now]
+                while len(self._buckets) > self.max_users:
+                    self._buckets.popitem(last=False)
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+                self._buckets.move_to_end(email)
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return None
+            return max(1, math.ceil((1 - bucket[0]) / self.rate))
+
+    def admit(self, email: str, endpoint: str = "chat") -> Optional[Rejection]:
+        """
+        None when admitted (caller must release() when done), otherwise the
+        Rejection to answer with 429. The slot is checked first so an
+        overloaded request does not cost the user a token.
+        """
+        if not self.acquire_slot():
+            ADMISSIONS.inc(endpoint=endpoint, outcome="overloaded")
+            return Rejection("overloaded", CHAT_OVERLOAD_RETRY_AFTER)
+        retry_after = self.take_token(email)
+        if retry_after is not None:
+            self.release()
+            ADMISSIONS.inc(endpoint=endpoint, outcome="rate_limited")
+            return Rejection("rate_limited", retry_after)
+        ADMISSIONS.inc(endpoint=endpoint, outcome="admitted")
+        return None
+
+    def acquire_slot(self) -> bool:
+        return self._slots is None or self._slots.acquire(blocking=False)
+
+    def acquire_slots(self, wanted: int) -> int:
+        """Up to wanted slots without blocking → how many were acquired (release(count) when done)"""
+        acquired = 0
+        while acquired < wanted and self.acquire_slot():
+            acquired += 1
+        return acquired
+
+    def release(self, count: int = 1) -> None:
+        if self._slots is not None:
+            for _ in range(count):
+                self._slots.release()
+
+
+ADMISSION = AdmissionController()
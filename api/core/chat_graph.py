@@ -1,3 +1,4 @@
+import os
 from typing import Optional, TypedDict, Any
 from langgraph.graph import StateGraph, END
 
@@ -8,6 +9,9 @@ from api.handlers.general_handler import _handle_general
 from api.handlers.intent_handler import _detect_intent
 from api.handlers.visa_handler import _handle_visa
 from api.handlers.hotel_handler import _handle_hotel
+from api.handlers.package_handler import _handle_package
+from api.handlers.results_handler import _handle_results
+from api.core.tracing import span, traced
 
 
 class ChatState(TypedDict, total=False):
@@ -26,16 +30,26 @@ class ChatState(TypedDict, total=False):
     flight_context_updated: bool
     hotel_context: Optional[dict]
     hotel_question_index: int
+    package_context: Optional[dict]
+    package_question_index: int
+    result_set: Optional[dict]
+    result_set_updated: bool
+    result_view_updated: bool
+    # () -> cards of the stored result set, read only when a follow-up renders a page
+    load_result_cards: Any
+    search_job: Optional[dict]
     model: Any
 
 def build_chat_graph() -> Any:
     graph = StateGraph(ChatState)
 
-    graph.add_node("detect_intent", _detect_intent)
-    graph.add_node("handle_general", _handle_general)
-    graph.add_node("handle_visa", _handle_visa)
-    graph.add_node("handle_flight", _handle_flight)
-    graph.add_node("handle_hotel", _handle_hotel)
+    graph.add_node("detect_intent", traced("intent", _detect_intent))
+    graph.add_node("handle_general", traced("handle_general", _handle_general))
+    graph.add_node("handle_visa", traced("handle_visa", _handle_visa))
+    graph.add_node("handle_flight", traced("handle_flight", _handle_flight))
+    graph.add_node("handle_hotel", traced("handle_hotel", _handle_hotel))
+    graph.add_node("handle_package", traced("handle_package", _handle_package))
+    graph.add_node("handle_results", traced("handle_results", _handle_results))
 
 
     graph.set_entry_point("detect_intent")
@@ -47,6 +61,8 @@ def build_chat_graph() -> Any:
             "visa": "handle_visa",
             "flight": "handle_flight",
             "hotel": "handle_hotel",
+            "package": "handle_package",
+            "results": "handle_results",
             "general": "handle_general",
         },
     )
@@ -55,8 +71,47 @@ def build_chat_graph() -> Any:
     graph.add_edge("handle_visa", END)
     graph.add_edge("handle_flight", END)
     graph.add_edge("handle_hotel", END)
+    graph.add_edge("handle_package", END)
+    graph.add_edge("handle_results", END)
 
     return graph.compile()
 
 
-CHAT_GRAPH = build_chat_graph()
\ No newline at end of file
+CHAT_GRAPH = build_chat_graph()
+
+
+# Skip graph execution for turns that detect_intent would route unconditionally
+STICKY_FAST_PATH = os.getenv("STICKY_FAST_PATH", "true").lower() in ("1", "true", "yes")
+
+# (state key, intent, handler) — same order as the checks in _detect_intent
+STICKY_DIALOGUES = (
+    ("flight_context", "flight", _handle_flight),
+    ("hotel_context", "hotel", _handle_hotel),
+    ("package_context", "package", _handle_package),
+)
+
+
+# Keys the graph keeps; the fast path drops the rest so both paths see the same state
+_STATE_KEYS = frozenset(ChatState.__annotations__)
+
+
+def _sticky_handler(state: ChatState):
+    for context_key, intent, handler in STICKY_DIALOGUES:
+        if state.get(context_key):
+            return intent, handler
+    return None, None
+
+
+def run_chat_turn(state: ChatState) -> ChatState:
+    """
+    Run one chat turn. An active flight/hotel dialogue always routes to its
+    handler, so call it directly instead of paying for CHAT_GRAPH.invoke.
+    """
+    if STICKY_FAST_PATH:
+        intent, handler = _sticky_handler(state)
+        if handler is not None:
+            state = {key: value for key, value in state.items() if key in _STATE_KEYS}
+            state["intent"] = intent
+            with span(f"handle_{intent}"):
+                return handler(state)
+    return CHAT_GRAPH.invoke(state)
@@ -0,0 +1,144 @@
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from flask import current_app, has_app_context
+
+from api.core.metrics import Counter, Histogram
+
+
+logger = logging.getLogger(__name__)
+
+# Final flight/hotel turns enqueue the upstream search and answer immediately
+SEARCH_JOBS_ENABLED = os.getenv("SEARCH_JOBS_ENABLED", "false").lower() in ("1", "true", "yes")
+SEARCH_JOB_WORKERS = int(os.getenv("SEARCH_JOB_WORKERS", "4"))
+SEARCH_JOB_QUEUE_SIZE = int(os.getenv("SEARCH_JOB_QUEUE_SIZE", "100"))
+SEARCH_JOB_TTL_SECONDS = float(os.getenv("SEARCH_JOB_TTL_SECONDS", "900"))
+SEARCH_JOB_MAX_STORED = int(os.getenv("SEARCH_JOB_MAX_STORED", "1000"))
+
+SEARCH_JOBS_TOTAL = Counter(
+    "hajjibot_search_jobs_total", "Search jobs by kind and outcome", ("kind", "outcome")
+)
+SEARCH_JOB_LATENCY = Histogram(
+    "hajjibot_search_job_seconds", "Time from enqueue to finished search job", ("kind",)
+)
+
+
+class SearchJobs:
+    """
+    Bounded pool of daemon workers fed by a local queue. Jobs and their results
+    live in this process only, so polling must reach the same instance.
+    """
+
+    def __init__(
+        self,
+        workers: int = SEARCH_JOB_WORKERS,
+        max_size: int = SEARCH_JOB_QUEUE_SIZE,
+        ttl_seconds: float = SEARCH_JOB_TTL_SECONDS,
+        max_stored: int = SEARCH_JOB_MAX_STORED,
+    ):
+        self.workers = max(workers, 1)
+        self.ttl_seconds = ttl_seconds
+        self.max_stored = max_stored
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_size)
+        self._jobs: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads: list = []
+        self._pid: Optional[int] = None
+
+    def submit(self, kind: str, fn: Callable[..., str], *args: Any) -> Optional[str]:
+        """Queue fn(*args) → job id, or None when the queue is full (caller runs inline)"""
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "answer": None,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+        app = current_app._get_current_object() if has_app_context() else None
+        self._ensure_workers()
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = job
+        try:
+            self._queue.put_nowait((job, app, fn, args))
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job_id, None)
+            SEARCH_JOBS_TOTAL.inc(kind=kind, outcome="rejected")
+            return None
+        SEARCH_JOBS_TOTAL.inc(kind=kind, outcome="queued")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _ensure_workers(self) -> None:
+        # Threads do not survive fork → start them lazily in each worker process
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._threads = [
+                threading.Thread(target=self._run, name=f"search-job-{idx}", daemon=True)
+                for idx in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._pid = os.getpid()
+
+    def _run(self) -> None:
+        while True:
+            job, app, fn, args = self._queue.get()
+            try:
+                self._execute(job, app, fn, args)
+            finally:
+                self._queue.task_done()
+
+    def _execute(self, job: dict, app, fn: Callable[..., str], args: tuple) -> None:
+        with self._lock:
+            job["status"] = "running"
+        try:
+            if app is not None:
+                with app.app_context():
+                    answer = fn(*args)
+            else:
+                answer = fn(*args)
+            status, error = "done", None
+        except Exception as exc:
+            logger.error("search job failed id=%s kind=%s error=%s", job["id"], job["kind"], exc)
+            answer, status, error = None, "failed", str(exc)
+
+        with self._lock:
+            job["answer"] = answer
+            job["status"] = status
+            job["error"] = error
+            job["finished_at"] = time.time()
+        SEARCH_JOBS_TOTAL.inc(kind=job["kind"], outcome=status)
+        SEARCH_JOB_LATENCY.observe(job["finished_at"] - job["created_at"], kind=job["kind"])
+
+    def _prune(self) -> None:
+        # Finished jobs only, oldest first: expired ones, then any over the size bound.
+        # Queued and running jobs stay (the queue bounds them) so pollers never get a 404.
+        cutoff = time.time() - self.ttl_seconds
+        finished = [job_id for job_id, job in self._jobs.items() if job["finished_at"] is not None]
+        for job_id in finished:
+            if self._jobs[job_id]["finished_at"] < cutoff or len(self._jobs) >= self.max_stored:
+                del self._jobs[job_id]
+
+
+SEARCH_JOBS = SearchJobs()
@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+import random
+import re
+from typing import Any
+
+from flask import current_app, has_app_context
+
+
+# Large request/response payloads are only serialized when this is enabled
+LOG_PAYLOADS = os.getenv("LOG_PAYLOADS", "false").lower() in ("1", "true", "yes")
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "500"))
+LOG_MAX_PAYLOAD_CHARS = int(os.getenv("LOG_MAX_PAYLOAD_CHARS", "4000"))
+
+
+def _parse_sample_rates(raw: str) -> dict[str, float]:
+    """'flight_state=0.1,hotel_state=0.1' → {"flight_state": 0.1, ...}"""
+    rates = {}
+    for part in raw.split(","):
+        if "=" not in part:
+            continue
+        event, _, rate = part.partition("=")
+        try:
+            rates[event.strip()] = max(0.0, min(1.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+# Per-event sampling; events not listed are always logged
+LOG_SAMPLE_RATES = _parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", ""))
+
+_REDACTED_KEYS = {"password", "username", "token", "authorization", "api_key", "apikey", "secret"}
+# Never serialized: live objects that are useless (and huge) in a log line
+_DROPPED_KEYS = {"model"}
+_EMAIL_RE = re.compile(r"([A-Za-z0-9._%+-])[A-Za-z0-9._%+-]*@([A-Za-z0-9.-]+\.[A-Za-z]{2,})")
+
+
+def _mask_emails(text: str) -> str:
+    return _EMAIL_RE.sub(r"\1***@\2", text)
+
+
+def _redact(value: Any) -> Any:
+    if isinstance(value, dict):
+        redacted = {}
+        for key, item in value.items():
+            lowered = str(key).lower()
+            if lowered in _DROPPED_KEYS:
+                continue
+            if lowered in _REDACTED_KEYS or lowered.endswith("password"):
+                redacted[key] = "***"
+            else:
+                redacted[key] = _redact(item)
+        return redacted
+    if isinstance(value, (list, tuple)):
+        return [_redact(item) for item in value]
+    if isinstance(value, str):
+        return _mask_emails(value)
+    return value
+
+
+def _truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}…(+{len(text) - limit} chars)"
+
+
+class _LazyFields:
+    """key=value rendering deferred until the handler actually formats the record"""
+
+    __slots__ = ("fields", "limit")
+
+    def __init__(self, fields: dict, limit: int):
+        self.fields = fields
+        self.limit = limit
+
+    def __str__(self) -> str:
+        parts = []
+        for key, value in _redact(self.fields).items():
+            if isinstance(value, (dict, list)):
+                text = json.dumps(value, default=str, separators=(",", ":"))
+            else:
+                text = str(value)
+            parts.append(f"{key}={_truncate(text, self.limit)}")
+        return " ".join(parts)
+
+
+def _logger() -> logging.Logger:
+    return current_app.logger if has_app_context() else logging.getLogger("api")
+
+
+def _sampled(event: str) -> bool:
+    rate = LOG_SAMPLE_RATES.get(event, 1.0)
+    return rate >= 1.0 or random.random() < rate
+
+
+def log_event(event: str, level: int = logging.INFO, **fields) -> None:
+    """
+    Structured, sampled log line: 'event=<name> key=value ...'.
+
+    Values are redacted (credentials, emails), size-capped and only serialized
+    if the record is emitted.
+    """
+    logger = _logger()
+    if not logger.isEnabledFor(level) or not _sampled(event):
+        return
+    logger.log(level, "event=%s %s", event, _LazyFields(fields, LOG_MAX_FIELD_CHARS))
+
+
+def log_payload(event: str, payload: Any, level: int = logging.INFO, **fields) -> None:
+    """Full request/response bodies; free unless LOG_PAYLOADS is enabled"""
+    if not LOG_PAYLOADS:
+        return
+    logger = _logger()
+    if not logger.isEnabledFor(level) or not _sampled(event):
+        return
+    logger.log(
+        level,
+        "event=%s %s",
+        event,
+        _LazyFields({**fields, "payload": payload}, LOG_MAX_PAYLOAD_CHARS),
+    )
@@ -0,0 +1,81 @@
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable
+
+from flask import g, has_request_context
+
+from api.core.metrics import Counter, Histogram
+
+
+STAGE_LATENCY = Histogram(
+    "hajjibot_stage_latency_seconds",
+    "Latency of request stages (mongo, intent, handlers, upstream APIs, LLM)",
+    ("stage",),
+)
+REQUEST_LATENCY = Histogram(
+    "hajjibot_request_latency_seconds", "End-to-end request latency", ("endpoint", "status")
+)
+REQUESTS = Counter("hajjibot_requests_total", "Requests served", ("endpoint", "status"))
+
+
+@contextmanager
+def span(name: str):
+    """Time a stage: always feeds the stage histogram, and Server-Timing when inside a request"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_LATENCY.observe(duration, stage=name)
+        if has_request_context():
+            spans = g.get("spans")
+            if spans is None:
+                spans = g.spans = []
+            spans.append((name, duration))
+
+
+def traced(name: str, fn: Callable) -> Callable:
+    """Wrap a graph node / handler so each call is recorded as a span"""
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with span(name):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def start_request() -> None:
+    g.request_started_at = time.perf_counter()
+    g.spans = []
+
+
+def server_timing_header(total: float) -> str:
+    """'mongo_read;dur=3.1, llm;dur=812.4;desc="2 calls", total;dur=830.0'"""
+    totals: dict[str, list] = {}
+    for name, duration in g.get("spans") or []:
+        entry = totals.setdefault(name, [0.0, 0])
+        entry[0] += duration
+        entry[1] += 1
+
+    parts = []
+    for name, (duration, calls) in totals.items():
+        part = f"{name};dur={duration * 1000:.1f}"
+        if calls > 1:
+            part += f';desc="{calls} calls"'
+        parts.append(part)
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def finish_request(response, endpoint: str):
+    started_at = g.get("request_started_at")
+    if started_at is None:
+        return response
+    total = time.perf_counter() - started_at
+    status = str(response.status_code)
+    REQUEST_LATENCY.observe(total, endpoint=endpoint, status=status)
+    REQUESTS.inc(endpoint=endpoint, status=status)
+    response.headers["Server-Timing"] = server_timing_header(total)
+    return response
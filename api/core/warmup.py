@@ -0,0 +1,82 @@
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Kick off warm_up() in a background thread when the app is imported
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+
+_warmup_lock = threading.Lock()
+_warm_stages: set = set()
+
+
+def preload_static_data() -> None:
+    """Load every static dataset and index (airport + hotel city lookups) in this process"""
+    import api.data.airports  # noqa: F401 — airports.json + AIRPORT_LOOKUP built at import
+    from api.data.hotel_city_resolver import load_hotel_cities
+
+    load_hotel_cities()
+
+
+def _warm_mongo() -> None:
+    from api.db.mongo import init_mongo
+
+    collection, ready, error = init_mongo()
+    if not ready:
+        raise RuntimeError(str(error))
+    # Open the first pooled connection so the first chat turn does not pay for it
+    collection.database.client.admin.command("ping")
+
+
+def _warm_http() -> None:
+    from api.helpers.http_helpers import get_http_session
+
+    get_http_session()
+
+
+def warm_up(gemini_model_name: Optional[str] = None) -> dict:
+    """
+    Preload datasets and process-wide clients; idempotent and safe to call from
+    concurrent requests. Returns per-stage timings (ms) and errors.
+    """
+    stages = [
+        ("static_data", preload_static_data),
+        ("http_pool", _warm_http),
+        ("mongo", _warm_mongo),
+    ]
+    if gemini_model_name:
+        from api.helpers.llm_helpers import get_gemini_model
+
+        stages.append(("gemini", lambda: get_gemini_model(gemini_model_name)))
+
+    timings = {}
+    errors = {}
+    with _warmup_lock:
+        for name, fn in stages:
+            if name in _warm_stages:
+                timings[name] = 0.0
+                continue
+            start = time.perf_counter()
+            try:
+                fn()
+                _warm_stages.add(name)
+            except Exception as exc:
+                # Retried on the next warmup call (e.g. Mongo still unreachable)
+                errors[name] = str(exc)
+            timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    return {"stages_ms": timings, "errors": errors}
+
+
+def start_background_warmup(gemini_model_name: Optional[str] = None) -> threading.Thread:
+    def run():
+        result = warm_up(gemini_model_name)
+        logger.info("background warmup done stages_ms=%s errors=%s", result["stages_ms"], result["errors"])
+
+    thread = threading.Thread(target=run, name="warmup", daemon=True)
+    thread.start()
+    return thread
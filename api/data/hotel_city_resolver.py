@@ -1,10 +1,12 @@
 # api/helpers/hotel_city_resolver.py
 
 import csv
+import threading
 from pathlib import Path
 from difflib import get_close_matches
 
 CITY_LOOKUP = {}
+_CITY_LOOKUP_LOCK = threading.Lock()
 
 CITY_ALIASES = {
     "mecca": "makkah",
@@ -17,21 +19,32 @@ CSV_PATH = Path(__file__).parent.parent / "data" / "hotel_city_list.csv"
 
 
 def load_hotel_cities():
+    """
+    Parse the hotel city CSV once per process. The lookup is built privately and
+    published in one assignment, so concurrent readers never see a partial table.
+    """
     global CITY_LOOKUP
     if CITY_LOOKUP:
         return
 
-    with open(CSV_PATH, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            city_name = row["destination"].strip().lower()
-            city_id = int(row["city_id"])
-            country_code = row["country_code"].strip().upper()
-
-            CITY_LOOKUP[city_name] = {
-                "city_id": city_id,
-                "country_code": country_code,
-            }
+    with _CITY_LOOKUP_LOCK:
+        if CITY_LOOKUP:
+            return
+
+        lookup = {}
+        with open(CSV_PATH, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                city_name = row["destination"].strip().lower()
+                city_id = int(row["city_id"])
+                country_code = row["country_code"].strip().upper()
+
+                lookup[city_name] = {
+                    "city_id": city_id,
+                    "country_code": country_code,
+                }
+
+        CITY_LOOKUP = lookup
 
 
 def resolve_hotel_city(city_name: str):
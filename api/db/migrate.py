@@ -0,0 +1,31 @@
+# One-time schema provisioning, run on deploy instead of on every cold start:
+#   python -m api.db.migrate
+
+import sys
+
+from dotenv import load_dotenv
+
+from api.db.mongo import init_mongo
+
+
+def migrate() -> None:
+    collection, ready, error = init_mongo()
+    if not ready:
+        raise RuntimeError(f"MongoDB is not configured or unreachable: {error}")
+
+    collection.create_index("email", unique=True)
+
+
+def main() -> int:
+    load_dotenv()
+    try:
+        migrate()
+    except Exception as exc:
+        print(f"migration failed: {exc}", file=sys.stderr)
+        return 1
+    print("migration complete: users.email unique index ensured")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,134 @@
 from pymongo import MongoClient
+import logging
 import os
+import threading
+import time
 
-def init_mongo():
-    mongo_uri = os.getenv("MONGO_URI")
-    mongo_db = os.getenv("MONGO_DB", "marhaba")
-    mongo_collection = os.getenv("MONGO_COLLECTION", "users")
 
-    if not mongo_uri:
-        return None, False, "MONGO_URI not set"
+# Pool tuning: serverless instances handle one request at a time, so keep the
+# pool small and let idle sockets close before the instance is frozen.
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "10"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "3000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "3000"))
+# After a failed client creation, wait this long before trying again
+MONGO_RETRY_COOLDOWN_SECONDS = float(os.getenv("MONGO_RETRY_COOLDOWN_SECONDS", "5"))
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_pid = None
+_collection = None
+_last_error = None
+_last_failure_at = 0.0
+_lock = threading.Lock()
+# pid whose collection has the unique users.email index, and when a missing index was last seen
+_email_index_pid = None
+_email_index_missing_at = None
+
+EMAIL_INDEX_MISSING = "users.email unique index is missing; run python -m api.db.migrate"
+
+
+def _mongo_settings():
+    return (
+        os.getenv("MONGO_URI"),
+        os.getenv("MONGO_DB", "marhaba"),
+        os.getenv("MONGO_COLLECTION", "users"),
+    )
+
+
+def get_users_collection():
+    """
+    Process-wide users collection, created lazily on first use.
+
+    Returns None while Mongo is unavailable; a failed creation is retried after
+    MONGO_RETRY_COOLDOWN_SECONDS instead of being frozen for the life of the
+    instance. A forked worker gets its own client (MongoClient is not fork-safe).
+    """
+    global _client, _client_pid, _collection, _last_error, _last_failure_at
+
+    if _collection is not None and _client_pid == os.getpid():
+        return _collection
+
+    with _lock:
+        if _collection is not None and _client_pid == os.getpid():
+            return _collection
+
+        mongo_uri, mongo_db, mongo_collection = _mongo_settings()
+        if not mongo_uri:
+            _last_error = "MONGO_URI not set"
+            return None
+
+        if _last_error is not None and time.monotonic() - _last_failure_at < MONGO_RETRY_COOLDOWN_SECONDS:
+            return None
+
+        try:
+            _client = MongoClient(
+                mongo_uri,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                retryWrites=True,
+                retryReads=True,
+            )
+            _client_pid = os.getpid()
+            _collection = _client[mongo_db][mongo_collection]
+            _last_error = None
+            return _collection
+        except Exception as exc:
+            _client = None
+            _collection = None
+            _last_error = exc
+            _last_failure_at = time.monotonic()
+            return None
+
+
+def users_email_index_ready(collection) -> bool:
+    """
+    Whether users.email has the unique index the versioned upserts rely on:
+    without it a lost version check inserts a duplicate user instead of
+    raising a duplicate-key error. Checked once per process; a missing index
+    is looked up again after MONGO_RETRY_COOLDOWN_SECONDS.
+    """
+    global _email_index_pid, _email_index_missing_at
+
+    if _email_index_pid == os.getpid():
+        return True
+    if _email_index_missing_at is not None and time.monotonic() - _email_index_missing_at < MONGO_RETRY_COOLDOWN_SECONDS:
+        return False
 
     try:
-        client = MongoClient(mongo_uri, serverSelectionTimeoutMS=3000)
-        collection = client[mongo_db][mongo_collection]
-        collection.create_index("email", unique=True)
-        return collection, True, None
-    except Exception as exc:
-        return None, False, exc
+        indexes = collection.index_information()
+    except Exception:
+        _email_index_missing_at = time.monotonic()
+        return False
+    ready = any(
+        index.get("unique") and [field for field, _ in index.get("key", [])] == ["email"]
+        for index in indexes.values()
+    )
+    if ready:
+        _email_index_pid = os.getpid()
+        _email_index_missing_at = None
+    else:
+        _email_index_missing_at = time.monotonic()
+        logger.error(EMAIL_INDEX_MISSING)
+    return ready
+
+
+def get_writable_users_collection():
+    """users collection for the persistence queue, or None while the unique email index is missing"""
+    collection = get_users_collection()
+    if collection is None or not users_email_index_ready(collection):
+        return None
+    return collection
+
+
+def init_mongo():
+    """(collection, ready, error) for the lazily created client; cheap to call per request"""
+    collection = get_users_collection()
+    if collection is None:
+        return None, False, _last_error
+    return collection, True, None
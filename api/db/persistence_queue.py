@@ -0,0 +1,265 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from pymongo import errors
+
+from api.core.metrics import Counter
+from api.core.tracing import span
+
+
+logger = logging.getLogger(__name__)
+
+PERSISTENCE_QUEUE_SIZE = int(os.getenv("PERSISTENCE_QUEUE_SIZE", "10000"))
+PERSISTENCE_BATCH_SIZE = int(os.getenv("PERSISTENCE_BATCH_SIZE", "200"))
+PERSISTENCE_LINGER_MS = float(os.getenv("PERSISTENCE_LINGER_MS", "20"))
+PERSISTENCE_MAX_RETRIES = int(os.getenv("PERSISTENCE_MAX_RETRIES", "3"))
+PERSISTENCE_SHUTDOWN_TIMEOUT = float(os.getenv("PERSISTENCE_SHUTDOWN_TIMEOUT", "5"))
+# How long enqueue blocks on a full queue before the write is given up (and re-staged by its owner)
+PERSISTENCE_ENQUEUE_TIMEOUT = float(os.getenv("PERSISTENCE_ENQUEUE_TIMEOUT", "2"))
+# How long write_now waits for its writes to be settled by the worker
+PERSISTENCE_WRITE_NOW_TIMEOUT = float(os.getenv("PERSISTENCE_WRITE_NOW_TIMEOUT", "10"))
+
+PERSISTENCE_WRITES = Counter(
+    "hajjibot_persistence_writes_total", "Background Mongo writes by outcome", ("outcome",)
+)
+PERSISTENCE_BATCHES = Counter(
+    "hajjibot_persistence_batches_total", "bulk_write calls issued by the persistence queue", ("outcome",)
+)
+
+
+class QueuedWrite:
+    """One pymongo write model plus optional handlers for conflicts and the final outcome"""
+
+    __slots__ = ("request", "on_conflict", "on_done", "key")
+
+    def __init__(
+        self,
+        request: Any,
+        on_conflict: Optional[Callable[[], Any]] = None,
+        on_done: Optional[Callable[[bool], None]] = None,
+        key: Any = None,
+    ):
+        self.request = request
+        # Owner of the write (the user's email), reported back when it is given up
+        self.key = key
+        # Returns the replacement write model when the versioned upsert hits another writer
+        self.on_conflict = on_conflict
+        # Called once with True when written, False when the write was given up
+        self.on_done = on_done
+
+    def settle(self, ok: bool) -> None:
+        on_done, self.on_done = self.on_done, None
+        if on_done is None:
+            return
+        try:
+            on_done(ok)
+        except Exception as exc:
+            logger.error("persistence_queue on_done failed error=%s", exc)
+
+
+class PersistenceQueue:
+    """
+    Bounded in-process queue of non-critical Mongo writes.
+
+    A single daemon worker drains it in ordered bulk_write batches. Every write
+    goes through it (write_now only waits for the outcome), so writes of one
+    user reach Mongo in the order they were taken. Transient failures are
+    retried with backoff and the queue is flushed at interpreter shutdown.
+    """
+
+    def __init__(
+        self,
+        collection_getter: Optional[Callable[[], Any]] = None,
+        max_size: int = PERSISTENCE_QUEUE_SIZE,
+        batch_size: int = PERSISTENCE_BATCH_SIZE,
+        linger_ms: float = PERSISTENCE_LINGER_MS,
+        max_retries: int = PERSISTENCE_MAX_RETRIES,
+    ):
+        self._collection_getter = collection_getter
+        self._queue: "queue.Queue[QueuedWrite]" = queue.Queue(maxsize=max_size)
+        self.batch_size = batch_size
+        self.linger = linger_ms / 1000
+        self.max_retries = max_retries
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+    def configure(self, collection_getter: Callable[[], Any]) -> None:
+        self._collection_getter = collection_getter
+
+    def enqueue(self, item: Optional[QueuedWrite], timeout: float = PERSISTENCE_ENQUEUE_TIMEOUT) -> None:
+        if item is None:
+            return
+        self._ensure_worker()
+        try:
+            # Back-pressure: block for a while rather than write inline, which
+            # could overtake an earlier queued write of the same user
+            self._queue.put(item, timeout=timeout)
+            PERSISTENCE_WRITES.inc(outcome="enqueued")
+        except queue.Full:
+            logger.warning("persistence_queue full size=%s → write given up", self._queue.maxsize)
+            PERSISTENCE_WRITES.inc(outcome="rejected")
+            item.settle(ok=False)
+
+    def write_now(self, items: list, timeout: float = PERSISTENCE_WRITE_NOW_TIMEOUT) -> list:
+        """
+        Queue the writes behind any earlier ones and block until the worker has
+        settled them (batch endpoints) → keys of the writes given up or not
+        settled within the timeout
+        """
+        tracked = [(item, _track(item)) for item in items if item is not None]
+        for item, _ in tracked:
+            self.enqueue(item)
+
+        deadline = time.monotonic() + timeout
+        failed = []
+        for item, (settled, outcome) in tracked:
+            if not settled.wait(max(deadline - time.monotonic(), 0)) or not outcome[0]:
+                failed.append(item.key)
+        return failed
+
+    def flush(self, timeout: float = PERSISTENCE_SHUTDOWN_TIMEOUT) -> bool:
+        """Block until every queued write has been attempted (or timeout)"""
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(
+                        "persistence_queue flush timed out pending=%s", self._queue.unfinished_tasks
+                    )
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="persistence-queue", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(
+                        self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    )
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            except Exception as exc:
+                logger.error("persistence_queue batch dropped size=%s error=%s", len(batch), exc)
+                _settle(batch, ok=False)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch: list) -> list:
+        collection = self._collection_getter() if self._collection_getter else None
+        if collection is None:
+            PERSISTENCE_WRITES.inc(len(batch), outcome="dropped")
+            logger.error("persistence_queue no collection available, dropped=%s", len(batch))
+            _settle(batch, ok=False)
+            return batch
+        return _bulk_write_with_conflicts(collection, batch, self.max_retries)
+
+
+def _track(item: QueuedWrite) -> tuple:
+    """Wrap the item's on_done → (event set once settled, [ok] after that)"""
+    settled, outcome = threading.Event(), []
+    on_done = item.on_done
+
+    def done(ok: bool) -> None:
+        outcome.append(ok)
+        try:
+            if on_done is not None:
+                on_done(ok)
+        finally:
+            settled.set()
+
+    item.on_done = done
+    return settled, outcome
+
+
+def _settle(items: list, ok: bool) -> None:
+    for item in items:
+        item.settle(ok)
+
+
+def _bulk_write_with_conflicts(collection: Any, batch: list, max_retries: int = PERSISTENCE_MAX_RETRIES) -> list:
+    """
+    Ordered bulk_write of QueuedWrite items.
+
+    A duplicate-key error on an item with on_conflict (versioned upsert that lost
+    to another writer) is replaced by its fallback write and the rest of the batch
+    resubmitted; transient errors are retried with exponential backoff. Every
+    item is settled with its outcome, so owners can re-stage what was given up.
+    Returns the items given up.
+    """
+    pending = list(batch)
+    failed_items = []
+    attempt = 0
+    while pending:
+        try:
+            with span("mongo_bulk_write"):
+                collection.bulk_write([item.request for item in pending], ordered=True)
+            PERSISTENCE_BATCHES.inc(outcome="ok")
+            PERSISTENCE_WRITES.inc(len(pending), outcome="written")
+            _settle(pending, ok=True)
+            return failed_items
+        except errors.BulkWriteError as exc:
+            write_errors = exc.details.get("writeErrors", [])
+            if not write_errors:
+                raise
+            failed = write_errors[0]
+            idx = failed["index"]
+            item = pending[idx]
+            PERSISTENCE_WRITES.inc(idx, outcome="written")
+            _settle(pending[:idx], ok=True)
+
+            if failed.get("code") == 11000 and item.on_conflict is not None:
+                PERSISTENCE_WRITES.inc(outcome="conflict")
+                replacement = QueuedWrite(item.on_conflict(), on_done=item.on_done, key=item.key)
+                pending = [replacement] + pending[idx + 1:]
+            else:
+                PERSISTENCE_WRITES.inc(outcome="failed")
+                logger.error("persistence_queue write failed error=%s", failed.get("errmsg"))
+                item.settle(ok=False)
+                failed_items.append(item)
+                pending = pending[idx + 1:]
+        except (errors.AutoReconnect, errors.ConnectionFailure, errors.ExecutionTimeout) as exc:
+            attempt += 1
+            if attempt > max_retries:
+                PERSISTENCE_BATCHES.inc(outcome="failed")
+                PERSISTENCE_WRITES.inc(len(pending), outcome="failed")
+                logger.error(
+                    "persistence_queue giving up after %s attempts size=%s error=%s",
+                    attempt,
+                    len(pending),
+                    exc,
+                )
+                _settle(pending, ok=False)
+                return failed_items + pending
+            PERSISTENCE_BATCHES.inc(outcome="retry")
+            time.sleep(min(0.1 * 2 ** (attempt - 1), 2.0))
+    return failed_items
+
+
+PERSISTENCE_QUEUE = PersistenceQueue()
+atexit.register(PERSISTENCE_QUEUE.flush)
@@ -0,0 +1,344 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from pymongo import UpdateOne
+
+from api.db.persistence_queue import QueuedWrite
+
+
+logger = logging.getLogger(__name__)
+
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "2048"))
+SESSION_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "300"))
+# Clean entries older than this are checked against the state_version in Mongo before use
+SESSION_CACHE_REVALIDATE_SECONDS = float(os.getenv("SESSION_CACHE_REVALIDATE_SECONDS", "30"))
+HISTORY_LIMIT = 5
+
+# Conversation fields cached per user (the same projection chat() reads from Mongo)
+SESSION_FIELDS = ("history", "visa_context", "flight_context", "hotel_context", "package_context", "result_set")
+# Rendered cards of the last result set: kept out of the per-turn projection and
+# read (then cached) only when a follow-up renders a page
+RESULT_CARDS_FIELD = "result_cards"
+LAZY_FIELDS = (RESULT_CARDS_FIELD,)
+
+
+def _copy_state(state: dict) -> dict:
+    """Copy one level deep so handlers mutating contexts never touch the cached object"""
+    copied = {}
+    for key, value in state.items():
+        if isinstance(value, dict):
+            copied[key] = dict(value)
+        elif isinstance(value, list):
+            copied[key] = list(value)
+        else:
+            copied[key] = value
+    return copied
+
+
+def _set_path(document: dict, field: str, value) -> None:
+    """$set of "field" or one-level dotted "field.key" on a plain dict (the parent is copied, not mutated)"""
+    parent, _, child = field.partition(".")
+    if not child:
+        document[parent] = value
+    elif isinstance(document.get(parent), dict):
+        document[parent] = {**document[parent], child: value}
+
+
+def _is_cached_field(field: str) -> bool:
+    root = field.partition(".")[0]
+    return root in SESSION_FIELDS or root in LAZY_FIELDS
+
+
+def _stage_set(pending: dict, field: str, value) -> None:
+    """Add a $set to the pending update without ever sending both "a" and "a.b" (Mongo path conflict)"""
+    parent, _, child = field.partition(".")
+    if child and parent in pending["set"]:
+        # Parent already replaced in this flush → fold the change into it
+        if isinstance(pending["set"][parent], dict):
+            pending["set"][parent] = {**pending["set"][parent], child: value}
+        return
+    for key in [key for key in pending["set"] if key.startswith(f"{field}.")]:
+        del pending["set"][key]
+    pending["set"][field] = value
+    pending["unset"].discard(field)
+
+
+def _version_filter(version: int):
+    # Documents written before version stamps existed have no state_version field
+    return {"$in": [None, 0]} if not version else version
+
+
+def _empty_pending() -> dict:
+    return {"set": {}, "unset": set(), "push": [], "set_on_insert": {}}
+
+
+def _new_entry(state: dict, version: int) -> dict:
+    now = time.monotonic()
+    return {
+        "state": state,
+        "version": version,
+        "loaded_at": now,
+        "checked_at": now,
+        "pending": None,
+        "base_version": version,
+        # Writes handed to the persistence queue and not settled yet
+        "in_flight": 0,
+        # Another instance wrote in between → reload from Mongo before serving again
+        "stale": False,
+    }
+
+
+def _is_clean(entry: dict) -> bool:
+    return entry["pending"] is None and not entry["in_flight"]
+
+
+def _apply_pending(state: dict, pending: dict) -> None:
+    """Replay staged, unflushed changes on top of a freshly loaded state"""
+    for field, value in pending["set"].items():
+        if _is_cached_field(field):
+            _set_path(state, field, value)
+    for field in pending["unset"]:
+        state[field] = None
+    if pending["push"]:
+        state["history"] = ((state.get("history") or []) + list(pending["push"]))[-HISTORY_LIMIT:]
+
+
+class SessionCache:
+    """
+    Bounded LRU of per-user conversation state with coalesced write-behind.
+
+    Each entry carries the state_version last written to (or read from) Mongo.
+    Queued writes are conditional on that version, so a write from another
+    instance is detected and the entry reloaded instead of being served again;
+    changes staged in the meantime are replayed on top of the reloaded state.
+    A write the queue gives up on is re-staged, so the entry stays dirty until
+    a later flush succeeds.
+    """
+
+    def __init__(self, max_size: int = SESSION_CACHE_SIZE, ttl_seconds: float = SESSION_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, email: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None or entry["stale"]:
+                return None
+            if time.monotonic() - entry["loaded_at"] > self.ttl_seconds and _is_clean(entry):
+                del self._entries[email]
+                return None
+            self._entries.move_to_end(email)
+            return _copy_state({field: entry["state"].get(field) for field in SESSION_FIELDS})
+
+    def get_lazy(self, email: str, field: str) -> tuple:
+        """(found, value) for a LAZY_FIELDS field; found is False until it was staged or loaded"""
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None or entry["stale"] or field not in entry["state"]:
+                return False, None
+            return True, entry["state"][field]
+
+    def put_lazy(self, email: str, field: str, value) -> None:
+        """Remember a LAZY_FIELDS value read from Mongo, unless a newer one was staged meanwhile"""
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is not None and not entry["stale"]:
+                entry["state"].setdefault(field, value)
+
+    def put(self, email: str, state: dict, version: int = 0) -> None:
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is not None and entry["pending"] and not entry["stale"]:
+                # Never overwrite state that has not been flushed yet
+                return
+            replacement = self._entries[email] = _new_entry(
+                _copy_state({field: state.get(field) for field in SESSION_FIELDS}), version or 0
+            )
+            if entry is not None:
+                replacement["in_flight"] = entry["in_flight"]
+                if entry["pending"]:
+                    # Reloaded after a conflict: keep the turns staged since then
+                    _apply_pending(replacement["state"], entry["pending"])
+                    replacement["pending"] = entry["pending"]
+            self._entries.move_to_end(email)
+            self._evict()
+
+    def invalidate(self, email: str) -> None:
+        with self._lock:
+            self._entries.pop(email, None)
+
+    def mark_stale(self, email: str) -> None:
+        """Stop serving the cached state without losing changes staged since the conflicting write"""
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is not None:
+                entry["stale"] = True
+
+    def versions_to_check(self, emails: list) -> dict:
+        """email → cached version for clean entries not checked in SESSION_CACHE_REVALIDATE_SECONDS"""
+        now = time.monotonic()
+        with self._lock:
+            due = {}
+            for email in emails:
+                entry = self._entries.get(email)
+                if entry is not None and _is_clean(entry) and now - entry["checked_at"] > SESSION_CACHE_REVALIDATE_SECONDS:
+                    due[email] = entry["version"]
+            return due
+
+    def confirm_version(self, email: str, version: int) -> None:
+        """Drop a clean entry another instance has written past; otherwise mark it checked"""
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None:
+                return
+            if _is_clean(entry) and entry["version"] != (version or 0):
+                del self._entries[email]
+                return
+            entry["checked_at"] = time.monotonic()
+
+    def dirty_emails(self) -> list:
+        with self._lock:
+            return [email for email, entry in self._entries.items() if entry["pending"] is not None]
+
+    def stage(
+        self,
+        email: str,
+        set_fields: Optional[dict] = None,
+        unset_fields: tuple = (),
+        history_entries: Optional[list] = None,
+        set_on_insert: Optional[dict] = None,
+    ) -> None:
+        """Apply a turn's writes to the cached state now and queue them for the next flush"""
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None:
+                entry = self._entries[email] = _new_entry({field: None for field in SESSION_FIELDS}, 0)
+            self._entries.move_to_end(email)
+
+            if entry["pending"] is None:
+                entry["pending"] = _empty_pending()
+                entry["base_version"] = entry["version"]
+            pending = entry["pending"]
+            state = entry["state"]
+
+            for field, value in (set_fields or {}).items():
+                _stage_set(pending, field, value)
+                if _is_cached_field(field):
+                    _set_path(state, field, value)
+
+            for field in unset_fields:
+                # A lazy field that was never loaded may still be in Mongo → always unset it
+                if field in state and state[field] is None and field not in pending["set"]:
+                    continue  # already absent in Mongo → nothing to unset
+                for key in [key for key in pending["set"] if key == field or key.startswith(f"{field}.")]:
+                    del pending["set"][key]
+                pending["unset"].add(field)
+                state[field] = None
+
+            if history_entries:
+                pending["push"].extend(history_entries)
+                pending["push"] = pending["push"][-HISTORY_LIMIT:]
+                state["history"] = ((state.get("history") or []) + list(history_entries))[-HISTORY_LIMIT:]
+
+            for field, value in (set_on_insert or {}).items():
+                pending["set_on_insert"].setdefault(field, value)
+
+            self._evict()
+
+    def take_pending(self, email: str) -> Optional[tuple[dict, int]]:
+        """Pop the coalesced update for a user → (mongo update, expected version)"""
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None or entry["pending"] is None:
+                return None
+            pending = entry["pending"]
+            expected = entry["base_version"]
+            entry["pending"] = None
+            entry["version"] = expected + 1
+            entry["in_flight"] += 1
+
+        update: dict = {"$set": {**pending["set"], "state_version": expected + 1}}
+        if pending["unset"]:
+            update["$unset"] = {field: "" for field in pending["unset"]}
+        if pending["push"]:
+            update["$push"] = {"history": {"$each": pending["push"], "$slice": -HISTORY_LIMIT}}
+        if pending["set_on_insert"]:
+            update["$setOnInsert"] = pending["set_on_insert"]
+        return update, expected
+
+    def take_write(self, email: str) -> Optional[QueuedWrite]:
+        """The coalesced update for one user as a versioned upsert for the persistence queue"""
+        taken = self.take_pending(email)
+        if taken is None:
+            return None
+        update, expected = taken
+
+        def on_conflict():
+            # Document exists with another version → another instance wrote in between.
+            # Keep last-writer-wins like before, but stop trusting the cached copy.
+            logger.warning("session_cache version conflict email=%s expected=%s", email, expected)
+            self.mark_stale(email)
+            return UpdateOne({"email": email}, update, upsert=True)
+
+        return QueuedWrite(
+            UpdateOne(
+                {"email": email, "state_version": _version_filter(expected)},
+                update,
+                upsert=True,
+            ),
+            on_conflict=on_conflict,
+            on_done=lambda ok: self._settle_write(email, update, expected, ok),
+            key=email,
+        )
+
+    def _settle_write(self, email: str, update: dict, expected: int, ok: bool) -> None:
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None:
+                if not ok:
+                    logger.error("session_cache write lost, entry gone email=%s", email)
+                return
+            entry["in_flight"] = max(entry["in_flight"] - 1, 0)
+            if ok:
+                return
+
+            # The cached state already holds the failed turn and any later one, so
+            # re-stage it whole; a newer staged change to a field still wins
+            logger.warning("session_cache write failed, re-staged email=%s expected=%s", email, expected)
+            pending = entry["pending"] or _empty_pending()
+            for field in SESSION_FIELDS + LAZY_FIELDS:
+                if field in pending["set"] or field in pending["unset"] or field not in entry["state"]:
+                    continue
+                value = entry["state"][field]
+                if value is None:
+                    pending["unset"].add(field)
+                else:
+                    _stage_set(pending, field, value)
+            pending["push"] = []
+            for field, value in update["$set"].items():
+                if field != "state_version" and not _is_cached_field(field):
+                    pending["set"].setdefault(field, value)
+            for field, value in update.get("$setOnInsert", {}).items():
+                pending["set_on_insert"].setdefault(field, value)
+            entry["pending"] = pending
+            # Mongo is still at the version the failed write expected
+            entry["base_version"] = entry["version"] = expected
+
+    def _evict(self) -> None:
+        # Oldest clean entries first; dirty and in-flight entries stay until settled
+        while len(self._entries) > self.max_size:
+            for email, entry in self._entries.items():
+                if _is_clean(entry):
+                    del self._entries[email]
+                    break
+            else:
+                return
+
+
+SESSION_CACHE = SessionCache()
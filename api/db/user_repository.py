@@ -0,0 +1,236 @@
+import abc
+import atexit
+import copy
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+from pymongo import errors
+
+from api.db.mongo import EMAIL_INDEX_MISSING, init_mongo, users_email_index_ready
+from api.db.persistence_queue import PERSISTENCE_QUEUE
+from api.db.session_cache import HISTORY_LIMIT, RESULT_CARDS_FIELD, SESSION_CACHE, SESSION_FIELDS, _set_path
+
+
+class UserStateRepository(abc.ABC):
+    """Loads and saves the per-user conversation state used by chat()"""
+
+    def status(self) -> tuple[bool, Optional[object]]:
+        """(ready, error) — whether the backend can serve requests right now"""
+        return True, None
+
+    @abc.abstractmethod
+    def load(self, email: str) -> dict:
+        """history, the visa/flight/hotel/package contexts and the last result set (SESSION_FIELDS) for one user"""
+
+    def load_many(self, emails: list) -> dict:
+        """email → state for a batch of users"""
+        return {email: self.load(email) for email in emails}
+
+    @abc.abstractmethod
+    def load_result_cards(self, email: str) -> Optional[list]:
+        """Rendered cards of the user's last result set, read only when a follow-up renders a page"""
+
+    @abc.abstractmethod
+    def save_turn(
+        self,
+        email: str,
+        name: str,
+        set_fields: dict,
+        unset_fields: tuple = (),
+        history_entries: Optional[list] = None,
+    ) -> None:
+        """
+        Persist one turn: upsert the user, $set/$unset context fields and push
+        history entries keeping only the last HISTORY_LIMIT items
+        """
+
+    def save_turns(self, turns: list) -> dict:
+        """
+        save_turn for many {email, name, set_fields, unset_fields, history_entries}
+        items, in order → email: whether that user's turns were saved
+        """
+        for turn in turns:
+            self.save_turn(**turn)
+        return {turn["email"]: True for turn in turns}
+
+    def flush(self) -> None:
+        """Wait for writes still in flight (no-op for synchronous backends)"""
+
+
+class MongoUserStateRepository(UserStateRepository):
+    """users_collection behind the session cache and the background persistence queue"""
+
+    def __init__(self, cache=SESSION_CACHE, persistence_queue=PERSISTENCE_QUEUE):
+        self.cache = cache
+        self.persistence_queue = persistence_queue
+
+    def status(self) -> tuple[bool, Optional[object]]:
+        collection, ready, error = init_mongo()
+        if ready and not users_email_index_ready(collection):
+            # Refuse turns rather than silently inserting duplicate users
+            return False, EMAIL_INDEX_MISSING
+        return ready, error
+
+    def _revalidate(self, emails: list) -> None:
+        """Drop cached entries whose state_version in Mongo moved on (bounds staleness across instances)"""
+        due = self.cache.versions_to_check(emails)
+        if not due:
+            return
+        collection, ready, _ = init_mongo()
+        if not ready:
+            return  # keep serving the cached copy until Mongo is back
+        try:
+            documents = collection.find({"email": {"$in": list(due)}}, {"_id": 0, "email": 1, "state_version": 1})
+            versions = {document["email"]: document.get("state_version", 0) for document in documents}
+        except errors.PyMongoError:
+            return
+        for email in due:
+            self.cache.confirm_version(email, versions.get(email, 0))
+
+    def load(self, email: str) -> dict:
+        # Warm instances serve slot-filling turns from the session cache
+        self._revalidate([email])
+        cached_state = self.cache.get(email)
+        if cached_state is not None:
+            return cached_state
+
+        collection, ready, error = init_mongo()
+        if not ready:
+            raise RuntimeError(f"MongoDB is not configured or unreachable. {error}")
+
+        projection = {"_id": 0, "state_version": 1, **{field: 1 for field in SESSION_FIELDS}}
+        existing_user = collection.find_one({"email": email}, projection) or {}
+        self.cache.put(email, existing_user, existing_user.get("state_version", 0))
+        return self.cache.get(email) or {field: existing_user.get(field) for field in SESSION_FIELDS}
+
+    def load_many(self, emails: list) -> dict:
+        states = {}
+        misses = []
+        self._revalidate(emails)
+        for email in emails:
+            cached_state = self.cache.get(email)
+            if cached_state is not None:
+                states[email] = cached_state
+            else:
+                misses.append(email)
+        if not misses:
+            return states
+
+        collection, ready, error = init_mongo()
+        if not ready:
+            raise RuntimeError(f"MongoDB is not configured or unreachable. {error}")
+
+        projection = {"_id": 0, "email": 1, "state_version": 1, **{field: 1 for field in SESSION_FIELDS}}
+        found = {document["email"]: document for document in collection.find({"email": {"$in": misses}}, projection)}
+        for email in misses:
+            existing_user = found.get(email) or {}
+            self.cache.put(email, existing_user, existing_user.get("state_version", 0))
+            states[email] = self.cache.get(email) or {field: existing_user.get(field) for field in SESSION_FIELDS}
+        return states
+
+    def load_result_cards(self, email: str) -> Optional[list]:
+        # Cards staged by a turn that is not flushed yet are served from the cache
+        found, cards = self.cache.get_lazy(email, RESULT_CARDS_FIELD)
+        if found:
+            return cards
+
+        collection, ready, error = init_mongo()
+        if not ready:
+            raise RuntimeError(f"MongoDB is not configured or unreachable. {error}")
+        document = collection.find_one({"email": email}, {"_id": 0, RESULT_CARDS_FIELD: 1}) or {}
+        cards = document.get(RESULT_CARDS_FIELD)
+        self.cache.put_lazy(email, RESULT_CARDS_FIELD, cards)
+        return cards
+
+    def _stage_turn(self, email, name, set_fields, unset_fields=(), history_entries=None) -> None:
+        self.cache.stage(
+            email,
+            set_fields={**set_fields, "name": name, "last_seen_at": datetime.utcnow()},
+            unset_fields=unset_fields,
+            history_entries=history_entries,
+            set_on_insert={"email": email, "created_at": datetime.utcnow()},
+        )
+
+    def save_turn(self, email, name, set_fields, unset_fields=(), history_entries=None) -> None:
+        # Staged in the session cache now, written to Mongo by the persistence queue
+        self._stage_turn(email, name, set_fields, unset_fields, history_entries)
+        self.persistence_queue.enqueue(self.cache.take_write(email))
+
+    def save_turns(self, turns: list) -> dict:
+        # Turns of one user coalesce in the cache; the writes queue behind any earlier
+        # ones of the same users and the request waits for their outcome
+        for turn in turns:
+            self._stage_turn(**turn)
+        emails = dict.fromkeys(turn["email"] for turn in turns)
+        # Given-up writes stay staged in the cache and are retried later
+        failed = set(self.persistence_queue.write_now([self.cache.take_write(email) for email in emails]))
+        return {email: email not in failed for email in emails}
+
+    def flush(self) -> None:
+        # Writes given up earlier stay staged in the cache → one more attempt
+        for email in self.cache.dirty_emails():
+            self.persistence_queue.enqueue(self.cache.take_write(email))
+        self.persistence_queue.flush()
+
+
+class InMemoryUserStateRepository(UserStateRepository):
+    """
+    Process-local backend with the same update semantics as the Mongo one
+    ($setOnInsert, $set, $unset of finished contexts, history $slice) so the
+    request path can be benchmarked and load-tested without a live Mongo.
+    """
+
+    def __init__(self):
+        self.documents: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def load(self, email: str) -> dict:
+        with self._lock:
+            document = self.documents.get(email) or {}
+            return {field: copy.deepcopy(document.get(field)) for field in SESSION_FIELDS}
+
+    def load_result_cards(self, email: str) -> Optional[list]:
+        with self._lock:
+            return copy.deepcopy((self.documents.get(email) or {}).get(RESULT_CARDS_FIELD))
+
+    def save_turn(self, email, name, set_fields, unset_fields=(), history_entries=None) -> None:
+        now = datetime.utcnow()
+        with self._lock:
+            document = self.documents.get(email)
+            if document is None:
+                document = self.documents[email] = {"email": email, "created_at": now}
+
+            for field, value in copy.deepcopy(set_fields).items():
+                _set_path(document, field, value)
+            document["name"] = name
+            document["last_seen_at"] = now
+            for field in unset_fields:
+                document.pop(field, None)
+            if history_entries:
+                history = document.get("history", []) + copy.deepcopy(history_entries)
+                document["history"] = history[-HISTORY_LIMIT:]
+
+
+USER_STATE_BACKEND = os.getenv("USER_STATE_BACKEND", "mongo").lower()
+
+_repository: Optional[UserStateRepository] = None
+
+
+def get_user_repository() -> UserStateRepository:
+    global _repository
+    if _repository is None:
+        if USER_STATE_BACKEND == "memory":
+            _repository = InMemoryUserStateRepository()
+        else:
+            _repository = MongoUserStateRepository()
+            # Runs before the queue's own exit flush, so re-staged writes get one more try
+            atexit.register(_repository.flush)
+    return _repository
+
+
+def set_user_repository(repository: UserStateRepository) -> None:
+    """Swap the backend (benchmarks and load tests)"""
+    global _repository
+    _repository = repository
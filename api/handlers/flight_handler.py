@@ -2,10 +2,17 @@ from flask import current_app as app
 from typing import Optional
 import os
 
+from api.core.search_jobs import SEARCH_JOBS, SEARCH_JOBS_ENABLED
+from api.core.structured_log import log_event, log_payload
 from api.helpers.flight_helpers import (
+    _format_fare_calendar,
     _format_flights_summary,
     _fetch_flight_data,
+    _search_flexible_dates,
 )
+from api.helpers.flight_model import parse_flights
+from api.helpers.result_set import _build_flight_result_set
+from api.helpers.slot_extraction import _fill_flight_slots
 
 # handlers/flight_handler.py
 
@@ -16,7 +23,7 @@ def _get_next_flight_question(question_index: int, trip_type: str | None = None)
         "How many adults will be traveling?",
         "How many children will be traveling?",
         "What are the ages of the children? (comma-separated)",
-        "What is your departure date? (YYYY-MM-DD format)",
+        "What is your departure date? (YYYY-MM-DD format, add ±3 if your dates are flexible)",
         "Which city are you departing from?",
         "Which city are you traveling to?",
         "What is your return date? (YYYY-MM-DD format)",
@@ -29,6 +36,115 @@ def _get_next_flight_question(question_index: int, trip_type: str | None = None)
     return questions[question_index] if question_index < len(questions) else None
 
 
+def _next_flight_slot(flight_context: dict) -> Optional[int]:
+    """Index of the first question still unanswered, None once the search can run"""
+    if flight_context["trip_type"] is None:
+        return 0
+    if flight_context["adults"] is None:
+        return 1
+    if flight_context["children"] is None:
+        return 2
+    if flight_context["children"] > 0 and not flight_context["children_ages"]:
+        return 3
+    if flight_context["departure_date"] is None:
+        return 4
+    if flight_context["departure_city"] is None:
+        return 5
+    if flight_context["arrival_city"] is None:
+        return 6
+    if flight_context["trip_type"] == "two-way" and flight_context["return_date"] is None:
+        return 7
+    return None
+
+
+def _run_flight_search(flight_context: dict) -> tuple[str, Optional[dict]]:
+    """Call the flight API for a completed dialogue → (answer, result set for follow-ups)"""
+    children_ages = flight_context["children_ages"]
+    total_children = flight_context["children"] or 0
+    infants = min(sum(1 for a in children_ages if a < 2), total_children)
+    child_param = total_children - infants
+    round_trip = flight_context["trip_type"] == "two-way"
+
+    search = dict(
+        adults=flight_context["adults"],
+        children=child_param,
+        infants=infants,
+        departure_date=flight_context["departure_date"],
+        origin=flight_context["departure_city"],
+        destination=flight_context["arrival_city"],
+        username=os.getenv("PUBLIC_TTS_API_USERNAME"),
+        password=os.getenv("PUBLIC_TTS_API_PASSWORD"),
+        trip_type=flight_context["trip_type"],
+        return_date=flight_context["return_date"] if round_trip else None,
+    )
+    header = (
+        f"Perfect! Here's what I found for "
+        f"{flight_context['departure_city']} → {flight_context['arrival_city']}"
+        f"{' (Round Trip)' if round_trip else ''}"
+    )
+
+    route = f"{flight_context['departure_city']} → {flight_context['arrival_city']}"
+
+    flex_days = flight_context.get("flex_days")
+    if flex_days:
+        calendar = _search_flexible_dates(flex_days, **search)
+        priced = [day for day in calendar if day["cheapest"] is not None]
+        best = min(priced, key=lambda day: day["cheapest"]) if priced else None
+        result_set = (
+            _build_flight_result_set(best["response"], f"{route} on {best['departure_date']}", best["flights"])
+            if best else None
+        )
+        return f"{header}, ±{flex_days} days:\n\n{_format_fare_calendar(calendar, search['departure_date'])}", result_set
+
+    # Exact dates always hit the API; only the flex fan-out shares cached days
+    api_response = _fetch_flight_data(**search)
+    flights = parse_flights(api_response)
+    return (
+        f"{header}:\n\n{_format_flights_summary(api_response, flights)}",
+        _build_flight_result_set(api_response, route, flights),
+    )
+
+
+def _flight_search_answer(flight_context: dict) -> str:
+    return _run_flight_search(flight_context)[0]
+
+
+def _finish_flight_search(state, flight_context: dict):
+    """Final turn: search now, or hand the search to a job and answer right away"""
+    result_set = None
+    job_id = SEARCH_JOBS.submit("flight", _flight_search_answer, dict(flight_context)) if SEARCH_JOBS_ENABLED else None
+    if job_id:
+        state["answer"] = (
+            f"Searching flights for "
+            f"{flight_context['departure_city']} → {flight_context['arrival_city']}… "
+            f"Results will be ready in a moment (search id: {job_id})."
+        )
+        state["search_job"] = {"id": job_id, "kind": "flight", "status_url": f"/api/search/{job_id}"}
+    else:
+        state["answer"], result_set = _run_flight_search(flight_context)
+
+    # Replaces the last result set even with None (job mode, no offers), so
+    # "show more" never pages an older search
+    state["result_set"] = result_set
+    state["result_set_updated"] = True
+
+    state["flight_context"] = None
+    state["flight_question_index"] = 0
+    return state
+
+
+def _advance_flight(state, flight_context: dict, note: Optional[str] = None):
+    """Ask the first missing question (after the note on a refused date), or search once nothing is missing"""
+    next_index = _next_flight_slot(flight_context)
+    if next_index is None:
+        return _finish_flight_search(state, flight_context)
+
+    state["flight_question_index"] = next_index
+    next_question = _get_next_flight_question(next_index, flight_context["trip_type"])
+    state["answer"] = f"{note} {next_question}" if note else next_question
+    return state
+
+
 def _handle_flight(state):
     """Handle flight booking multi-turn conversation"""
 
@@ -36,11 +152,8 @@ def _handle_flight(state):
     flight_context = state.get("flight_context") or {}
     flight_question_index = state.get("flight_question_index", 0)
 
-    app.logger.info(
-        "FLIGHT STATE | index=%s | context=%s",
-        flight_question_index,
-        flight_context,
-    )
+    log_event("flight_state", index=flight_question_index, trip_type=flight_context.get("trip_type"))
+    log_payload("flight_state_context", flight_context, index=flight_question_index)
 
     # Initialize context
     flight_context.setdefault("trip_type", None)
@@ -51,10 +164,18 @@ def _handle_flight(state):
     flight_context.setdefault("departure_date", None)
     flight_context.setdefault("departure_city", None)
     flight_context.setdefault("arrival_city", None)
+    flight_context.setdefault("flex_days", None)
 
     state["flight_context"] = flight_context
     text = question.lower()
 
+    # Everything the message states outright ("2 adults, one way from Hyderabad
+    # to Jeddah on 2026-11-20"), including all dates → skip to the first gap
+    filled, note = _fill_flight_slots(flight_context, question)
+    if filled or note:
+        log_event("flight_slots_filled", index=flight_question_index, slots=filled, refused_date=bool(note))
+        return _advance_flight(state, flight_context, note)
+
     # 0️⃣ Trip type
     if flight_question_index == 0 and flight_context["trip_type"] is None:
         user_text = text.strip().lower()
@@ -72,18 +193,14 @@ def _handle_flight(state):
             state["answer"] = _get_next_flight_question(0)
             return state
 
-        state["flight_question_index"] = 1
-        state["answer"] = _get_next_flight_question(1)
-        return state
+        return _advance_flight(state, flight_context)
 
     # 1️⃣ Adults
     if flight_question_index == 1 and flight_context["adults"] is None:
         for w in text.split():
             if w.isdigit():
                 flight_context["adults"] = int(w)
-                state["flight_question_index"] = 2
-                state["answer"] = _get_next_flight_question(2)
-                return state
+                return _advance_flight(state, flight_context)
         state["answer"] = _get_next_flight_question(1)
         return state
 
@@ -96,13 +213,8 @@ def _handle_flight(state):
                 # ✅ Skip age question if 0 children
                 if flight_context["children"] == 0:
                     flight_context["children_ages"] = []
-                    state["flight_question_index"] = 4
-                    state["answer"] = _get_next_flight_question(4)
-                    return state
 
-                state["flight_question_index"] = 3
-                state["answer"] = _get_next_flight_question(3)
-                return state
+                return _advance_flight(state, flight_context)
 
         state["answer"] = _get_next_flight_question(2)
         return state
@@ -118,113 +230,27 @@ def _handle_flight(state):
         ages = re.findall(r"\d+", question)
         if ages:
             flight_context["children_ages"] = [int(a) for a in ages]
-            state["flight_question_index"] = 4
-            state["answer"] = _get_next_flight_question(4)
-            return state
+            return _advance_flight(state, flight_context)
 
         state["answer"] = _get_next_flight_question(3)
         return state
 
-    # 4️⃣ Departure date
-    if flight_question_index == 4 and flight_context["departure_date"] is None:
-        import re
-
-        m = re.search(r"\d{4}-\d{2}-\d{2}", question)
-        if m:
-            flight_context["departure_date"] = m.group()
-            state["flight_question_index"] = 5
-            state["answer"] = _get_next_flight_question(5)
-            return state
-
-        state["answer"] = _get_next_flight_question(4)
+    # 4️⃣ Departure date / 7️⃣ Return date: any date, valid or not, was already
+    # handled by _fill_flight_slots, so there was none → ask again
+    if flight_question_index in (4, 7):
+        state["answer"] = _get_next_flight_question(flight_question_index, flight_context["trip_type"])
         return state
 
     # 5️⃣ Departure city
     if flight_question_index == 5 and flight_context["departure_city"] is None:
         flight_context["departure_city"] = question.strip()
-        state["flight_question_index"] = 6
-        state["answer"] = _get_next_flight_question(6)
-        return state
+        return _advance_flight(state, flight_context)
 
-    # 6️⃣ Arrival city
+    # 6️⃣ Arrival city → FETCH one-way, or ask the return date
     if flight_question_index == 6 and flight_context["arrival_city"] is None:
         flight_context["arrival_city"] = question.strip()
+        return _advance_flight(state, flight_context)
 
-        children_ages = flight_context["children_ages"]
-        total_children = flight_context["children"] or 0
-        infants = min(sum(1 for a in children_ages if a < 2), total_children)
-        child_param = total_children - infants
-
-        # ✈️ ONE-WAY → FETCH & EXIT
-        if flight_context["trip_type"] == "one-way":
-            api_response = _fetch_flight_data(
-                adults=flight_context["adults"],
-                children=child_param,
-                infants=infants,
-                departure_date=flight_context["departure_date"],
-                origin=flight_context["departure_city"],
-                destination=flight_context["arrival_city"],
-                username=os.getenv("PUBLIC_TTS_API_USERNAME"),
-                password=os.getenv("PUBLIC_TTS_API_PASSWORD"),
-                trip_type="one-way",
-            )
-
-            state["answer"] = (
-                f"Perfect! Here's what I found for "
-                f"{flight_context['departure_city']} → {flight_context['arrival_city']}:\n\n"
-                f"{_format_flights_summary(api_response)}"
-            )
-            state["flight_context"] = None
-            state["flight_question_index"] = 0
-
-            return state  # 🔒 critical return
-
-        # 🔁 TWO-WAY → ASK RETURN DATE
-        state["flight_question_index"] = 7
-        state["answer"] = _get_next_flight_question(7, "two-way")
-        return state
-
-    # 7️⃣ Return date → FETCH round trip
-    if (
-        flight_question_index == 7
-        and flight_context["trip_type"] == "two-way"
-        and flight_context["return_date"] is None
-    ):
-        import re
-
-        m = re.search(r"\d{4}-\d{2}-\d{2}", question)
-        if not m:
-            state["answer"] = _get_next_flight_question(7, "two-way")
-            return state
-
-        flight_context["return_date"] = m.group()
-
-        children_ages = flight_context["children_ages"]
-        total_children = flight_context["children"] or 0
-        infants = min(sum(1 for a in children_ages if a < 2), total_children)
-        child_param = total_children - infants
-
-        api_response = _fetch_flight_data(
-            adults=flight_context["adults"],
-            children=child_param,
-            infants=infants,
-            departure_date=flight_context["departure_date"],
-            origin=flight_context["departure_city"],
-            destination=flight_context["arrival_city"],
-            username=os.getenv("PUBLIC_TTS_API_USERNAME"),
-            password=os.getenv("PUBLIC_TTS_API_PASSWORD"),
-            trip_type="two-way",
-            return_date=flight_context["return_date"],
-        )
-
-        state["answer"] = (
-            f"Perfect! Here's what I found for "
-            f"{flight_context['departure_city']} → {flight_context['arrival_city']} "
-            f"(Round Trip):\n\n{_format_flights_summary(api_response)}"
-        )
-        state["flight_context"] = None
-        state["flight_question_index"] = 0
-        return state
     # 🛑 FINAL SAFETY NET — NEVER RETURN NULL ANSWER
     if "answer" not in state or state["answer"] is None:
         next_q = _get_next_flight_question(
@@ -1,8 +1,10 @@
 from typing import Any
 from api.data.marhaba_context import MARHABA_CONTEXT
+from api.helpers.llm_helpers import _generate_content
 
-def _handle_general(state: dict) -> dict:
-    model = state["model"]
+
+def _build_general_prompt(state: dict) -> str:
+    """Build the Marhaba context + history block shared by the general and combined prompts"""
     question = state["question"]
     name = state["name"]
     history = state.get("history", [])
@@ -23,7 +25,7 @@ def _handle_general(state: dict) -> dict:
         "Greet the user by name at the start." if is_first_message else "Do not greet again."
     )
 
-    prompt = (
+    return (
         f"{MARHABA_CONTEXT}\n\n"
         f"User Name: {name}\n"
         f"{conversation_prefix}"
@@ -33,6 +35,15 @@ def _handle_general(state: dict) -> dict:
         f"{greeting_instruction}"
     )
 
-    response = model.generate_content(prompt)
+
+def _handle_general(state: dict) -> dict:
+    # Combined intent mode already answered the question in the same LLM call
+    if state.get("answer"):
+        return state
+
+    model = state["model"]
+    prompt = _build_general_prompt(state)
+
+    response = _generate_content(model, prompt, "handle_general")
     state["answer"] = response.text
     return state
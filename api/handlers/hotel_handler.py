@@ -3,17 +3,29 @@ from typing import Optional
 import os
 import re
 
+from api.core.search_jobs import SEARCH_JOBS, SEARCH_JOBS_ENABLED
+from api.core.structured_log import log_event, log_payload
 from api.helpers.hotel_helpers import (
+    SPLIT_STAY_CITIES,
     _fetch_hotel_data,
     _format_hotels_summary,
+    _format_split_stay_summary,
+    _search_split_stay,
 )
+from api.helpers.result_set import _build_hotel_result_set
+from api.helpers.slot_extraction import _fill_hotel_slots
 from api.data.hotel_city_resolver import (
     resolve_hotel_city,
     suggest_hotel_cities,
 )
 
 
-def _get_next_hotel_question(question_index: int) -> Optional[str]:
+def _get_next_hotel_question(question_index: int, split_stay: bool = False) -> Optional[str]:
+    # Split stay: 0/1 ask each holy city's dates, the city question (2) is skipped
+    if split_stay and question_index in (0, 1):
+        city = SPLIT_STAY_CITIES[question_index]
+        return f"What are your {city} check-in and check-out dates? (YYYY-MM-DD to YYYY-MM-DD)"
+
     questions = [
         "What is your check-in date? (YYYY-MM-DD format)",          # 0
         "What is your check-out date? (YYYY-MM-DD format)",         # 1
@@ -28,6 +40,124 @@ def _get_next_hotel_question(question_index: int) -> Optional[str]:
     return questions[question_index] if question_index < len(questions) else None
 
 
+def _next_hotel_slot(hotel_context: dict) -> Optional[int]:
+    """Index of the first question still unanswered, None once the search can run"""
+    if hotel_context["split_stay"]:
+        booked = {stay["city_name"] for stay in hotel_context["stays"]}
+        for index, city in enumerate(SPLIT_STAY_CITIES):
+            if city not in booked:
+                return index
+    else:
+        if hotel_context["check_in"] is None:
+            return 0
+        if hotel_context["check_out"] is None:
+            return 1
+        if hotel_context["city_id"] is None:
+            return 2
+    if hotel_context["rooms"] is None:
+        return 3
+    if hotel_context["adults"] is None:
+        return 4
+    if hotel_context["children"] is None:
+        return 5
+    if hotel_context["children"] > 0 and not hotel_context["children_ages"]:
+        return 6
+    if hotel_context["rating"] is None:
+        return 7
+    if hotel_context["guest_nationality"] is None:
+        return 8
+    return None
+
+
+def _run_hotel_search(hotel_context: dict) -> tuple[str, Optional[dict]]:
+    """Call the hotel API for a completed dialogue → (answer, result set for follow-ups)"""
+    if hotel_context.get("split_stay"):
+        results = _search_split_stay(
+            hotel_context["stays"],
+            rooms=hotel_context["rooms"],
+            room_guests=hotel_context["room_guests"],
+            guest_nationality=hotel_context["guest_nationality"],
+            min_rating=hotel_context["min_rating"],
+            max_rating=hotel_context["max_rating"],
+            username=os.getenv("PUBLIC_TTS_API_USERNAME"),
+            password=os.getenv("PUBLIC_TTS_API_PASSWORD"),
+        )
+        return (
+            f"Here are the best options for your "
+            f"{' + '.join(SPLIT_STAY_CITIES)} stay:\n\n"
+            f"{_format_split_stay_summary(results)}"
+        ), None
+
+    api_response = _fetch_hotel_data(
+        check_in=hotel_context["check_in"],
+        check_out=hotel_context["check_out"],
+        city_name=hotel_context["city_name"],
+        rooms=hotel_context["rooms"],
+        room_guests=hotel_context["room_guests"],
+        guest_nationality=hotel_context["guest_nationality"],
+        min_rating=hotel_context["min_rating"],
+        max_rating=hotel_context["max_rating"],
+        username=os.getenv("PUBLIC_TTS_API_USERNAME"),
+        password=os.getenv("PUBLIC_TTS_API_PASSWORD"),
+    )
+
+    return (
+        f"Here are the best hotel options in "
+        f"{hotel_context['city_name']}:\n\n"
+        f"{_format_hotels_summary(api_response)}"
+    ), _build_hotel_result_set(api_response, f"Hotels in {hotel_context['city_name']}")
+
+
+def _hotel_search_answer(hotel_context: dict) -> str:
+    return _run_hotel_search(hotel_context)[0]
+
+
+def _finish_hotel_search(state, hotel_context: dict):
+    """Final turn: search now, or hand the search to a job and answer right away"""
+    result_set = None
+    job_id = SEARCH_JOBS.submit("hotel", _hotel_search_answer, dict(hotel_context)) if SEARCH_JOBS_ENABLED else None
+    if job_id:
+        destination = " + ".join(SPLIT_STAY_CITIES) if hotel_context.get("split_stay") else hotel_context["city_name"]
+        state["answer"] = (
+            f"Searching hotels in {destination}… "
+            f"Results will be ready in a moment (search id: {job_id})."
+        )
+        state["search_job"] = {"id": job_id, "kind": "hotel", "status_url": f"/api/search/{job_id}"}
+    else:
+        state["answer"], result_set = _run_hotel_search(hotel_context)
+
+    # Job mode and split stays store no result set → clear the previous one
+    state["result_set"] = result_set
+    state["result_set_updated"] = True
+
+    # 🧹 CLEAN EXIT
+    state["hotel_context"] = None
+    state["hotel_question_index"] = 0
+    return state
+
+
+def _advance_hotel(state, hotel_context: dict, note: Optional[str] = None):
+    """Ask the first missing question (after the note on a refused date), or search once nothing is missing"""
+    next_index = _next_hotel_slot(hotel_context)
+    if next_index is not None:
+        state["hotel_question_index"] = next_index
+        next_question = _get_next_hotel_question(next_index, split_stay=hotel_context["split_stay"])
+        state["answer"] = f"{note} {next_question}" if note else next_question
+        return state
+
+    # 🔥 BUILD ROOM_GUESTS STRUCTURE
+    hotel_context["room_guests"] = [
+        {
+            "Adult": hotel_context["adults"],
+            "Child": hotel_context["children"],
+            "ChildAge": hotel_context["children_ages"],
+        }
+    ]
+
+    # 🔥 CALL HOTEL API
+    return _finish_hotel_search(state, hotel_context)
+
+
 def _handle_hotel(state):
     """
     Handle hotel booking multi-turn conversation
@@ -37,11 +167,8 @@ def _handle_hotel(state):
     hotel_context = state.get("hotel_context") or {}
     hotel_question_index = state.get("hotel_question_index", 0)
 
-    app.logger.info(
-        "HOTEL STATE | index=%s | context=%s",
-        hotel_question_index,
-        hotel_context,
-    )
+    log_event("hotel_state", index=hotel_question_index, city=hotel_context.get("city_name"))
+    log_payload("hotel_state_context", hotel_context, index=hotel_question_index)
 
     # Initialize hotel context
     hotel_context.setdefault("active", True)
@@ -57,35 +184,27 @@ def _handle_hotel(state):
     hotel_context.setdefault("children_ages", [])
     hotel_context.setdefault("min_rating", 1)
     hotel_context.setdefault("max_rating", 5)
+    hotel_context.setdefault("rating", None)
     hotel_context.setdefault("guest_nationality", None)
+    hotel_context.setdefault("split_stay", False)
+    hotel_context.setdefault("stays", [])
 
     state["hotel_context"] = hotel_context
     text = question.strip().lower()
-    
-    
-    if hotel_question_index == 0 and hotel_context["check_in"] is None:
-        m = re.search(r"\d{4}-\d{2}-\d{2}", question)
-        if m:
-            hotel_context["check_in"] = m.group()
-            state["hotel_question_index"] = 1
-            state["answer"] = _get_next_hotel_question(1)
-            return state
-
-        state["answer"] = _get_next_hotel_question(0)
-        return state
-    
-    if hotel_question_index == 1 and hotel_context["check_out"] is None:
-        m = re.search(r"\d{4}-\d{2}-\d{2}", question)
-        if m:
-            hotel_context["check_out"] = m.group()
-            state["hotel_question_index"] = 2
-            state["answer"] = _get_next_hotel_question(2)
-            return state
 
-        state["answer"] = _get_next_hotel_question(1)
+    # Everything the message states outright ("2026-11-01 to 2026-11-05 in Makkah,
+    # 1 room, 2 adults, no kids"), including all dates → skip to the first gap
+    filled, note = _fill_hotel_slots(hotel_context, question)
+    if filled or note:
+        log_event("hotel_slots_filled", index=hotel_question_index, slots=filled, refused_date=bool(note))
+        return _advance_hotel(state, hotel_context, note)
+
+    # Check-in / check-out dates (both cities' ranges for a split stay): any date
+    # was already taken by _fill_hotel_slots, so there was none → ask again
+    if hotel_question_index in (0, 1):
+        state["answer"] = _get_next_hotel_question(hotel_question_index, split_stay=hotel_context["split_stay"])
         return state
 
-
     if hotel_question_index == 2 and hotel_context["city_id"] is None:
         city_info = resolve_hotel_city(question)
 
@@ -102,19 +221,14 @@ def _handle_hotel(state):
         hotel_context["city_name"] = question.strip()
         hotel_context["city_id"] = city_info["city_id"]
         hotel_context["country_code"] = city_info["country_code"]
-
-        state["hotel_question_index"] = 3
-        state["answer"] = _get_next_hotel_question(3)
-        return state
+        return _advance_hotel(state, hotel_context)
 
 
     if hotel_question_index == 3 and hotel_context["rooms"] is None:
         for w in text.split():
             if w.isdigit():
                 hotel_context["rooms"] = int(w)
-                state["hotel_question_index"] = 4
-                state["answer"] = _get_next_hotel_question(4)
-                return state
+                return _advance_hotel(state, hotel_context)
 
         state["answer"] = _get_next_hotel_question(3)
         return state
@@ -124,11 +238,7 @@ def _handle_hotel(state):
         for w in text.split():
             if w.isdigit():
                 hotel_context["adults"] = int(w)
-
-                # move to children question
-                state["hotel_question_index"] = 5
-                state["answer"] = _get_next_hotel_question(5)
-                return state
+                return _advance_hotel(state, hotel_context)
 
         # invalid input → ask again
         state["answer"] = _get_next_hotel_question(4)
@@ -143,14 +253,8 @@ def _handle_hotel(state):
                 # ✅ No children → skip ages
                 if hotel_context["children"] == 0:
                     hotel_context["children_ages"] = []
-                    state["hotel_question_index"] = 7   # go to rating
-                    state["answer"] = _get_next_hotel_question(7)
-                    return state
 
-                # children > 0 → ask ages
-                state["hotel_question_index"] = 6
-                state["answer"] = _get_next_hotel_question(6)
-                return state
+                return _advance_hotel(state, hotel_context)
 
         # invalid input → ask again
         state["answer"] = _get_next_hotel_question(5)
@@ -172,27 +276,20 @@ def _handle_hotel(state):
             return state
 
         hotel_context["children_ages"] = [int(a) for a in ages]
-
-        # move to rating
-        state["hotel_question_index"] = 7
-        state["answer"] = _get_next_hotel_question(7)
-        return state
+        return _advance_hotel(state, hotel_context)
 
     
     # 7️⃣ Hotel rating preference
-    if hotel_question_index == 7 and hotel_context["max_rating"] == 5:
+    if hotel_question_index == 7 and hotel_context["rating"] is None:
         for w in text.split():
             if w.isdigit():
                 rating = int(w)
 
                 if 1 <= rating <= 5:
+                    hotel_context["rating"] = rating
                     hotel_context["min_rating"] = 1
                     hotel_context["max_rating"] = rating
-
-                    # move to nationality
-                    state["hotel_question_index"] = 8
-                    state["answer"] = _get_next_hotel_question(8)
-                    return state
+                    return _advance_hotel(state, hotel_context)
 
         # invalid input → ask again
         state["answer"] = _get_next_hotel_question(7)
@@ -205,40 +302,7 @@ def _handle_hotel(state):
         # very basic validation: 2-letter country code
         if re.fullmatch(r"[A-Z]{2}", code):
             hotel_context["guest_nationality"] = code
-
-            # 🔥 BUILD ROOM_GUESTS STRUCTURE
-            hotel_context["room_guests"] = [
-                {
-                    "Adult": hotel_context["adults"],
-                    "Child": hotel_context["children"],
-                    "ChildAge": hotel_context["children_ages"],
-                }
-            ]
-
-            # 🔥 CALL HOTEL API
-            api_response = _fetch_hotel_data(
-                check_in=hotel_context["check_in"],
-                check_out=hotel_context["check_out"],
-                city_name=hotel_context["city_name"],
-                rooms=hotel_context["rooms"],
-                room_guests=hotel_context["room_guests"],
-                guest_nationality=hotel_context["guest_nationality"],
-                min_rating=hotel_context["min_rating"],
-                max_rating=hotel_context["max_rating"],
-                username=os.getenv("PUBLIC_TTS_API_USERNAME"),
-                password=os.getenv("PUBLIC_TTS_API_PASSWORD"),
-            )
-
-            state["answer"] = (
-                f"Here are the best hotel options in "
-                f"{hotel_context['city_name']}:\n\n"
-                f"{_format_hotels_summary(api_response)}"
-            )
-
-            # 🧹 CLEAN EXIT
-            state["hotel_context"] = None
-            state["hotel_question_index"] = 0
-            return state
+            return _advance_hotel(state, hotel_context)
 
         # invalid input → ask again
         state["answer"] = _get_next_hotel_question(8)
@@ -290,7 +354,8 @@ def _handle_hotel(state):
     
     if "answer" not in state or state["answer"] is None:
         next_q = _get_next_hotel_question(
-            state.get("hotel_question_index", 0)
+            state.get("hotel_question_index", 0),
+            split_stay=hotel_context["split_stay"],
         )
         state["answer"] = next_q or "Please continue, I’m processing your hotel request."
 
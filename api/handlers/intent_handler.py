@@ -1,8 +1,21 @@
-from typing import Dict
+import json
+import os
+import re
+from typing import Dict, Optional, Tuple
+from api.helpers.hotel_helpers import _is_split_stay_request
+from api.helpers.result_set import _active_result_set, _parse_result_query
+from api.helpers.slot_extraction import _extract_place, _is_airport, _is_hotel_city
 from api.helpers.visa_helpers import _extract_country
+from api.handlers.general_handler import _build_general_prompt
+from api.helpers.llm_helpers import _generate_content
+from api.core.structured_log import log_event
 from flask import current_app as app
 
 
+# One structured LLM call returns both the intent label and the general answer
+COMBINED_INTENT_MODE = os.getenv("COMBINED_INTENT_MODE", "true").lower() in ("1", "true", "yes")
+
+
 def _is_flight_question(text: str) -> bool:
     """Check if the question is asking for flight details/booking"""
     lowered = text.lower()
@@ -19,13 +32,86 @@ def _is_flight_question(text: str) -> bool:
     return False
 
 
+def _parse_intent_payload(text: str) -> Tuple[str, Optional[str]]:
+    """Parse the combined classifier output into (intent, answer)"""
+    cleaned = re.sub(r"^```(?:json)?|```$", "", text.strip(), flags=re.MULTILINE).strip()
+    try:
+        payload = json.loads(cleaned)
+    except ValueError:
+        # Model ignored the JSON instruction: only a bare label counts, since prose
+        # like "You don't need a visa for Dubai" is a general answer, not a label
+        label = cleaned.strip(" \"'.").lower()
+        return ("visa" if label == "visa" else "general"), None
+
+    if not isinstance(payload, dict):
+        return "general", None
+
+    label = str(payload.get("intent", "")).strip().lower()
+    intent = "visa" if "visa" in label else "general"
+    answer = payload.get("answer")
+    if intent != "general" or not isinstance(answer, str) or not answer.strip():
+        return intent, None
+    return intent, answer.strip()
+
+
+def _names_new_place(question: str, result_set: Dict) -> bool:
+    """
+    A country, or a city missing from the stored search's title, makes the
+    message a new question rather than a follow-up on those results
+    """
+    text = question
+    # "only Saudia" names an airline of the results, not Saudi Arabia
+    for airline in set(result_set["columns"].get("airline") or []):
+        for word in re.findall(r"[a-z]{4,}", airline.lower()):
+            text = re.sub(rf"\b{re.escape(word)}\w*", " ", text, flags=re.IGNORECASE)
+    if _extract_country(text):
+        return True
+
+    title = result_set["title"].lower()
+    places = (
+        _extract_place(text, "from", _is_airport),
+        _extract_place(text, "to", _is_airport),
+        _extract_place(text, "in", _is_hotel_city),
+    )
+    return any(place and place.lower() not in title for place in places)
+
+
+def _is_package_request(text: str) -> bool:
+    """Asking for a combined flight + hotel + visa quote"""
+    lowered = text.lower()
+    package_keywords = [
+        "package", "full quote", "complete quote", "all inclusive", "all-inclusive",
+    ]
+    return any(k in lowered for k in package_keywords)
+
+
+def _build_combined_prompt(state: Dict) -> str:
+    return (
+        f"{_build_general_prompt(state)}\n\n"
+        "First classify the user intent into one of: visa, general. "
+        "If the intent is general, also write the answer following the instructions above; "
+        "if it is visa, leave the answer empty.\n"
+        "Respond with only a JSON object of the form "
+        '{"intent": "<visa|general>", "answer": "<answer or empty string>"}.'
+    )
+
+
 
 def _detect_intent(state: Dict) -> Dict:
     model = state["model"]
     question = state["question"]
     flight_context = state.get("flight_context")
     hotel_context = state.get("hotel_context")
-    app.logger.info("intent_classifier initial_state=%s", state)
+    package_context = state.get("package_context")
+    log_event(
+        "intent_classifier",
+        stage="initial",
+        question=question,
+        history_len=len(state.get("history") or []),
+        flight_active=bool(flight_context),
+        hotel_active=bool(hotel_context),
+        package_active=bool(package_context),
+    )
 
     # Check if user is already in flight booking mode
     if flight_context:
@@ -36,6 +122,26 @@ def _detect_intent(state: Dict) -> Dict:
     if hotel_context:
         state["intent"] = "hotel"
         return state
+
+    if package_context:
+        state["intent"] = "package"
+        return state
+
+    # Explicit follow-ups on the last search ("show more", "direct only",
+    # "only 4 star", "sort by duration"), unless the message names a new place
+    result_set = _active_result_set(state.get("result_set"))
+    if state.get("result_set") and result_set is None:
+        state["result_set"] = None
+        state["result_set_updated"] = True
+    if result_set and _parse_result_query(question, result_set) and not _names_new_place(question, result_set):
+        state["intent"] = "results"
+        return state
+
+    # Package quotes mention flights/hotels/Saudi too → check before those
+    if _is_package_request(question):
+        state["intent"] = "package"
+        state["package_context"] = {"active": True}
+        return state
     
     resolved_country = _extract_country(question)
     state["resolved_country"] = resolved_country
@@ -52,17 +158,27 @@ def _detect_intent(state: Dict) -> Dict:
 
     if any(k in question.lower() for k in hotel_keywords):
         state["intent"] = "hotel"
-        state["hotel_context"] = {"active": True}
+        state["hotel_context"] = {"active": True, "split_stay": _is_split_stay_request(question)}
         return state
     
+    if COMBINED_INTENT_MODE:
+        response = _generate_content(model, _build_combined_prompt(state), "detect_intent")
+        intent, answer = _parse_intent_payload(response.text)
+        state["intent"] = intent
+        if answer:
+            # handle_general reuses this instead of making a second call
+            state["answer"] = answer
+        log_event("intent_classifier", stage="final", intent=intent, combined=True, answered=bool(answer))
+        return state
+
     prompt = (
         "Classify the user intent into one of: visa, general. "
         "Respond with only the label.\n\n"
         f"User Question: {question}\n"
     )
-    response = model.generate_content(prompt)
+    response = _generate_content(model, prompt, "detect_intent")
     label = response.text.strip().lower()
     state["intent"] = "visa" if "visa" in label else "general"
-    app.logger.info("intent_classifier final_state=%s", state)
+    log_event("intent_classifier", stage="final", intent=state["intent"], combined=False)
     
     return state
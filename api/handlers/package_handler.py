@@ -0,0 +1,173 @@
+from datetime import date
+from typing import Optional
+import os
+import re
+
+from api.core.search_jobs import SEARCH_JOBS, SEARCH_JOBS_ENABLED
+from api.core.structured_log import log_event
+from api.data.airports import resolve_city_to_iata, suggest_cities
+from api.handlers.visa_handler import VISA2FLY_TOKEN
+from api.helpers.package_helpers import _format_package_quote, _search_package
+from api.helpers.slot_extraction import _extract_dates, _invalid_date_note
+
+# handlers/package_handler.py
+
+
+def _get_next_package_question(question_index: int) -> Optional[str]:
+    questions = [
+        "Which city will you be flying from?",                                              # 0
+        "What are your travel dates? (YYYY-MM-DD to YYYY-MM-DD)",                           # 1
+        "How many adults and children are travelling? (e.g. 2 adults 1 child)",             # 2
+        "What are the ages of the children? (comma-separated)",                             # 3
+        "What is your nationality? (e.g. IN, PK, SA)",                                      # 4
+    ]
+    return questions[question_index] if question_index < len(questions) else None
+
+
+def _run_package_quote(package_context: dict) -> str:
+    """Flight + hotel + visa lookups for a completed dialogue, formatted as one quote"""
+    results = _search_package(
+        package_context,
+        username=os.getenv("PUBLIC_TTS_API_USERNAME"),
+        password=os.getenv("PUBLIC_TTS_API_PASSWORD"),
+        visa_token=VISA2FLY_TOKEN,
+    )
+    return _format_package_quote(package_context, results)
+
+
+def _finish_package_quote(state, package_context: dict):
+    job_id = SEARCH_JOBS.submit("package", _run_package_quote, dict(package_context)) if SEARCH_JOBS_ENABLED else None
+    if job_id:
+        state["answer"] = (
+            f"Preparing your Umrah package quote… "
+            f"It will be ready in a moment (search id: {job_id})."
+        )
+        state["search_job"] = {"id": job_id, "kind": "package", "status_url": f"/api/search/{job_id}"}
+    else:
+        state["answer"] = _run_package_quote(package_context)
+
+    # A package quote stores nothing to page → follow-ups must not reach older results
+    state["result_set"] = None
+    state["result_set_updated"] = True
+    state["package_context"] = None
+    state["package_question_index"] = 0
+    return state
+
+
+def _handle_package(state):
+    """Collect the shared trip parameters once, then quote flight + hotel + visa together"""
+
+    question = state["question"]
+    package_context = state.get("package_context") or {}
+    package_question_index = state.get("package_question_index", 0)
+
+    log_event("package_state", index=package_question_index)
+
+    package_context.setdefault("active", True)
+    package_context.setdefault("origin", None)
+    package_context.setdefault("departure_date", None)
+    package_context.setdefault("return_date", None)
+    package_context.setdefault("adults", None)
+    package_context.setdefault("children_ages", None)
+    package_context.setdefault("nationality", None)
+
+    state["package_context"] = package_context
+    text = question.strip().lower()
+
+    # First turn is the "I want a package quote" message itself
+    if not package_context.get("started"):
+        package_context["started"] = True
+        state["package_question_index"] = 0
+        state["answer"] = (
+            "Sure! I'll put together a flight, hotel and visa quote for your Umrah.\n"
+            f"{_get_next_package_question(0)}"
+        )
+        return state
+
+    # 0️⃣ Origin city (must resolve to an airport, like the flight search does)
+    if package_question_index == 0 and package_context["origin"] is None:
+        origin = question.strip()
+        if not resolve_city_to_iata(origin):
+            suggestions = suggest_cities(origin)
+            state["answer"] = (
+                f"I couldn't find an airport for that city. Did you mean: {', '.join(suggestions)}?"
+                if suggestions else
+                f"I couldn't find an airport for that city. {_get_next_package_question(0)}"
+            )
+            return state
+
+        package_context["origin"] = origin
+        state["package_question_index"] = 1
+        state["answer"] = _get_next_package_question(1)
+        return state
+
+    # 1️⃣ Travel dates
+    if package_question_index == 1 and package_context["departure_date"] is None:
+        dates = _extract_dates(question)
+        if len(dates) < 2:
+            note = _invalid_date_note(question)
+            state["answer"] = f"{note} {_get_next_package_question(1)}" if note else _get_next_package_question(1)
+            return state
+        if date.fromisoformat(dates[1]) <= date.fromisoformat(dates[0]):
+            state["answer"] = f"The return date must be after the departure date. {_get_next_package_question(1)}"
+            return state
+
+        package_context["departure_date"], package_context["return_date"] = dates[0], dates[1]
+        state["package_question_index"] = 2
+        state["answer"] = _get_next_package_question(2)
+        return state
+
+    # 2️⃣ Travellers
+    if package_question_index == 2 and package_context["adults"] is None:
+        adults = re.search(r"(\d+)\s*adult", text)
+        children = re.search(r"(\d+)\s*(?:child|children|kid|kids)", text)
+        numbers = re.findall(r"\d+", text)
+        if not adults and len(numbers) == 1 and not children:
+            adults = re.search(r"(\d+)", text)
+        if not adults or int(adults.group(1)) < 1:
+            state["answer"] = _get_next_package_question(2)
+            return state
+
+        package_context["adults"] = int(adults.group(1))
+        child_count = int(children.group(1)) if children else 0
+        if child_count == 0:
+            package_context["children_ages"] = []
+            state["package_question_index"] = 4
+            state["answer"] = _get_next_package_question(4)
+            return state
+
+        package_context["child_count"] = child_count
+        state["package_question_index"] = 3
+        state["answer"] = _get_next_package_question(3)
+        return state
+
+    # 3️⃣ Children ages
+    if package_question_index == 3 and package_context["children_ages"] is None:
+        ages = re.findall(r"\d+", text)
+        if len(ages) != package_context.get("child_count"):
+            state["answer"] = (
+                f"Please enter exactly {package_context.get('child_count')} age(s), "
+                f"comma-separated."
+            )
+            return state
+
+        package_context["children_ages"] = [int(a) for a in ages]
+        state["package_question_index"] = 4
+        state["answer"] = _get_next_package_question(4)
+        return state
+
+    # 4️⃣ Nationality → QUOTE
+    if package_question_index == 4 and package_context["nationality"] is None:
+        code = text.strip().upper()
+        if not re.fullmatch(r"[A-Z]{2}", code):
+            state["answer"] = _get_next_package_question(4)
+            return state
+
+        package_context["nationality"] = code
+        return _finish_package_quote(state, package_context)
+
+    if "answer" not in state or state["answer"] is None:
+        next_q = _get_next_package_question(state.get("package_question_index", 0))
+        state["answer"] = next_q or "Please continue, I’m preparing your package quote."
+
+    return state
@@ -0,0 +1,33 @@
+from api.core.structured_log import log_event
+from api.helpers.result_set import (
+    _apply_result_query,
+    _parse_result_query,
+    _render_result_page,
+    _result_count,
+)
+
+# handlers/results_handler.py
+
+
+def _handle_results(state):
+    """Page / filter / re-sort the last flight or hotel results without a new upstream search"""
+    result_set = state["result_set"]
+    query = _parse_result_query(state["question"], result_set)
+
+    # Cards are not part of the per-turn state; read them only now that a page is rendered
+    load_result_cards = state.get("load_result_cards")
+    cards = result_set.get("cards") or (load_result_cards() if load_result_cards else None)
+    if not cards or len(cards) != _result_count(result_set):
+        state["result_set"] = None
+        state["result_set_updated"] = True
+        state["answer"] = "Those search results are no longer available. Please start a new search."
+        return state
+
+    result_set = _apply_result_query(result_set, query)
+    state["result_set"] = result_set
+    # Only the view changed → persisted as a $set of result_set.view
+    state["result_view_updated"] = True
+    state["answer"] = _render_result_page(result_set, cards)
+
+    log_event("result_query", kind=result_set["kind"], **result_set["view"])
+    return state
@@ -1,5 +1,7 @@
 from typing import Dict
 from api.helpers.visa_helpers import (
+    _build_price_digest,
+    _price_answer_mode,
     _generic_visa_response,
     _is_empty_visa_snippet,
     _fetch_visa_data,
@@ -7,6 +9,8 @@ from api.helpers.visa_helpers import (
     _format_price_with_ai,
     _visa_context_snippet,
 )
+from api.helpers.visa_index import _build_visa_section_index
+from api.helpers.llm_helpers import _generate_content
 from flask import current_app as app
 import os
 
@@ -34,20 +38,36 @@ def _handle_visa(state: Dict) -> Dict:
         except Exception:
             state["answer"] = _generic_visa_response(resolved_country, question)
             return state
+        _build_visa_section_index(resolved_country, visa_data)
+        price_digest = _build_price_digest(visa_data)
         visa_context = {
             "country": resolved_country,
             "data": visa_data,
+            "price_digest": price_digest,
         }
         state["visa_context"] = visa_context
         state["visa_context_updated"] = True
-        try:
-            state["answer"] = _format_price_with_ai(model, visa_data, resolved_country, question)
-        except Exception:
-            state["answer"] = _format_price_summary(visa_data, resolved_country)
-        return state
+
+        # Plain price questions → template answer, LLM only for reasoning;
+        # anything else (documents, processing time) is answered from the data below
+        price_mode = _price_answer_mode(question)
+        if price_mode == "template":
+            state["answer"] = _format_price_summary(visa_data, resolved_country, price_digest)
+            return state
+        if price_mode == "reasoning":
+            try:
+                state["answer"] = _format_price_with_ai(model, visa_data, resolved_country, question, price_digest)
+            except Exception:
+                state["answer"] = _format_price_summary(visa_data, resolved_country, price_digest)
+            return state
 
     visa_data = (visa_context or {}).get("data", {})
-    visa_snippet = _visa_context_snippet(question, visa_data)
+    if _price_answer_mode(question) == "template":
+        price_digest = visa_context.get("price_digest") or _build_price_digest(visa_data)
+        state["answer"] = _format_price_summary(visa_data, resolved_country, price_digest)
+        return state
+
+    visa_snippet = _visa_context_snippet(question, visa_data, visa_context.get("country"))
     if _is_empty_visa_snippet(visa_snippet):
         state["answer"] = _generic_visa_response(resolved_country, question)
         return state
@@ -60,6 +80,6 @@ def _handle_visa(state: Dict) -> Dict:
         f"Visa Data: {visa_snippet}\n\n"
         f"User Question: {question}\n"
     )
-    response = model.generate_content(prompt)
+    response = _generate_content(model, prompt, "handle_visa")
     state["answer"] = response.text
     return state
@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Hashable, Optional
+
+from flask import current_app, has_app_context
+
+
+class SingleFlightCache:
+    """
+    TTL cache for upstream search results. Concurrent callers asking for the
+    same key share one in-flight call; failures are not cached.
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        # key -> (stored_at, value), least recently used first
+        self._values: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        if self.ttl_seconds <= 0:
+            return compute()
+
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl_seconds:
+                self._values.move_to_end(key)
+                return entry[1]
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(value)
+            with self._lock:
+                self._values[key] = (time.monotonic(), value)
+                self._values.move_to_end(key)
+                while len(self._values) > self.max_size:
+                    self._values.popitem(last=False)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+def fan_out(
+    tasks: dict[str, Callable[[], Any]],
+    max_workers: int,
+    deadlines: Optional[dict[str, float]] = None,
+) -> dict[str, tuple[Any, Any]]:
+    """
+    Run independent upstream calls concurrently on a bounded pool, inside the
+    caller's app context → {name: (result, error)}. A task still running past
+    its deadline (seconds from the start) is reported as a TimeoutError and left
+    to finish in the background.
+    """
+    app = current_app._get_current_object() if has_app_context() else None
+    deadlines = deadlines or {}
+
+    def run(fn: Callable[[], Any]) -> Any:
+        if app is None:
+            return fn()
+        with app.app_context():
+            return fn()
+
+    started_at = time.monotonic()
+    outcomes: dict[str, tuple[Any, Any]] = {}
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks))))
+    try:
+        futures = {name: pool.submit(run, fn) for name, fn in tasks.items()}
+        for name, future in futures.items():
+            deadline = deadlines.get(name)
+            timeout = None if deadline is None else max(0.0, started_at + deadline - time.monotonic())
+            try:
+                outcomes[name] = (future.result(timeout=timeout), None)
+            except FutureTimeoutError as exc:
+                # Same class as the builtin TimeoutError: a task that raised one itself is done
+                if future.done():
+                    outcomes[name] = (None, exc)
+                    continue
+                future.cancel()
+                outcomes[name] = (None, TimeoutError(f"{name} did not answer within {deadline}s"))
+            except Exception as exc:
+                outcomes[name] = (None, exc)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return outcomes
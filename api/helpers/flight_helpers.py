@@ -1,7 +1,8 @@
-import json
+import logging
+import os
 import requests
-from datetime import datetime
-from typing import Any
+from datetime import date, datetime, timedelta
+from typing import Any, Optional
 from flask import current_app as app
 
 from api.data.visa_data import CITY_TO_IATA
@@ -9,6 +10,27 @@ from flask import Flask, request, jsonify
 
 
 from api.data.airports import resolve_city_to_iata, suggest_cities
+from api.core.structured_log import log_event, log_payload
+from api.core.tracing import span
+from api.helpers.concurrency import SingleFlightCache, fan_out
+from api.helpers.flight_model import ParsedFlights, parse_flights
+from api.helpers.http_helpers import get_http_session
+
+
+# Overridable so load tests can point at a local stand-in
+BDSD_API_BASE_URL = os.getenv("BDSD_API_BASE_URL", "https://api.bdsd.technology").rstrip("/")
+
+# Flex-date fan-outs only: identical day searches within the TTL (overlapping
+# ±N windows, retries) share one upstream call, so calendar fares can be up to
+# the TTL old. Exact-date searches always go to the API.
+FLIGHT_SEARCH_CACHE_TTL_SECONDS = float(os.getenv("FLIGHT_SEARCH_CACHE_TTL_SECONDS", "300"))
+FLIGHT_SEARCH_CACHE_SIZE = int(os.getenv("FLIGHT_SEARCH_CACHE_SIZE", "64"))
+# Flexible-date mode: ±days searched and how many run at once
+FLIGHT_FLEX_DEFAULT_DAYS = int(os.getenv("FLIGHT_FLEX_DEFAULT_DAYS", "3"))
+FLIGHT_FLEX_MAX_DAYS = int(os.getenv("FLIGHT_FLEX_MAX_DAYS", "7"))
+FLIGHT_FLEX_CONCURRENCY = int(os.getenv("FLIGHT_FLEX_CONCURRENCY", "4"))
+
+FLIGHT_SEARCH_CACHE = SingleFlightCache(FLIGHT_SEARCH_CACHE_TTL_SECONDS, FLIGHT_SEARCH_CACHE_SIZE)
 
 
 
@@ -19,22 +41,6 @@ def extract_first_flight(api_response: dict) -> dict | None:
         return None
 
 
-def extract_all_flights(api_response: dict) -> list[dict]:
-    """
-    Extract all flight itineraries from the nested Result structure
-    """
-    flights = []
-    try:
-        for group in api_response.get("Result", []):
-            for flight in group:
-                if flight.get("FareList") and flight.get("Segments"):
-                    flights.append(flight)
-    except Exception:
-        pass
-    return flights
-
-
-
 def extract_baggage(fare: dict) -> dict:
     """
     Extract cabin & check-in baggage safely from FareList
@@ -123,42 +129,36 @@ def extract_passenger_fares(fare: dict) -> dict:
     return result
 
 
-def format_single_flight(flight: dict, index: int) -> str:
-    all_trips = flight.get("Segments", [])
-    fares = flight["FareList"]
-
-    lines = [f"✈️ Flight Option {index}"]
+def _format_flight_details(parsed: ParsedFlights, idx: int) -> str:
+    """Journeys, baggage and fare breakup of one parsed itinerary (everything below the option header)"""
+    lines = []
 
-    for trip_idx, segments in enumerate(all_trips):
+    for trip_idx, segments in enumerate(parsed.trips[idx]):
         trip_type = "Outbound" if trip_idx == 0 else "Return"
         lines.append(f"\n🛫 {trip_type} Journey:")
 
         first_seg = segments[0]
         last_seg = segments[-1]
-
-        airline = first_seg["Airline"]["AirlineName"]
-        origin = first_seg["Origin"]["CityCode"]
-        destination = last_seg["Destination"]["CityCode"]
-        duration = first_seg["TotalDuration"]
+        duration = first_seg.total_duration
 
         stops = len(segments) - 1
         if stops == 0:
             stop_text = "Direct"
             via_text = ""
         else:
-            via_cities = [seg["Destination"]["CityName"] for seg in segments[:-1]]
+            via_cities = [seg.destination_city for seg in segments[:-1]]
             stop_text = f"{stops} stop(s)"
             via_text = f"via {', '.join(via_cities)}"
 
         lines.extend([
-            f" Airline: {airline}",
-            f" Route: {origin} → {destination}",
+            f" Airline: {first_seg.airline}",
+            f" Route: {first_seg.origin_code} → {last_seg.destination_code}",
             f" Stops: {stop_text} {via_text}".strip(),
             f" Duration: {duration // 60}h {duration % 60}m",
         ])
 
     #  Fare details (combined fare for round trip)
-    cheapest_fare = min(fares, key=lambda f: f["PublishedPrice"])
+    cheapest_fare = parsed.cheapest_fares[idx]
     baggage = extract_baggage(cheapest_fare)
     passenger_fares = extract_passenger_fares(cheapest_fare)
 
@@ -181,24 +181,17 @@ def format_single_flight(flight: dict, index: int) -> str:
 
 
 
-def _format_flights_summary(api_response: dict) -> str:
-    flights = extract_all_flights(api_response)
+def _format_flights_summary(api_response: dict, parsed: Optional[ParsedFlights] = None) -> str:
+    parsed = parsed if parsed is not None else parse_flights(api_response)
 
-    if not flights:
+    if not len(parsed):
         return "No flights found."
 
-    # Sort flights by cheapest PublishedPrice
-    flights_sorted = sorted(
-        flights,
-        key=lambda f: min(fare["PublishedPrice"] for fare in f["FareList"])
-    )
-
-    top_5 = flights_sorted[:5]
-
+    # Cheapest PublishedPrice first, selected with argpartition instead of a full sort
     lines = [" Cheapest 5 flight options:\n"]
 
-    for idx, flight in enumerate(top_5, start=1):
-        lines.append(format_single_flight(flight, idx))
+    for rank, idx in enumerate(parsed.top_k(5), start=1):
+        lines.append(f"✈️ Flight Option {rank}\n{_format_flight_details(parsed, idx)}")
         lines.append("")  # spacing between flights
 
     return "\n".join(lines)
@@ -225,7 +218,7 @@ def _fetch_flight_data(
             "Flight API credentials not configured (PUBLIC_TTS_API_USERNAME/PUBLIC_TTS_API_PASSWORD)"
         )
 
-    url = "https://api.bdsd.technology/api/airservice/rest/search"
+    url = f"{BDSD_API_BASE_URL}/api/airservice/rest/search"
 
     #  Normalize cities → IATA
     origin_iata = resolve_city_to_iata(origin)
@@ -246,10 +239,12 @@ def _fetch_flight_data(
     except Exception:
         pass
 
-    app.logger.info(
-        "CITY NORMALIZATION → %s → %s | %s → %s",
-        origin, origin_iata,
-        destination, destination_iata
+    log_event(
+        "flight_city_normalization",
+        origin=origin,
+        origin_iata=origin_iata,
+        destination=destination,
+        destination_iata=destination_iata,
     )
 
     # Build AirSegments dynamically
@@ -294,17 +289,27 @@ def _fetch_flight_data(
         "Password": password,
     }
 
-    #  Log final request
-    app.logger.info("FINAL FLIGHT REQUEST →\n%s", json.dumps(body, indent=2))
+    #  Log final request (full body only when LOG_PAYLOADS is on)
+    log_event(
+        "flight_request",
+        route=f"{origin_iata}-{destination_iata}",
+        journey_type=journey_type,
+        adults=adults,
+        children=children,
+        infants=infants,
+        departure_date=departure_date,
+    )
+    log_payload("flight_request_body", body)
 
     for attempt in range(1, 4):
         try:
-            response = requests.post(
-                url,
-                json=body,
-                headers=headers,
-                timeout=30
-            )
+            with span("upstream_flight"):
+                response = get_http_session().post(
+                    url,
+                    json=body,
+                    headers=headers,
+                    timeout=30
+                )
 
             app.logger.info(
                 "flight_api attempt=%s status=%s",
@@ -313,7 +318,8 @@ def _fetch_flight_data(
             )
 
             response.raise_for_status()
-            payload = response.json()
+            with span("decode_flight"):
+                payload = response.json()
 
             app.logger.info("FLIGHT API RESPONSE RECEIVED (attempt %s)", attempt)
 
@@ -333,10 +339,97 @@ def _fetch_flight_data(
             )
 
             if exc.response is not None:
-                app.logger.error("Status Code: %s", exc.response.status_code)
-                app.logger.error("Response Text: %s", exc.response.text)
+                log_event(
+                    "flight_api_error_response",
+                    level=logging.ERROR,
+                    status=exc.response.status_code,
+                    text=exc.response.text,
+                )
 
             break
 
     #  All retries failed
-    raise TimeoutError("Flight API timed out after 3 attempts")
\ No newline at end of file
+    raise TimeoutError("Flight API timed out after 3 attempts")
+
+
+def _search_flights(**search) -> dict:
+    """
+    _fetch_flight_data behind the single-flight result cache (credentials are
+    not part of the key); used by the flex-date fan-out
+    """
+    key = tuple(sorted((name, value) for name, value in search.items() if name not in ("username", "password")))
+    return FLIGHT_SEARCH_CACHE.get_or_compute(key, lambda: _fetch_flight_data(**search))
+
+
+def _shift_date(value: str | None, days: int) -> str | None:
+    """Dates reach here validated by the dialogue; a bad one is a caller bug"""
+    if not value:
+        return value
+    try:
+        return (date.fromisoformat(value) + timedelta(days=days)).isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid travel date {value!r}, expected YYYY-MM-DD") from None
+
+
+def _search_flexible_dates(flex_days: int, **search) -> list[dict]:
+    """
+    Search departure_date ±flex_days concurrently (return_date moves with it so
+    the trip length stays the same) → one entry per day, in date order.
+    When every day failed, the first error is raised like an exact search would.
+    """
+    flex_days = max(0, min(flex_days, FLIGHT_FLEX_MAX_DAYS))
+    today = date.today().isoformat()
+
+    tasks = {}
+    for offset in range(-flex_days, flex_days + 1):
+        day_search = {
+            **search,
+            "departure_date": _shift_date(search["departure_date"], offset),
+            "return_date": _shift_date(search.get("return_date"), offset),
+        }
+        if day_search["departure_date"] < today:
+            continue
+        tasks[day_search["departure_date"]] = lambda day_search=day_search: _search_flights(**day_search)
+
+    with span("flex_date_search"):
+        outcomes = fan_out(tasks, FLIGHT_FLEX_CONCURRENCY)
+
+    calendar = []
+    for departure_date in sorted(outcomes):
+        api_response, error = outcomes[departure_date]
+        flights = parse_flights(api_response)
+        calendar.append({
+            "departure_date": departure_date,
+            "response": api_response,
+            "flights": flights,
+            "cheapest": flights.cheapest_fares[flights.top_k(1)[0]]["PublishedPrice"] if len(flights) else None,
+            "error": error,
+        })
+    failed = [day["error"] for day in calendar if day["error"] is not None]
+    log_event("flight_flex_search", days=len(calendar), failed=len(failed))
+    if calendar and len(failed) == len(calendar):
+        raise failed[0]
+    return calendar
+
+
+def _format_fare_calendar(calendar: list[dict], requested_date: str) -> str:
+    """Cheapest fare per day, then the top options for the best day"""
+    priced = [day for day in calendar if day["cheapest"] is not None]
+    if not priced:
+        return "No flights found on any of the nearby dates."
+
+    best = min(priced, key=lambda day: day["cheapest"])
+    lines = [" Fare calendar (cheapest per day):"]
+    for day in calendar:
+        marker = " ⭐" if day is best else (" (your date)" if day["departure_date"] == requested_date else "")
+        if day["cheapest"] is not None:
+            price = f"INR {day['cheapest']}"
+        elif day["error"] is not None:
+            price = "unavailable"
+        else:
+            price = "no flights"
+        lines.append(f" {day['departure_date']}: {price}{marker}")
+
+    lines.append(f"\n Best day: {best['departure_date']}\n")
+    lines.append(_format_flights_summary(best["response"], best["flights"]))
+    return "\n".join(lines)
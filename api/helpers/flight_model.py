@@ -0,0 +1,93 @@
+# helpers/flight_model.py
+
+from typing import Optional
+
+import numpy as np
+
+
+class SegmentRecord:
+    """The fields of one bdsd flight segment that the summaries use"""
+
+    __slots__ = ("airline", "origin_code", "destination_code", "destination_city", "total_duration")
+
+    def __init__(self, segment: dict):
+        self.airline = segment["Airline"]["AirlineName"]
+        self.origin_code = segment["Origin"]["CityCode"]
+        self.destination_code = segment["Destination"]["CityCode"]
+        self.destination_city = segment["Destination"]["CityName"]
+        self.total_duration = segment.get("TotalDuration", 0)
+
+
+class ParsedFlights:
+    """
+    A bdsd search response parsed once. Per-itinerary numbers live in NumPy
+    columns (min_fare, duration, stops) so ranking is one vectorized pass;
+    segments are kept as __slots__ records and the cheapest fare dict per
+    itinerary is remembered for formatting.
+    """
+
+    __slots__ = ("trips", "cheapest_fares", "min_fare", "duration", "stops")
+
+    def __init__(self, trips: list, cheapest_fares: list, min_fare, duration, stops):
+        self.trips = trips
+        self.cheapest_fares = cheapest_fares
+        self.min_fare = min_fare
+        self.duration = duration
+        self.stops = stops
+
+    def __len__(self) -> int:
+        return len(self.trips)
+
+    def airline(self, idx: int) -> str:
+        trips = self.trips[idx]
+        return trips[0][0].airline if trips and trips[0] else ""
+
+    def top_k(self, k: int, column: str = "min_fare") -> np.ndarray:
+        """Indices of the k smallest values in a column, in ascending order (ties keep response order)"""
+        values = getattr(self, column)
+        n = len(values)
+        if n == 0 or k <= 0:
+            return np.empty(0, dtype=np.intp)
+        if k >= n:
+            return np.argsort(values, kind="stable")
+        # argpartition picks arbitrary ties at the k-th value → take those in response order
+        kth = np.partition(values, k - 1)[k - 1]
+        below = np.flatnonzero(values < kth)
+        ties = np.flatnonzero(values == kth)[:k - len(below)]
+        candidates = np.concatenate((below, ties))
+        return candidates[np.lexsort((candidates, values[candidates]))]
+
+
+def parse_flights(api_response: Optional[dict]) -> ParsedFlights:
+    """Walk the nested Result groups once; itineraries without fares or segments are skipped"""
+    trips, cheapest_fares, min_fare, duration, stops = [], [], [], [], []
+    try:
+        groups = (api_response or {}).get("Result") or []
+    except AttributeError:
+        groups = []
+
+    for group in groups:
+        for flight in group or []:
+            fares = flight.get("FareList") if isinstance(flight, dict) else None
+            segments = flight.get("Segments") if fares else None
+            if not fares or not segments:
+                continue
+            try:
+                records = [[SegmentRecord(segment) for segment in trip] for trip in segments if trip]
+                cheapest = min(fares, key=lambda fare: fare["PublishedPrice"])
+            except (KeyError, TypeError):
+                continue
+
+            trips.append(records)
+            cheapest_fares.append(cheapest)
+            min_fare.append(cheapest["PublishedPrice"])
+            duration.append(sum(trip[0].total_duration for trip in records))
+            stops.append(max((len(trip) - 1 for trip in records), default=0))
+
+    return ParsedFlights(
+        trips,
+        cheapest_fares,
+        np.asarray(min_fare, dtype=np.float64),
+        np.asarray(duration, dtype=np.int64),
+        np.asarray(stops, dtype=np.int64),
+    )
@@ -1,16 +1,46 @@
-import json
+import logging
+import os
 import requests
 from datetime import datetime
 from flask import current_app as app
 from typing import List, Dict
 
+from api.core.structured_log import log_event, log_payload
+from api.core.tracing import span
+from api.helpers.concurrency import fan_out
+from api.helpers.hotel_model import parse_hotels, top_k_hotels
+from api.helpers.http_helpers import get_http_session
 from api.data.hotel_city_resolver import (
     resolve_hotel_city,
     suggest_hotel_cities,
 )
 
 
+# Overridable so load tests can point at a local stand-in
+BDSD_API_BASE_URL = os.getenv("BDSD_API_BASE_URL", "https://api.bdsd.technology").rstrip("/")
+
+# Hotels requested per search; 0 asks bdsd for every hotel in the city
+HOTEL_RESULT_COUNT = int(os.getenv("HOTEL_RESULT_COUNT", "0"))
+
+# Umrah split stay: one search per holy city, run side by side
+SPLIT_STAY_CITIES = ("Makkah", "Madinah")
+_SPLIT_STAY_NAMES = (("makkah", "mecca", "makka"), ("madinah", "medina", "madina"))
+
+
+def _is_split_stay_request(text: str) -> bool:
+    """Mentions both Makkah and Madinah, or asks for a split stay"""
+    text = text.lower()
+    if "split stay" in text or "split-stay" in text:
+        return True
+    return all(any(name in text for name in names) for names in _SPLIT_STAY_NAMES)
+
+
 def format_single_hotel(hotel: dict, index: int) -> str:
+    return f" Hotel Option {index}\n{_format_hotel_details(hotel)}"
+
+
+def _format_hotel_details(hotel: dict) -> str:
+    """Name, rating, address, price and picture of one hotel (everything below the option header)"""
     name = hotel.get("HotelName", "Unknown Hotel")
     rating = hotel.get("StarRating", "N/A")
     address = hotel.get("HotelAddress", "Address not available")
@@ -25,7 +55,6 @@ def format_single_hotel(hotel: dict, index: int) -> str:
         rating_display = "N/A"
 
     lines = [
-        f" Hotel Option {index}",
         f" Name: {name}",
         f" Rating: {rating_display}",
         f" Address: {address}",
@@ -38,23 +67,16 @@ def format_single_hotel(hotel: dict, index: int) -> str:
     return "\n".join(lines)
 
 def _format_hotels_summary(api_response: dict) -> str:
-    results = api_response.get("Result", [])
+    # Cheapest offered price first
+    top_5 = top_k_hotels(parse_hotels(api_response), 5)
 
-    if not results:
+    if not top_5:
         return "No hotels found for the selected criteria."
 
-    # Sort by cheapest offered price
-    def get_price(h):
-        price = h.get("Price", {})
-        return price.get("OfferedPrice") or price.get("PublishedPrice") or float("inf")
-
-    hotels_sorted = sorted(results, key=get_price)
-    top_5 = hotels_sorted[:5]
-
     lines = [" Top hotel options:\n"]
 
-    for idx, hotel in enumerate(top_5, start=1):
-        lines.append(format_single_hotel(hotel, idx))
+    for idx, record in enumerate(top_5, start=1):
+        lines.append(format_single_hotel(record.hotel, idx))
         lines.append("")
 
     return "\n".join(lines)
@@ -102,7 +124,7 @@ def _fetch_hotel_data(
     if len(room_guests) == 1 and rooms > 1:
         room_guests = room_guests * rooms
 
-    url = "https://api.bdsd.technology/api/hotelservice/rest/search"
+    url = f"{BDSD_API_BASE_URL}/api/hotelservice/rest/search"
 
     body = {
         "CheckInDate": check_in_date.isoformat(),
@@ -110,7 +132,7 @@ def _fetch_hotel_data(
         "NoOfNights": no_of_nights,
         "CountryCode": country_code,
         "DestinationCityId": city_id,
-        "ResultCount": None,
+        "ResultCount": HOTEL_RESULT_COUNT or None,
         "GuestNationality": guest_nationality,
         "NoOfRooms": rooms,
         "RoomGuests": room_guests,
@@ -125,16 +147,25 @@ def _fetch_hotel_data(
         "Password": password,
     }
 
-    app.logger.info("FINAL HOTEL REQUEST →\n%s", json.dumps(body, indent=2))
+    log_event(
+        "hotel_request",
+        city_id=city_id,
+        country_code=country_code,
+        nights=no_of_nights,
+        rooms=rooms,
+        nationality=guest_nationality,
+    )
+    log_payload("hotel_request_body", body)
 
     for attempt in range(1, 4):
         try:
-            response = requests.post(
-                url,
-                json=body,
-                headers=headers,
-                timeout=30,
-            )
+            with span("upstream_hotel"):
+                response = get_http_session().post(
+                    url,
+                    json=body,
+                    headers=headers,
+                    timeout=30,
+                )
 
             app.logger.info(
                 "hotel_api attempt=%s status=%s",
@@ -143,7 +174,8 @@ def _fetch_hotel_data(
             )
 
             response.raise_for_status()
-            payload = response.json()
+            with span("decode_hotel"):
+                payload = response.json()
 
             app.logger.info("HOTEL API RESPONSE RECEIVED (attempt %s)", attempt)
             return payload
@@ -162,9 +194,70 @@ def _fetch_hotel_data(
             )
 
             if exc.response is not None:
-                app.logger.error("Status Code: %s", exc.response.status_code)
-                app.logger.error("Response Text: %s", exc.response.text)
+                log_event(
+                    "hotel_api_error_response",
+                    level=logging.ERROR,
+                    status=exc.response.status_code,
+                    text=exc.response.text,
+                )
 
             break
 
     raise TimeoutError("Hotel API timed out after 3 attempts")
+
+
+def _search_split_stay(stays: List[Dict], **search) -> List[Dict]:
+    """
+    One _fetch_hotel_data per {city_name, check_in, check_out} stay, run
+    concurrently → stays in the same order with "response" and "error"
+    """
+    tasks = {
+        str(idx): (lambda stay=stay: _fetch_hotel_data(
+            check_in=stay["check_in"],
+            check_out=stay["check_out"],
+            city_name=stay["city_name"],
+            **search,
+        ))
+        for idx, stay in enumerate(stays)
+    }
+    with span("split_stay_search"):
+        outcomes = fan_out(tasks, len(tasks))
+
+    results = []
+    for idx, stay in enumerate(stays):
+        api_response, error = outcomes[str(idx)]
+        results.append({**stay, "response": api_response, "error": error})
+    log_event(
+        "hotel_split_stay_search",
+        cities=[stay["city_name"] for stay in stays],
+        failed=sum(1 for stay in results if stay["error"] is not None),
+    )
+    return results
+
+
+def _format_split_stay_summary(results: List[Dict]) -> str:
+    """Price-sorted options per city, then the cheapest combined total"""
+    lines = []
+    cheapest_total = 0.0
+    complete = True
+    for stay in results:
+        lines.append(f"🏨 {stay['city_name']} ({stay['check_in']} → {stay['check_out']})")
+        if stay["error"] is not None:
+            lines.append(f" Search failed: {stay['error']}\n")
+            complete = False
+            continue
+
+        hotels = top_k_hotels(parse_hotels(stay["response"]), 5)
+        if not hotels or not hotels[0].priced:
+            lines.append(" No hotels found for the selected criteria.\n")
+            complete = False
+            continue
+
+        cheapest_total += hotels[0].price
+        for idx, record in enumerate(hotels, start=1):
+            lines.append(format_single_hotel(record.hotel, idx))
+            lines.append("")
+
+    if complete:
+        lines.append(f" Cheapest combined stay: INR {round(cheapest_total, 2)}")
+    return "\n".join(lines)
@@ -0,0 +1,37 @@
+# helpers/hotel_model.py
+
+import heapq
+from operator import attrgetter
+from typing import List, Optional
+
+
+class HotelRecord:
+    """One bdsd hotel with its price and star rating normalized up front"""
+
+    __slots__ = ("hotel", "price", "rating")
+
+    def __init__(self, hotel: dict):
+        self.hotel = hotel
+        price = hotel.get("Price", {})
+        # Unpriced hotels rank last
+        self.price = price.get("OfferedPrice") or price.get("PublishedPrice") or float("inf")
+        try:
+            self.rating = float(hotel.get("StarRating"))
+        except (TypeError, ValueError):
+            self.rating = None
+
+    @property
+    def priced(self) -> bool:
+        return self.price != float("inf")
+
+
+def parse_hotels(api_response: Optional[dict]) -> List[HotelRecord]:
+    """Normalize every hotel in a search response once, in response order"""
+    return [HotelRecord(hotel) for hotel in (api_response or {}).get("Result") or []]
+
+
+def top_k_hotels(records: List[HotelRecord], k: int) -> List[HotelRecord]:
+    """The k cheapest hotels in ascending price via a bounded heap (ties keep response order)"""
+    if k <= 0:
+        return []
+    return heapq.nsmallest(k, records, key=attrgetter("price"))
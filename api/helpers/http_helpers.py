@@ -0,0 +1,34 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Pool sizing for the upstream APIs (bdsd, visa2fly); one pool per host
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Process-wide keep-alive session so upstream calls reuse TCP/TLS connections"""
+    global _session
+    if _session is not None:
+        return _session
+
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            # Retries stay in the helpers' own loops; the adapter only pools connections
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_CONNECTIONS,
+                pool_maxsize=HTTP_POOL_MAXSIZE,
+                max_retries=0,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+    return _session
@@ -0,0 +1,86 @@
+import threading
+import time
+from typing import Any
+
+import google.generativeai as genai
+
+from api.core.metrics import Counter, Histogram
+from api.core.structured_log import log_event
+from api.core.tracing import span
+
+
+LLM_CALLS = Counter(
+    "hajjibot_llm_calls_total", "Gemini calls per graph node and outcome", ("node", "outcome")
+)
+LLM_PROMPT_CHARS = Counter(
+    "hajjibot_llm_prompt_chars_total", "Prompt characters sent to Gemini per graph node", ("node",)
+)
+LLM_INPUT_TOKENS = Counter(
+    "hajjibot_llm_input_tokens_total", "Prompt tokens reported by Gemini usage metadata", ("node",)
+)
+LLM_OUTPUT_TOKENS = Counter(
+    "hajjibot_llm_output_tokens_total", "Candidate tokens reported by Gemini usage metadata", ("node",)
+)
+LLM_LATENCY = Histogram(
+    "hajjibot_llm_latency_seconds", "Gemini call latency per graph node", ("node",)
+)
+
+
+_models: dict = {}
+_models_lock = threading.Lock()
+
+
+def get_gemini_model(model_name: str) -> Any:
+    """One GenerativeModel per model name and process instead of one per request"""
+    model = _models.get(model_name)
+    if model is None:
+        with _models_lock:
+            model = _models.get(model_name)
+            if model is None:
+                model = _models[model_name] = genai.GenerativeModel(model_name)
+    return model
+
+
+def _usage_counts(response: Any) -> tuple[int | None, int | None]:
+    """Read token counts from usage metadata when the SDK/model provides them"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None, None
+    input_tokens = getattr(usage, "prompt_token_count", None)
+    output_tokens = getattr(usage, "candidates_token_count", None)
+    return input_tokens, output_tokens
+
+
+def _generate_content(model: Any, prompt: str, node: str) -> Any:
+    """model.generate_content with per-node token, latency and outcome accounting"""
+    start = time.perf_counter()
+    response = None
+    outcome = "ok"
+    try:
+        with span("llm"):
+            response = model.generate_content(prompt)
+        return response
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        latency = time.perf_counter() - start
+        input_tokens, output_tokens = _usage_counts(response) if response is not None else (None, None)
+
+        LLM_CALLS.inc(node=node, outcome=outcome)
+        LLM_PROMPT_CHARS.inc(len(prompt), node=node)
+        LLM_LATENCY.observe(latency, node=node)
+        if input_tokens:
+            LLM_INPUT_TOKENS.inc(input_tokens, node=node)
+        if output_tokens:
+            LLM_OUTPUT_TOKENS.inc(output_tokens, node=node)
+
+        log_event(
+            "llm_call",
+            node=node,
+            outcome=outcome,
+            prompt_chars=len(prompt),
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            latency_ms=round(latency * 1000, 1),
+        )
@@ -0,0 +1,174 @@
+# helpers/package_helpers.py
+
+import math
+import os
+from typing import Any, Dict, List, Optional
+
+from api.core.structured_log import log_event
+from api.core.tracing import span
+from api.helpers.concurrency import fan_out
+from api.helpers.flight_helpers import _fetch_flight_data
+from api.helpers.flight_model import parse_flights
+from api.helpers.hotel_helpers import _fetch_hotel_data
+from api.helpers.hotel_model import parse_hotels, top_k_hotels
+from api.helpers.visa_helpers import _build_price_digest, _fetch_visa_data
+
+
+# Where an Umrah package lands, stays and which visa it needs
+PACKAGE_ARRIVAL_CITY = os.getenv("PACKAGE_ARRIVAL_CITY", "Jeddah")
+PACKAGE_HOTEL_CITY = os.getenv("PACKAGE_HOTEL_CITY", "Makkah")
+PACKAGE_VISA_COUNTRY = os.getenv("PACKAGE_VISA_COUNTRY", "Saudi Arabia")
+PACKAGE_MAX_ADULTS_PER_ROOM = int(os.getenv("PACKAGE_MAX_ADULTS_PER_ROOM", "4"))
+# Visa purposes an Umrah trip can travel on ("Tourist", "Tourism", "Umrah")
+PACKAGE_VISA_PURPOSES = ("umrah", "touris")
+
+# Per-source deadlines (seconds); the quote uses whatever answered in time
+PACKAGE_DEADLINES = {
+    "flight": float(os.getenv("PACKAGE_FLIGHT_DEADLINE_SECONDS", "20")),
+    "hotel": float(os.getenv("PACKAGE_HOTEL_DEADLINE_SECONDS", "20")),
+    "visa": float(os.getenv("PACKAGE_VISA_DEADLINE_SECONDS", "8")),
+}
+
+
+def _package_room_guests(adults: int, children_ages: List[int]) -> List[Dict]:
+    """Spread adults over as few rooms as allowed; children stay in the first room"""
+    rooms = max(1, math.ceil(adults / PACKAGE_MAX_ADULTS_PER_ROOM))
+    room_guests = []
+    for idx in range(rooms):
+        room_adults = adults // rooms + (1 if idx < adults % rooms else 0)
+        ages = children_ages if idx == 0 else []
+        room_guests.append({"Adult": room_adults, "Child": len(ages), "ChildAge": ages})
+    return room_guests
+
+
+def _flight_quote(api_response: dict) -> Optional[Dict]:
+    flights = parse_flights(api_response)
+    if not len(flights):
+        return None
+    cheapest = flights.top_k(1)[0]
+    return {
+        "price": flights.cheapest_fares[cheapest]["PublishedPrice"],
+        "currency": "INR",
+        "label": flights.airline(cheapest) or None,
+    }
+
+
+def _hotel_quote(api_response: dict) -> Optional[Dict]:
+    cheapest = top_k_hotels(parse_hotels(api_response), 1)
+    if not cheapest or not cheapest[0].priced:
+        return None
+    return {"price": round(cheapest[0].price, 2), "currency": "INR", "label": cheapest[0].hotel.get("HotelName")}
+
+
+def _visa_quote(visa_data: dict, travellers: int) -> Optional[Dict]:
+    """Cheapest Umrah/tourist visa per traveller; without one, the cheapest of any purpose labelled as a lower bound"""
+    quotes = visa_data.get("displayQuotes") or []
+    umrah_quotes = [
+        quote for quote in quotes
+        if any(purpose in str(quote.get("purpose", "")).lower() for purpose in PACKAGE_VISA_PURPOSES)
+    ]
+    digest = _build_price_digest({"displayQuotes": umrah_quotes or quotes})
+    if digest["min_price"] is None:
+        return None
+    label = f"{digest['currency']} {digest['min_price']} x {travellers}"
+    if not umrah_quotes:
+        label += ", from the cheapest visa of any type"
+    return {
+        "price": digest["min_price"] * travellers,
+        "currency": digest["currency"],
+        "label": label,
+    }
+
+
+def _failure_reason(error: Optional[BaseException]) -> str:
+    if error is None:
+        return "no offers found"
+    if isinstance(error, TimeoutError):
+        return "no answer in time"
+    # First line only: city errors carry suggestions on the following lines
+    detail = str(error).strip().splitlines()
+    return f"not available ({detail[0]})" if detail else "not available"
+
+
+def _search_package(package_context: Dict, username: str, password: str, visa_token: str) -> Dict[str, Any]:
+    """
+    Flight, hotel and visa lookups run concurrently, each bounded by its
+    PACKAGE_DEADLINES entry → {source: {"quote", "error"}}
+    """
+    adults = package_context["adults"]
+    children_ages = package_context["children_ages"]
+    infants = sum(1 for age in children_ages if age < 2)
+    travellers = adults + len(children_ages)
+    room_guests = _package_room_guests(adults, children_ages)
+
+    tasks = {
+        "flight": lambda: _flight_quote(_fetch_flight_data(
+            adults=adults,
+            children=len(children_ages) - infants,
+            infants=infants,
+            departure_date=package_context["departure_date"],
+            origin=package_context["origin"],
+            destination=PACKAGE_ARRIVAL_CITY,
+            username=username,
+            password=password,
+            trip_type="two-way",
+            return_date=package_context["return_date"],
+        )),
+        "hotel": lambda: _hotel_quote(_fetch_hotel_data(
+            check_in=package_context["departure_date"],
+            check_out=package_context["return_date"],
+            city_name=PACKAGE_HOTEL_CITY,
+            rooms=len(room_guests),
+            room_guests=room_guests,
+            guest_nationality=package_context["nationality"],
+            username=username,
+            password=password,
+        )),
+        "visa": lambda: _visa_quote(_fetch_visa_data(PACKAGE_VISA_COUNTRY, visa_token), travellers),
+    }
+
+    with span("package_search"):
+        outcomes = fan_out(tasks, len(tasks), PACKAGE_DEADLINES)
+
+    log_event(
+        "package_search",
+        completed=[source for source, (quote, error) in outcomes.items() if error is None and quote],
+        failed={source: type(error).__name__ for source, (_, error) in outcomes.items() if error is not None},
+    )
+    return {source: {"quote": quote, "error": error} for source, (quote, error) in outcomes.items()}
+
+
+def _format_package_quote(package_context: Dict, results: Dict[str, Any]) -> str:
+    adults = package_context["adults"]
+    children = len(package_context["children_ages"])
+    travellers = f"{adults} adult(s)" + (f", {children} child(ren)" if children else "")
+
+    lines = [
+        f"🕋 Umrah package quote for {travellers}",
+        f" {package_context['origin']} → {PACKAGE_ARRIVAL_CITY}, "
+        f"{package_context['departure_date']} to {package_context['return_date']}\n",
+    ]
+    titles = {
+        "flight": "✈️ Return flight",
+        "hotel": f"🏨 Hotel in {PACKAGE_HOTEL_CITY}",
+        "visa": f"🛂 {PACKAGE_VISA_COUNTRY} visa",
+    }
+
+    totals: Dict[str, float] = {}
+    missing = []
+    for source, title in titles.items():
+        quote = results[source]["quote"]
+        if quote is None:
+            lines.append(f"{title}: {_failure_reason(results[source]['error'])}")
+            missing.append(source)
+            continue
+        label = f" ({quote['label']})" if quote["label"] else ""
+        lines.append(f"{title}: {quote['currency']} {quote['price']}{label}")
+        totals[quote["currency"]] = totals.get(quote["currency"], 0) + quote["price"]
+
+    if totals:
+        total_text = " + ".join(f"{currency} {round(amount, 2)}" for currency, amount in totals.items())
+        lines.append(f"\n Estimated total: {total_text}")
+    if missing:
+        lines.append(f" Not included in the total: {', '.join(missing)}")
+    return "\n".join(lines)
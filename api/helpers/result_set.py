@@ -0,0 +1,240 @@
+# helpers/result_set.py
+
+import os
+import re
+import time
+from typing import Dict, List, Optional
+
+from api.helpers.flight_helpers import _format_flight_details
+from api.helpers.flight_model import ParsedFlights, parse_flights
+from api.helpers.hotel_helpers import _format_hotel_details
+from api.helpers.hotel_model import parse_hotels, top_k_hotels
+
+
+# Last search per user, kept so follow-ups page/filter/sort locally
+RESULT_SET_MAX_ROWS = int(os.getenv("RESULT_SET_MAX_ROWS", "50"))
+RESULT_SET_TTL_SECONDS = float(os.getenv("RESULT_SET_TTL_SECONDS", "3600"))
+RESULT_PAGE_SIZE = int(os.getenv("RESULT_PAGE_SIZE", "5"))
+
+_SORTS = {
+    # key: (column, descending, label)
+    "price": ("price", False, "price"),
+    "duration": ("duration", False, "duration"),
+    "stops": ("stops", False, "fewest stops"),
+    "rating": ("rating", True, "star rating"),
+}
+# Sort only on explicit phrasing: "sort by duration", "cheapest first"
+_SORT_WORDS = {
+    "price": "price", "prices": "price", "fare": "price", "fares": "price", "cheapest": "price",
+    "duration": "duration", "travel time": "duration", "shortest": "duration", "fastest": "duration",
+    "quickest": "duration", "stops": "stops", "fewest stops": "stops",
+    "rating": "rating", "ratings": "rating", "stars": "rating", "best rated": "rating", "highest rated": "rating",
+}
+_SORT_ALTERNATIVES = "|".join(sorted(map(re.escape, _SORT_WORDS), key=len, reverse=True))
+_SORT_RE = re.compile(
+    rf"\b(?:sort|order)(?:ed)?\s+(?:them\s+|it\s+|results\s+)?by\s+(?:the\s+)?({_SORT_ALTERNATIVES})\b"
+    rf"|\b({_SORT_ALTERNATIVES})\s+first\b"
+)
+_MORE_RE = re.compile(r"\b(?:show|see|give me)\s+more\b|\bmore\s+(?:options|results|flights|hotels)\b|\bnext\s+(?:page|\d+|results|options)\b")
+_RESET_RE = re.compile(
+    r"\b(?:clear|reset|remove)\s+(?:the\s+)?filters?\b"
+    r"|\bshow\s+(?:me\s+)?all\s+(?:the\s+)?(?:results|options|flights|hotels)\b"
+)
+_DIRECT_RE = re.compile(r"\b(?:direct|non[- ]?stop)\s+(?:only|flights?|ones)\b|\bonly\s+(?:the\s+)?(?:direct|non[- ]?stop)\b")
+# Filters apply only to what follows "only" / "just" / "filter by" or precedes "only"
+_FILTER_RE = re.compile(
+    r"\b(?:only|just)\s+(?:show\s+(?:me\s+)?)?([a-z0-9' -]+)"
+    r"|\bfilter\s+(?:by|for|to)\s+([a-z0-9' -]+)"
+    r"|([a-z0-9' -]+?)\s+only\b"
+)
+_STARS_RE = re.compile(r"\b([1-5])\s*-?\s*stars?\b")
+# A question carrying its own search parameters starts a new search instead
+_NEW_SEARCH_RE = re.compile(r"\d{4}-\d{2}-\d{2}|\bfrom\s+\w+\s+to\s+\w+")
+_AIRLINE_NOISE = {"air", "airlines", "airline", "airways", "aviation", "international", "the"}
+
+
+def _new_result_set(kind: str, title: str, columns: Dict[str, list], cards: List[str]) -> Dict:
+    """
+    Columns drive filtering and sorting; the cards are split off into their own
+    field when the turn is persisted and loaded back only to render a page
+    """
+    return {
+        "kind": kind,
+        "title": title,
+        "created_at": time.time(),
+        "columns": columns,
+        "cards": cards,
+        "view": {"filters": {}, "sort": "price", "page": 0},
+    }
+
+
+def _build_flight_result_set(api_response: dict, title: str, parsed: Optional[ParsedFlights] = None) -> Optional[Dict]:
+    """Cheapest RESULT_SET_MAX_ROWS itineraries as columns + pre-rendered cards"""
+    parsed = parsed if parsed is not None else parse_flights(api_response)
+    rows = parsed.top_k(RESULT_SET_MAX_ROWS)
+    if not len(rows):
+        return None
+
+    columns: Dict[str, list] = {
+        "price": parsed.min_fare[rows].tolist(),
+        "stops": parsed.stops[rows].tolist(),
+        "airline": [parsed.airline(idx) for idx in rows],
+        "duration": parsed.duration[rows].tolist(),
+    }
+    cards = [_format_flight_details(parsed, idx) for idx in rows]
+    return _new_result_set("flight", title, columns, cards)
+
+
+def _build_hotel_result_set(api_response: dict, title: str) -> Optional[Dict]:
+    """Cheapest RESULT_SET_MAX_ROWS hotels as columns + pre-rendered cards"""
+    records = top_k_hotels(parse_hotels(api_response), RESULT_SET_MAX_ROWS)
+    if not records:
+        return None
+
+    columns: Dict[str, list] = {"price": [], "rating": [], "near_haram": []}
+    cards = []
+    for record in records:
+        hotel = record.hotel
+        location = f"{hotel.get('HotelName', '')} {hotel.get('HotelAddress', '')}".lower()
+        columns["price"].append(record.price if record.priced else None)
+        columns["rating"].append(record.rating)
+        columns["near_haram"].append("haram" in location)
+        cards.append(_format_hotel_details(hotel))
+    return _new_result_set("hotel", title, columns, cards)
+
+
+def _active_result_set(result_set: Optional[Dict]) -> Optional[Dict]:
+    if not result_set or time.time() - result_set.get("created_at", 0) > RESULT_SET_TTL_SECONDS:
+        return None
+    return result_set
+
+
+def _match_airline(text: str, airlines: List[str]) -> Optional[str]:
+    for airline in sorted(set(airlines), key=len, reverse=True):
+        lowered = airline.lower()
+        if not lowered:
+            continue
+        if lowered in text:
+            return airline
+        words = [w for w in re.findall(r"[a-z]+", lowered) if len(w) >= 4 and w not in _AIRLINE_NOISE]
+        if any(re.search(rf"\b{re.escape(w)}\b", text) for w in words):
+            return airline
+    return None
+
+
+def _filter_targets(text: str) -> str:
+    """The parts of the message a filter may come from ("only Saudia", "4-star only")"""
+    return " | ".join(next(group for group in match.groups() if group) for match in _FILTER_RE.finditer(text))
+
+
+def _parse_result_query(question: str, result_set: Dict) -> Optional[Dict]:
+    """
+    Follow-up command against the stored results → {"more", "reset", "filters", "sort"},
+    or None when the message is not explicitly about them ("show more",
+    "direct only", "only Saudia", "sort by duration")
+    """
+    text = question.lower()
+    if _NEW_SEARCH_RE.search(text):
+        return None
+
+    query: Dict = {"more": bool(_MORE_RE.search(text)), "reset": bool(_RESET_RE.search(text)), "filters": {}, "sort": None}
+    columns = result_set["columns"]
+    targets = _filter_targets(text)
+
+    if result_set["kind"] == "flight":
+        if _DIRECT_RE.search(text):
+            query["filters"]["direct"] = True
+        airline = _match_airline(targets, columns["airline"]) if targets else None
+        if airline:
+            query["filters"]["airline"] = airline
+    else:
+        stars = _STARS_RE.search(targets)
+        if stars:
+            query["filters"]["stars"] = int(stars.group(1))
+        if "haram" in targets:
+            query["filters"]["near_haram"] = True
+
+    sort = _SORT_RE.search(text)
+    if sort:
+        key = _SORT_WORDS[sort.group(1) or sort.group(2)]
+        if _SORTS[key][0] in columns:
+            query["sort"] = key
+
+    if not (query["more"] or query["reset"] or query["filters"] or query["sort"]):
+        return None
+    return query
+
+
+def _apply_result_query(result_set: Dict, query: Dict) -> Dict:
+    """New view (filters, sort, page) for the follow-up; the stored columns are shared, not copied"""
+    view = result_set["view"]
+    filters = {} if query["reset"] else dict(view["filters"])
+    filters.update(query["filters"])
+    sort = query["sort"] or ("price" if query["reset"] else view["sort"])
+
+    page = view["page"] + 1 if query["more"] and filters == view["filters"] and sort == view["sort"] else 0
+    return {**result_set, "view": {"filters": filters, "sort": sort, "page": page}}
+
+
+def _result_count(result_set: Dict) -> int:
+    return len(result_set["columns"]["price"])
+
+
+def _matching_rows(result_set: Dict) -> List[int]:
+    columns = result_set["columns"]
+    filters = result_set["view"]["filters"]
+    rows = range(_result_count(result_set))
+
+    if filters.get("direct"):
+        rows = [i for i in rows if columns["stops"][i] == 0]
+    if filters.get("airline"):
+        rows = [i for i in rows if columns["airline"][i] == filters["airline"]]
+    if filters.get("stars"):
+        rows = [i for i in rows if columns["rating"][i] is not None and int(columns["rating"][i]) == filters["stars"]]
+    if filters.get("near_haram"):
+        rows = [i for i in rows if columns["near_haram"][i]]
+
+    column, descending, _ = _SORTS[result_set["view"]["sort"]]
+    values = columns[column]
+    # Missing values (unpriced hotels, unknown ratings) always go last
+    return sorted(rows, key=lambda i: (values[i] is None, -(values[i] or 0) if descending else (values[i] or 0)))
+
+
+def _describe_view(view: Dict) -> str:
+    parts = []
+    filters = view["filters"]
+    if filters.get("direct"):
+        parts.append("direct only")
+    if filters.get("airline"):
+        parts.append(filters["airline"])
+    if filters.get("stars"):
+        parts.append(f"{filters['stars']}-star")
+    if filters.get("near_haram"):
+        parts.append("near Haram")
+    parts.append(f"sorted by {_SORTS[view['sort']][2]}")
+    return ", ".join(parts)
+
+
+def _render_result_page(result_set: Dict, cards: List[str]) -> str:
+    rows = _matching_rows(result_set)
+    view = result_set["view"]
+    noun = "flights" if result_set["kind"] == "flight" else "hotels"
+    if not rows:
+        return f"None of the {noun} from your last search ({result_set['title']}) match: {_describe_view(view)}."
+
+    start = view["page"] * RESULT_PAGE_SIZE
+    if start >= len(rows):
+        return f"That's all {len(rows)} matching {noun} ({_describe_view(view)})."
+
+    page_rows = rows[start:start + RESULT_PAGE_SIZE]
+    header = "✈️ Flight Option" if result_set["kind"] == "flight" else " Hotel Option"
+    lines = [
+        f" {result_set['title']}: showing {start + 1}–{start + len(page_rows)} of {len(rows)} {noun} "
+        f"({_describe_view(view)})\n"
+    ]
+    for rank, row in enumerate(page_rows, start=start + 1):
+        lines.append(f"{header} {rank}\n{cards[row]}")
+        lines.append("")
+    if start + len(page_rows) < len(rows):
+        lines.append(" Say \"show more\" for the next options.")
+    return "\n".join(lines)
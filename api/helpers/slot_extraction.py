@@ -0,0 +1,290 @@
+# helpers/slot_extraction.py
+
+import re
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+from api.data import hotel_city_resolver
+from api.data.airports import AIRPORT_LOOKUP
+from api.data.hotel_city_resolver import CITY_ALIASES, load_hotel_cities, resolve_hotel_city
+from api.data.visa_data import CITY_TO_IATA
+from api.helpers.flight_helpers import FLIGHT_FLEX_DEFAULT_DAYS
+from api.helpers.hotel_helpers import SPLIT_STAY_CITIES
+
+
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+# "2025-03-10 ±2", "+/- 2 days"
+_FLEX_RE = re.compile(r"(?:±|\+/-|\+-)\s*(\d+)")
+_NUMBER_WORDS = {
+    "no": 0, "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+_COUNT_LABELS = {
+    "adult": "adults", "adults": "adults",
+    "child": "children", "children": "children", "kid": "children", "kids": "children",
+    "room": "rooms", "rooms": "rooms",
+}
+# Only numbers with a label count: "2 adults", "no kids", "one room"
+_COUNT_RE = re.compile(
+    rf"\b(\d+|{'|'.join(_NUMBER_WORDS)})\s+({'|'.join(sorted(_COUNT_LABELS, key=len, reverse=True))})\b"
+)
+_NO_CHILDREN_RE = re.compile(r"\bwithout\s+(?:any\s+)?(?:kids|children)\b")
+# "aged 4 and 9", "ages 4, 9"; a number labelled as something else ("3 stars") ends the list
+_AGE = r"\d{1,2}\b(?!\s*-?\s*(?:stars?|adults?|child|children|kids?|rooms?|nights?)\b)"
+_AGES_RE = re.compile(rf"\b(?:ages?|aged)\s*(?:of\s+|are\s+|is\s+)?({_AGE}(?:\s*(?:,|and|&)\s*{_AGE})*)")
+# Not a bare "single": "a single room" says nothing about the trip
+_ONE_WAY_RE = re.compile(r"\bone[\s-]?way\b|\boneway\b|\bsingle[\s-]+(?:trip|journey)\b")
+_ROUND_TRIP_RE = re.compile(r"\bround[\s-]?trip\b|\breturn(?:ing)?\b|\btwo[\s-]?way\b")
+_STARS_RE = re.compile(r"\b([1-5])\s*-?\s*stars?\b")
+# "nationality: pk", "nationality is IN", "nationality SA"; without a separator the
+# code must be in capitals, so "what nationality is required" is not Iceland
+_NATIONALITY_RE = re.compile(r"\b(?i:nationality)\s*(?:(?:(?i:is)\s+|:\s*|-\s*)([A-Za-z]{2})|([A-Z]{2}))\b")
+# Upper case only, so "in passport" is not read as India
+_PASSPORT_RE = re.compile(r"\b([A-Z]{2})\s+(?:passport|national)")
+# Words that end a place name ("from Hyderabad on ...") or are never one
+_PLACE_STOPWORDS = {
+    "a", "an", "and", "at", "by", "for", "from", "in", "next", "on", "one", "please",
+    "return", "returning", "round", "the", "this", "to", "via", "with",
+}
+_PLACE_MAX_WORDS = 3
+
+
+def _is_iso_date(value: str) -> bool:
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _extract_dates(text: str) -> List[str]:
+    """Real calendar dates in message order; "2026-13-45" is left out"""
+    return [value for value in _DATE_RE.findall(text) if _is_iso_date(value)]
+
+
+def _invalid_date_note(text: str) -> Optional[str]:
+    """Why a date-shaped value in the message was not taken, to prefix the re-asked question"""
+    invalid = [value for value in _DATE_RE.findall(text) if not _is_iso_date(value)]
+    return f"{invalid[0]} is not a valid date." if invalid else None
+
+
+def _extract_flex_days(text: str) -> Optional[int]:
+    flex = _FLEX_RE.search(text)
+    if flex:
+        return int(flex.group(1))
+    return FLIGHT_FLEX_DEFAULT_DAYS if "flex" in text.lower() else None
+
+
+def _extract_counts(text: str) -> Dict[str, int]:
+    """Labelled counts → {"adults", "children", "rooms"}; the first mention of each wins"""
+    counts: Dict[str, int] = {}
+    lowered = text.lower()
+    for number, label in _COUNT_RE.findall(lowered):
+        slot = _COUNT_LABELS[label]
+        counts.setdefault(slot, int(number) if number.isdigit() else _NUMBER_WORDS[number])
+    if _NO_CHILDREN_RE.search(lowered):
+        counts.setdefault("children", 0)
+    return counts
+
+
+def _extract_children_ages(text: str) -> Optional[List[int]]:
+    ages = _AGES_RE.search(text.lower())
+    return [int(age) for age in re.findall(r"\d+", ages.group(1))] if ages else None
+
+
+def _extract_trip_type(text: str) -> Optional[str]:
+    lowered = text.lower()
+    if _ONE_WAY_RE.search(lowered):
+        return "one-way"
+    if _ROUND_TRIP_RE.search(lowered):
+        return "two-way"
+    return None
+
+
+def _extract_rating(text: str) -> Optional[int]:
+    stars = _STARS_RE.search(text.lower())
+    return int(stars.group(1)) if stars else None
+
+
+def _extract_nationality(text: str) -> Optional[str]:
+    match = _NATIONALITY_RE.search(text) or _PASSPORT_RE.search(text)
+    return match.group(match.lastindex).upper() if match else None
+
+
+def _is_airport(name: str) -> bool:
+    # Exact names only: fuzzy matching turns "to go" into Goa. Three-letter
+    # words count as airport codes only when typed in capitals ("JED", not "the").
+    lowered = re.sub(r"[-_]", " ", name.lower())
+    return (len(lowered) > 3 or name.isupper()) and (lowered in AIRPORT_LOOKUP or lowered in CITY_TO_IATA)
+
+
+def _is_hotel_city(name: str) -> bool:
+    load_hotel_cities()
+    lowered = name.lower()
+    return CITY_ALIASES.get(lowered, lowered) in hotel_city_resolver.CITY_LOOKUP
+
+
+def _extract_place(text: str, keyword: str, is_place: Callable[[str], bool]) -> Optional[str]:
+    """
+    Place named after a keyword ("from Hyderabad", "in Makkah"), as the user
+    typed it. The longest run of up to _PLACE_MAX_WORDS words that is_place
+    accepts wins.
+    """
+    # Lookahead, so "to book a flight ... to Jeddah" still reaches the second "to"
+    for match in re.finditer(rf"\b{keyword}\s+(?=([A-Za-z][A-Za-z' ]*))", text, re.IGNORECASE):
+        words = []
+        for word in match.group(1).split():
+            if word.lower() in _PLACE_STOPWORDS or len(words) == _PLACE_MAX_WORDS:
+                break
+            words.append(word)
+        for size in range(len(words), 0, -1):
+            candidate = " ".join(words[:size])
+            if is_place(candidate):
+                return candidate
+    return None
+
+
+def _assign_in_order(context: Dict, keys: List[str], values: List) -> List[str]:
+    """
+    Values for ordered slots: a full set maps one to one, a partial one goes to
+    the first slots still missing. Filled slots are never overwritten.
+    """
+    filled = []
+    if len(values) >= len(keys):
+        pairs = zip(keys, values)
+    else:
+        pairs = zip([key for key in keys if context.get(key) is None], values)
+    for key, value in pairs:
+        if context.get(key) is None:
+            context[key] = value
+            filled.append(key)
+    return filled
+
+
+def _dates_in_order(start: str, end: str, same_day: bool) -> bool:
+    first, second = date.fromisoformat(start), date.fromisoformat(end)
+    return second > first or (same_day and second == first)
+
+
+def _assign_date_pair(
+    context: Dict, keys: List[str], dates: List[str], same_day: bool, order_note: str
+) -> Tuple[List[str], Optional[str]]:
+    """
+    _assign_in_order for (start, end) date slots → (slots filled, order_note or None).
+    An end before the start (or on it, unless same_day) is refused: the slots
+    this message filled are emptied again so they are re-asked.
+    """
+    filled = _assign_in_order(context, keys, dates)
+    if len(keys) < 2 or not filled or None in (context.get(keys[0]), context.get(keys[1])):
+        return filled, None
+    if _dates_in_order(context[keys[0]], context[keys[1]], same_day):
+        return filled, None
+    for key in filled:
+        context[key] = None
+    return [], order_note
+
+
+def _fill_counts(context: Dict, text: str, slots: tuple) -> List[str]:
+    filled = []
+    for slot, value in _extract_counts(text).items():
+        if slot in slots and context.get(slot) is None and (value > 0 or slot == "children"):
+            context[slot] = value
+            filled.append(slot)
+    if "children" in filled and context["children"] == 0:
+        context["children_ages"] = []
+
+    ages = _extract_children_ages(text)
+    if ages and context.get("children") and not context.get("children_ages") and len(ages) == context["children"]:
+        context["children_ages"] = ages
+        filled.append("children_ages")
+    return filled
+
+
+def _fill_flight_slots(flight_context: Dict, question: str) -> Tuple[List[str], Optional[str]]:
+    """
+    Every flight slot the message states that is still missing → (names of the
+    slots filled, why a date in it was not taken)
+    """
+    filled = []
+    if flight_context.get("trip_type") is None:
+        trip_type = _extract_trip_type(question)
+        if trip_type:
+            flight_context["trip_type"] = trip_type
+            filled.append("trip_type")
+
+    filled += _fill_counts(flight_context, question, ("adults", "children"))
+
+    date_slots = ["departure_date"] if flight_context.get("trip_type") == "one-way" else ["departure_date", "return_date"]
+    dates, note = _assign_date_pair(
+        flight_context, date_slots, _extract_dates(question),
+        same_day=True, order_note="The return date can't be before the departure date.",
+    )
+    if "departure_date" in dates:
+        flight_context["flex_days"] = _extract_flex_days(question)
+    if "return_date" in dates and flight_context.get("trip_type") is None:
+        flight_context["trip_type"] = "two-way"
+        dates.append("trip_type")
+    filled += dates
+
+    for slot, keyword in (("departure_city", "from"), ("arrival_city", "to")):
+        if flight_context.get(slot) is None:
+            place = _extract_place(question, keyword, _is_airport)
+            if place:
+                flight_context[slot] = place
+                filled.append(slot)
+    return filled, note or _invalid_date_note(question)
+
+
+def _fill_hotel_slots(hotel_context: Dict, question: str) -> Tuple[List[str], Optional[str]]:
+    """
+    Every hotel slot the message states that is still missing → (names of the
+    slots filled, why a date in it was not taken)
+    """
+    filled = []
+    note = None
+    order_note = "The check-out date must be after the check-in date."
+    dates = _extract_dates(question)
+    if hotel_context.get("split_stay"):
+        # Date ranges go to Makkah then Madinah, whichever still lack one
+        booked = {stay["city_name"] for stay in hotel_context["stays"]}
+        missing = [city for city in SPLIT_STAY_CITIES if city not in booked]
+        ranges = list(zip(dates[0::2], dates[1::2]))
+        if len(ranges) >= len(SPLIT_STAY_CITIES):
+            ranges = [r for city, r in zip(SPLIT_STAY_CITIES, ranges) if city in missing]
+        for city, (check_in, check_out) in zip(missing, ranges):
+            if not _dates_in_order(check_in, check_out, same_day=False):
+                note = order_note
+                continue
+            hotel_context["stays"].append({"city_name": city, "check_in": check_in, "check_out": check_out})
+            filled.append(f"stay:{city}")
+        if filled:
+            hotel_context["city_name"] = " + ".join(SPLIT_STAY_CITIES)
+    else:
+        dates, note = _assign_date_pair(
+            hotel_context, ["check_in", "check_out"], dates, same_day=False, order_note=order_note,
+        )
+        filled += dates
+        if hotel_context.get("city_id") is None:
+            place = _extract_place(question, "in", _is_hotel_city)
+            if place:
+                city_info = resolve_hotel_city(place)
+                hotel_context["city_name"] = place
+                hotel_context["city_id"] = city_info["city_id"]
+                hotel_context["country_code"] = city_info["country_code"]
+                filled.append("city_name")
+
+    filled += _fill_counts(hotel_context, question, ("rooms", "adults", "children"))
+
+    if hotel_context.get("rating") is None:
+        rating = _extract_rating(question)
+        if rating:
+            hotel_context["rating"] = hotel_context["max_rating"] = rating
+            hotel_context["min_rating"] = 1
+            filled.append("rating")
+
+    if hotel_context.get("guest_nationality") is None:
+        nationality = _extract_nationality(question)
+        if nationality:
+            hotel_context["guest_nationality"] = nationality
+            filled.append("guest_nationality")
+    return filled, note or _invalid_date_note(question)
@@ -1,13 +1,32 @@
 # helpers/visa_helpers.py
 
-import requests
+import os
 from typing import Optional, Any
 from flask import current_app as app
 
 from api.data.visa_data import VISA_EXPERT_DISCLAIMER
 from api.data.visa_data import VISA_COUNTRY_LOOKUP
+from api.helpers.visa_index import _rank_visa_sections
+from api.helpers.llm_helpers import _generate_content
+from api.core.structured_log import log_event, log_payload
+from api.core.tracing import span
+from api.helpers.http_helpers import get_http_session
 
 
+# Overridable so load tests can point at a local stand-in
+VISA2FLY_API_BASE_URL = os.getenv("VISA2FLY_API_BASE_URL", "https://devapi.visa2fly.com").rstrip("/")
+
+# Number of (purpose, entry type, stay period) price lines kept in the digest
+PRICE_DIGEST_TOP_QUOTES = int(os.getenv("PRICE_DIGEST_TOP_QUOTES", "4"))
+
+_PRICE_TERMS = ("price", "prices", "cost", "costs", "fee", "fees", "charge", "charges", "how much")
+# Questions with these terms need free-form reasoning over the prices → LLM path
+_PRICE_REASONING_TERMS = (
+    "why", "compare", "comparison", "difference", "differ", "which", "should",
+    "recommend", "explain", "versus", " vs", "better", "total", "per person",
+    "for my", "family", "children", "kids", "include", "refund",
+)
+
 
 def _extract_country(text: str) -> Optional[str]:
     lowered = text.lower()
@@ -60,46 +79,94 @@ def _is_empty_visa_snippet(snippet: dict) -> bool:
 
 
 def _fetch_visa_data(country: str, token: str) -> dict:
-    url = f"https://devapi.visa2fly.com/api/b2b/partner/visa/{country}"
-    response = requests.get(
-        url,
-        headers={
-            "token": token,
-            "Content-Type": "application/json",
-        },
-        timeout=15,
-    )
-    app.logger.info("visa_api status=%s url=%s", response.status_code, url)
+    url = f"{VISA2FLY_API_BASE_URL}/api/b2b/partner/visa/{country}"
+    with span("upstream_visa"):
+        response = get_http_session().get(
+            url,
+            headers={
+                "token": token,
+                "Content-Type": "application/json",
+            },
+            timeout=15,
+        )
+    log_event("visa_api", status=response.status_code, country=country)
     response.raise_for_status()
     payload = response.json()
-    app.logger.info("visa_api payload=%s", payload)
+    log_payload("visa_api_payload", payload, country=country)
     if payload.get("code") != "0":
         raise ValueError(payload.get("message") or "Visa API returned an error")
     return payload.get("data", {})
 
 
 
-def _format_price_summary(visa_data: dict, country: str) -> str:
-    quotes = visa_data.get("displayQuotes", [])
-    if not quotes:
+def _build_price_digest(visa_data: dict) -> dict:
+    """
+    Precompute the price facts used by every price answer, once per visa fetch:
+    minimum basePrice, currency and the cheapest quote per (purpose, entry type, stay period)
+    """
+    quotes = visa_data.get("displayQuotes", []) or []
+    default_currency = quotes[0].get("currency", "") if quotes else ""
+
+    cheapest: dict = {}
+    for quote in quotes:
+        base_price = quote.get("basePrice")
+        if not isinstance(base_price, (int, float)):
+            continue
+        key = (quote.get("purpose", ""), quote.get("entryType", ""), quote.get("stayPeriod", ""))
+        if key not in cheapest or base_price < cheapest[key]["price"]:
+            cheapest[key] = {
+                "purpose": key[0],
+                "entry_type": key[1],
+                "stay_period": key[2],
+                "price": base_price,
+                "currency": quote.get("currency", default_currency),
+            }
+
+    top_quotes = sorted(cheapest.values(), key=lambda q: q["price"])[:PRICE_DIGEST_TOP_QUOTES]
+    min_quote = top_quotes[0] if top_quotes else None
+
+    return {
+        "min_price": min_quote["price"] if min_quote else None,
+        "currency": min_quote["currency"] if min_quote else default_currency,
+        "quotes": top_quotes,
+        "lines": [
+            f"{q['purpose']} ({q['entry_type']}, {q['stay_period']}): {q['currency']} {q['price']}"
+            for q in top_quotes
+        ],
+    }
+
+
+def _is_price_question(question: str) -> bool:
+    lowered = question.lower()
+    return any(term in lowered for term in _PRICE_TERMS)
+
+
+def _needs_price_reasoning(question: str) -> bool:
+    lowered = f" {question.lower()}"
+    return any(term in lowered for term in _PRICE_REASONING_TERMS)
+
+
+def _price_answer_mode(question: str) -> Optional[str]:
+    """
+    "template" for plain price questions, "reasoning" for price questions the
+    LLM has to reason over, None when the question is not about prices at all
+    """
+    if not _is_price_question(question):
+        return None
+    return "reasoning" if _needs_price_reasoning(question) else "template"
+
+
+def _format_price_summary(visa_data: dict, country: str, digest: Optional[dict] = None) -> str:
+    """Template price answer from the precomputed digest (no LLM call)"""
+    digest = digest or _build_price_digest(visa_data)
+    if not digest["quotes"]:
         return _generic_visa_response(country, "price")
-    lowest_price = min(
-        (quote.get("basePrice") for quote in quotes if isinstance(quote.get("basePrice"), (int, float))),
-        default=None,
+
+    joined = "; ".join(digest["lines"][:3])
+    low_text = (
+        f"Prices start as low as {digest['currency']} {digest['min_price']}."
+        if digest["min_price"] is not None else ""
     )
-    currency = quotes[0].get("currency", "") if quotes else ""
-    lines = []
-    for quote in quotes[:3]:
-        currency = quote.get("currency", currency)
-        base_price = quote.get("basePrice", "")
-        purpose = quote.get("purpose", "")
-        entry_type = quote.get("entryType", "")
-        stay_period = quote.get("stayPeriod", "")
-        lines.append(
-            f"{purpose} ({entry_type}, {stay_period}): {currency} {base_price}"
-        )
-    joined = "; ".join([line for line in lines if line.strip()])
-    low_text = f"Prices start as low as {currency} {lowest_price}." if lowest_price is not None else ""
     return (
         f"Yes, we provide visa services for {country}. {low_text} "
         f"Here are current prices: {joined}."
@@ -107,7 +174,7 @@ def _format_price_summary(visa_data: dict, country: str) -> str:
 
 
 
-def _visa_context_snippet(question: str, visa_data: dict) -> dict:
+def _visa_context_snippet(question: str, visa_data: dict, country: Optional[str] = None) -> dict:
     lowered = question.lower()
     if "document" in lowered or "requirement" in lowered:
         return {"documentRequired": visa_data.get("documentRequired", {})}
@@ -117,26 +184,23 @@ def _visa_context_snippet(question: str, visa_data: dict) -> dict:
         return {"importantInfo": visa_data.get("importantInfo", [])}
     if "price" in lowered or "cost" in lowered or "fee" in lowered:
         return {"displayQuotes": visa_data.get("displayQuotes", [])}
-    return visa_data
-
-
-def _format_price_with_ai(model: Any, visa_data: dict, country: str, question: str) -> str:
-    quotes = visa_data.get("displayQuotes", [])[:5]
-    if not quotes:
+    # No keyword → only the BM25-ranked chunks that fit the token budget
+    return {"relevantSections": _rank_visa_sections(question, visa_data, country)}
+
+
+def _format_price_with_ai(
+    model: Any,
+    visa_data: dict,
+    country: str,
+    question: str,
+    digest: Optional[dict] = None,
+) -> str:
+    digest = digest or _build_price_digest(visa_data)
+    if not digest["quotes"]:
         raise ValueError("No pricing data")
-    min_price = min(
-        (quote.get("basePrice") for quote in quotes if isinstance(quote.get("basePrice"), (int, float))),
-        default=None,
-    )
-    currency = quotes[0].get("currency", "") if quotes else ""
-    price_lines = []
-    for quote in quotes[:4]:
-        purpose = quote.get("purpose", "")
-        entry_type = quote.get("entryType", "")
-        stay_period = quote.get("stayPeriod", "")
-        base_price = quote.get("basePrice", "")
-        quote_currency = quote.get("currency", currency)
-        price_lines.append(f"{purpose} ({entry_type}, {stay_period}): {quote_currency} {base_price}")
+    min_price = digest["min_price"]
+    currency = digest["currency"]
+    price_lines = digest["lines"]
     prompt = (
         "You are a visa assistant. Use only the provided pricing data. "
         "Reply to the user's question, confirm we provide visa services for the country, "
@@ -148,7 +212,7 @@ def _format_price_with_ai(model: Any, visa_data: dict, country: str, question: s
         f"Price Lines: {price_lines}\n"
         f"User Question: {question}\n"
     )
-    response = model.generate_content(prompt)
+    response = _generate_content(model, prompt, "format_price")
     answer = response.text
     if not any(char.isdigit() for char in answer):
         raise ValueError("AI response missing prices")
@@ -0,0 +1,169 @@
+# helpers/visa_index.py
+
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Optional
+
+
+# Sections of the visa2fly payload that are split into retrievable chunks
+VISA_INDEX_SECTIONS = ("documentRequired", "faqs", "importantInfo", "displayQuotes")
+
+# Rough prompt budget for the packed visa context (≈4 characters per token)
+VISA_CONTEXT_TOKEN_BUDGET = int(os.getenv("VISA_CONTEXT_TOKEN_BUDGET", "600"))
+VISA_CONTEXT_MAX_CHUNKS = int(os.getenv("VISA_CONTEXT_MAX_CHUNKS", "8"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for",
+    "from", "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "the",
+    "to", "we", "what", "when", "which", "with", "you", "your",
+}
+
+# country -> VisaSectionIndex, rebuilt whenever fresh visa data is fetched
+VISA_INDEX_CACHE: dict = {}
+_VISA_INDEX_LOCK = threading.Lock()
+
+
+def _tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def _flatten_value(value: Any) -> str:
+    """Render a nested dict/list as compact 'key: value' text"""
+    if isinstance(value, dict):
+        parts = [f"{k}: {_flatten_value(v)}" for k, v in value.items() if v not in (None, "", [], {})]
+        return "; ".join(parts)
+    if isinstance(value, list):
+        return "; ".join(_flatten_value(v) for v in value if v not in (None, "", [], {}))
+    return str(value).strip()
+
+
+def _split_section(section: str, value: Any) -> list[str]:
+    """One chunk per list item / dict entry, keeping the parent key as a prefix"""
+    chunks = []
+    if value in (None, "", [], {}):
+        # Section missing from this country's payload → nothing to index, not "None"
+        return chunks
+    if isinstance(value, list):
+        for item in value:
+            text = _flatten_value(item)
+            if text:
+                chunks.append(text)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            if isinstance(item, list):
+                for sub in item:
+                    text = _flatten_value(sub)
+                    if text:
+                        chunks.append(f"{key}: {text}")
+            else:
+                text = _flatten_value(item)
+                if text:
+                    chunks.append(f"{key}: {text}")
+    else:
+        text = _flatten_value(value)
+        if text:
+            chunks.append(text)
+    return chunks
+
+
+class VisaSectionIndex:
+    """BM25 index over the chunked sections of one country's visa data"""
+
+    __slots__ = ("chunks", "term_freqs", "doc_lens", "avgdl", "idf")
+
+    def __init__(self, visa_data: dict):
+        self.chunks: list[tuple[str, str]] = []
+        for section in VISA_INDEX_SECTIONS:
+            for text in _split_section(section, visa_data.get(section)):
+                self.chunks.append((section, text))
+
+        self.term_freqs = [Counter(_tokenize(text)) for _, text in self.chunks]
+        self.doc_lens = [sum(tf.values()) for tf in self.term_freqs]
+        self.avgdl = (sum(self.doc_lens) / len(self.doc_lens)) if self.doc_lens else 0.0
+
+        doc_freq: Counter = Counter()
+        for tf in self.term_freqs:
+            doc_freq.update(tf.keys())
+        n = len(self.chunks)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    def rank(self, question: str, k1: float = 1.5, b: float = 0.75) -> list[tuple[float, int]]:
+        terms = [t for t in set(_tokenize(question)) if t in self.idf]
+        if not terms:
+            return []
+
+        scored = []
+        for idx, tf in enumerate(self.term_freqs):
+            norm = k1 * (1 - b + b * self.doc_lens[idx] / (self.avgdl or 1))
+            score = 0.0
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self.idf[term] * freq * (k1 + 1) / (freq + norm)
+            if score > 0:
+                scored.append((score, idx))
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return scored
+
+    def pack(self, question: str, token_budget: int = VISA_CONTEXT_TOKEN_BUDGET) -> list[dict]:
+        """Top-ranked chunks that fit in the token budget, in ranking order"""
+        order = [idx for _, idx in self.rank(question)]
+        if not order:
+            # Nothing matched → give the model the head of every section instead of everything
+            seen = set()
+            for idx, (section, _) in enumerate(self.chunks):
+                if section not in seen:
+                    seen.add(section)
+                    order.append(idx)
+
+        packed = []
+        used = 0
+        for idx in order[:VISA_CONTEXT_MAX_CHUNKS]:
+            section, text = self.chunks[idx]
+            cost = _estimate_tokens(text)
+            if used + cost > token_budget:
+                if packed:
+                    continue
+                # Always return at least one (truncated) chunk
+                text = text[: token_budget * 4]
+                cost = token_budget
+            packed.append({"section": section, "text": text})
+            used += cost
+        return packed
+
+
+def _build_visa_section_index(country: str, visa_data: dict) -> VisaSectionIndex:
+    """Build (or rebuild) the section index for freshly fetched visa data"""
+    index = VisaSectionIndex(visa_data or {})
+    with _VISA_INDEX_LOCK:
+        VISA_INDEX_CACHE[country] = index
+    return index
+
+
+def _get_visa_section_index(country: str, visa_data: dict) -> VisaSectionIndex:
+    index = VISA_INDEX_CACHE.get(country)
+    if index is None:
+        # Visa context restored from Mongo on a fresh instance → build once here
+        index = _build_visa_section_index(country, visa_data)
+    return index
+
+
+def _rank_visa_sections(question: str, visa_data: dict, country: Optional[str]) -> list[dict]:
+    index = (
+        _get_visa_section_index(country, visa_data)
+        if country
+        else VisaSectionIndex(visa_data or {})
+    )
+    return index.pack(question)
@@ -3,7 +3,8 @@ from flask_cors import CORS
 from dotenv import load_dotenv
 import logging
 
-from api.routes.chat_routes import chat_bp
+from api.routes.chat_routes import chat_bp, GEMINI_API_KEY, GEMINI_MODEL
+from api.core.warmup import WARMUP_ON_STARTUP, start_background_warmup
 
 
 
@@ -21,6 +22,10 @@ def root():
 
 app.register_blueprint(chat_bp, url_prefix="/api")
 
+# Optional startup hook: preload datasets and clients without blocking the import
+if WARMUP_ON_STARTUP:
+    start_background_warmup(GEMINI_MODEL if GEMINI_API_KEY else None)
+
 
 # For local development
 # if __name__ == '__main__':
@@ -1,4 +1,5 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import google.generativeai as genai
 import os
@@ -7,18 +8,34 @@ from typing import Optional
 
 
 ## Initialize MongoDB
-from pymongo import  errors
-from api.db.mongo import init_mongo
+from api.db.mongo import get_writable_users_collection
+from api.db.persistence_queue import PERSISTENCE_QUEUE
+from api.db.session_cache import HISTORY_LIMIT, RESULT_CARDS_FIELD, _set_path
+from api.db.user_repository import get_user_repository
 
 
 
 ## Initialize Chat Graph
-from api.core.chat_graph import CHAT_GRAPH, ChatState
+from api.core.admission import ADMISSION, ADMISSIONS, CHAT_OVERLOAD_RETRY_AFTER, Rejection
+from api.core.chat_graph import ChatState, run_chat_turn
+from api.core.metrics import render_prometheus
+from api.core.search_jobs import SEARCH_JOBS
+from api.core.tracing import finish_request, span, start_request
+from api.core.warmup import warm_up
+from api.helpers.llm_helpers import get_gemini_model
 
 
 chat_bp = Blueprint("chat", __name__, url_prefix="/api")
 
-users_collection, mongo_ready, mongo_error = init_mongo()
+# Mongo client is created lazily on the first request that needs it; no writes
+# go out until the unique email index exists (python -m api.db.migrate)
+PERSISTENCE_QUEUE.configure(get_writable_users_collection)
+
+# Serverless instances may be frozen right after the response, so drain the queue
+# on close there; long-lived servers leave it to the background worker.
+PERSISTENCE_FLUSH_ON_CLOSE = os.getenv(
+    "PERSISTENCE_FLUSH_ON_CLOSE", "true" if os.getenv("VERCEL") else "false"
+).lower() in ("1", "true", "yes")
 
 # Configure Gemini API
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -38,13 +55,31 @@ def _unquote_env(val: Optional[str]) -> Optional[str]:
 PUBLIC_TTS_API_USERNAME = _unquote_env(os.getenv("PUBLIC_TTS_API_USERNAME"))
 PUBLIC_TTS_API_PASSWORD = _unquote_env(os.getenv("PUBLIC_TTS_API_PASSWORD"))
 
+# /api/chat/batch limits: items per call and conversations run concurrently
+CHAT_BATCH_MAX_ITEMS = int(os.getenv("CHAT_BATCH_MAX_ITEMS", "100"))
+CHAT_BATCH_WORKERS = int(os.getenv("CHAT_BATCH_WORKERS", "8"))
+
+@chat_bp.before_request
+def _start_request_timing():
+    start_request()
+
+
+@chat_bp.after_request
+def _add_server_timing(response):
+    return finish_request(response, request.endpoint or "unknown")
+
+
 @chat_bp.route('/')
 def home():
     return jsonify({
         "status": "success",
         "message": "Marhaba Haji API is running",
         "endpoints": {
-            "/api/chat": "POST - Send questions about Marhaba Haji services"
+            "/api/chat": "POST - Send questions about Marhaba Haji services",
+            "/api/chat/batch": "POST - {items: [{question, name, email}, ...]} processed concurrently",
+            "/api/search/<id>": "GET - Poll a flight/hotel search started by the chat (SEARCH_JOBS_ENABLED)",
+            "/api/metrics": "GET - Prometheus metrics (request/stage latency, LLM tokens per graph node)",
+            "/api/warmup": "GET - Preload datasets and clients (for scheduled keep-warm pings)"
         }
     })
 
@@ -56,6 +91,221 @@ def health():
     })
 
 
+@chat_bp.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+@chat_bp.route('/search/<job_id>', methods=['GET'])
+def search_job(job_id):
+    job = SEARCH_JOBS.get(job_id)
+    if job is None:
+        return jsonify({
+            "status": "error",
+            "message": "Unknown or expired search id"
+        }), 404
+    return jsonify({
+        "status": "success",
+        "search_id": job["id"],
+        "kind": job["kind"],
+        "state": job["status"],
+        "answer": job["answer"],
+        "error": job["error"],
+    })
+
+
+@chat_bp.route('/warmup', methods=['GET', 'POST'])
+def warmup():
+    result = warm_up(GEMINI_MODEL if GEMINI_API_KEY else None)
+    return jsonify({
+        "status": "warm" if not result["errors"] else "partial",
+        **result,
+    })
+
+
+def _graph_state_for(question: str, name: str, user_state: dict, model, load_result_cards=None) -> ChatState:
+    history = user_state.get("history") or []
+    flight_context = user_state.get("flight_context")
+    hotel_context = user_state.get("hotel_context")
+    package_context = user_state.get("package_context")
+    return {
+        "question": question,
+        "name": name,
+        "history": history,
+        "is_first_message": len(history) == 0,
+        "visa_context": user_state.get("visa_context"),
+        "flight_context": flight_context,
+        "flight_question_index": flight_context.get("flight_question_index", 0) if flight_context else 0,
+        "hotel_context": hotel_context,
+        "hotel_question_index": hotel_context.get("hotel_question_index", 0) if hotel_context else 0,
+        "package_context": package_context,
+        "package_question_index": package_context.get("package_question_index", 0) if package_context else 0,
+        "result_set": user_state.get("result_set"),
+        "load_result_cards": load_result_cards,
+        "model": model,
+    }
+
+
+def _turn_writes(question: str, answer_text: str, result_state: dict) -> dict:
+    """set/unset fields and history entries to persist for one finished turn"""
+    set_fields = {}
+    unset_fields = []
+
+    updated_visa_context = result_state.get("visa_context")
+    if result_state.get("visa_context_updated") and updated_visa_context:
+        set_fields["visa_context"] = {
+            "country": updated_visa_context.get("country"),
+            "data": updated_visa_context.get("data"),
+            "price_digest": updated_visa_context.get("price_digest"),
+            "fetched_at": datetime.utcnow(),
+        }
+
+    updated_flight_context = result_state.get("flight_context")
+    # Save flight_context on every message during flight booking (not just at the end)
+    if updated_flight_context:
+        set_fields["flight_context"] = {
+            "trip_type": updated_flight_context.get("trip_type"),      # ✅ ADD
+            "return_date": updated_flight_context.get("return_date"),  # ✅ ADD
+            "adults": updated_flight_context.get("adults"),
+            "children": updated_flight_context.get("children"),
+            "children_ages": updated_flight_context.get("children_ages"),
+            "departure_date": updated_flight_context.get("departure_date"),
+            "departure_city": updated_flight_context.get("departure_city"),
+            "arrival_city": updated_flight_context.get("arrival_city"),
+            "flex_days": updated_flight_context.get("flex_days"),
+            "flight_question_index": result_state.get("flight_question_index", 0),
+            "results": updated_flight_context.get("results", []),
+            "fetched_at": datetime.utcnow(),
+        }
+    else:
+        unset_fields.append("flight_context")
+
+    updated_hotel_context = result_state.get("hotel_context")
+    if updated_hotel_context:
+        set_fields["hotel_context"] = {
+            **updated_hotel_context,
+            "hotel_question_index": result_state.get("hotel_question_index", 0),
+            "fetched_at": datetime.utcnow(),
+        }
+    else:
+        unset_fields.append("hotel_context")
+
+    updated_package_context = result_state.get("package_context")
+    if updated_package_context:
+        set_fields["package_context"] = {
+            **updated_package_context,
+            "package_question_index": result_state.get("package_question_index", 0),
+            "fetched_at": datetime.utcnow(),
+        }
+    else:
+        unset_fields.append("package_context")
+
+    # Rewritten only when a search replaced it; its cards go to their own field,
+    # outside the per-turn projection, and follow-ups $set just the view
+    if result_state.get("result_set_updated"):
+        result_set = dict(result_state.get("result_set") or {})
+        if result_set:
+            cards = result_set.pop("cards", None)
+            set_fields["result_set"] = result_set
+            if cards is not None:
+                set_fields[RESULT_CARDS_FIELD] = cards
+        else:
+            unset_fields.extend(["result_set", RESULT_CARDS_FIELD])
+    elif result_state.get("result_view_updated") and result_state.get("result_set"):
+        set_fields["result_set.view"] = result_state["result_set"]["view"]
+
+    return {
+        "set_fields": set_fields,
+        "unset_fields": tuple(unset_fields),
+        "history_entries": [
+            {
+                "role": "user",
+                "text": question,
+                "at": datetime.utcnow(),
+            },
+            {
+                "role": "assistant",
+                "text": answer_text,
+                "at": datetime.utcnow(),
+            },
+        ],
+    }
+
+
+def _run_turn(
+    question: str, name: str, user_state: dict, model, load_result_cards=None
+) -> tuple[str, dict, Optional[dict]]:
+    """Run the chat graph for one message → (answer, writes for save_turn, queued search job)"""
+    with span("graph"):
+        result_state = run_chat_turn(_graph_state_for(question, name, user_state, model, load_result_cards))
+    answer_text = result_state.get("answer", "Sorry, I could not process that request.")
+    return answer_text, _turn_writes(question, answer_text, result_state), result_state.get("search_job")
+
+
+def _apply_turn_locally(user_state: dict, writes: dict) -> dict:
+    """Same effect as save_turn on a loaded state, for consecutive messages of one user in a batch"""
+    updated = dict(user_state)
+    for field, value in writes["set_fields"].items():
+        _set_path(updated, field, value)
+    for field in writes["unset_fields"]:
+        updated[field] = None
+    updated["history"] = ((updated.get("history") or []) + writes["history_entries"])[-HISTORY_LIMIT:]
+    return updated
+
+
+def _too_many_requests(rejection: Rejection):
+    response = jsonify({
+        "status": "error",
+        "message": "Too many requests, please retry shortly",
+        "reason": rejection.reason,
+    })
+    response.status_code = 429
+    response.headers["Retry-After"] = str(rejection.retry_after)
+    return response
+
+
+def _answer_chat(user_question: str, user_name: str, user_email: str):
+    user_repository = get_user_repository()
+    mongo_ready, mongo_error = user_repository.status()
+    if not mongo_ready:
+        return jsonify({
+            "status": "error",
+            "message": f"MongoDB is not configured or unreachable. Check MONGO_URI. {mongo_error}"
+        }), 500
+
+    try:
+        with span("mongo_read"):
+            user_state = user_repository.load(user_email)
+    except Exception as db_error:
+        return jsonify({
+            "status": "error",
+            "message": f"Database error: {db_error}"
+        }), 500
+
+    # Gemini model (created once per process, see /api/warmup)
+    model = get_gemini_model(GEMINI_MODEL)
+
+    answer_text, writes, search_job = _run_turn(
+        user_question, user_name, user_state, model,
+        load_result_cards=lambda: user_repository.load_result_cards(user_email),
+    )
+
+    with span("mongo_write"):
+        user_repository.save_turn(user_email, user_name, **writes)
+
+    body = {
+        "status": "success",
+        "question": user_question,
+        "answer": answer_text
+    }
+    if search_job:
+        body["search_job"] = search_job
+    response = jsonify(body)
+    if PERSISTENCE_FLUSH_ON_CLOSE:
+        response.call_on_close(user_repository.flush)
+    return response
+
+
 @chat_bp.route('/chat', methods=['POST'])
 def chat():
     try:
@@ -84,168 +334,168 @@ def chat():
                 "message": "Name and email cannot be empty"
             }), 400
 
-        if not mongo_ready or users_collection is None:
-            return jsonify({
-                "status": "error",
-                "message": f"MongoDB is not configured or unreachable. Check MONGO_URI. {mongo_error}"
-            }), 500
-
+        # Shed load before any Mongo / Gemini work
+        rejection = ADMISSION.admit(user_email)
+        if rejection is not None:
+            return _too_many_requests(rejection)
         try:
-            existing_user = users_collection.find_one(
-                {"email": user_email},
-                {"_id": 0, "history": 1, "visa_context": 1, "flight_context": 1, "hotel_context": 1},
-            )
-            history = existing_user.get("history", []) if existing_user else []
-            visa_context = existing_user.get("visa_context") if existing_user else None
-            flight_context = existing_user.get("flight_context") if existing_user else None
-            hotel_context = existing_user.get("hotel_context") if existing_user else None
-            is_first_message = len(history) == 0
-
-            users_collection.update_one(
-                {"email": user_email},
-                {
-                    "$setOnInsert": {
-                        "email": user_email,
-                        "created_at": datetime.utcnow(),
-                    },
-                    "$set": {"name": user_name, "last_seen_at": datetime.utcnow()},
-                },
-                upsert=True,
-            )
-        except errors.DuplicateKeyError:
-            pass
-        except Exception as db_error:
-            return jsonify({
-                "status": "error",
-                "message": f"Database error: {db_error}"
-            }), 500
-        
-        # Initialize Gemini model
-        model = genai.GenerativeModel(GEMINI_MODEL)
-        
-        graph_state: ChatState = {
-            "question": user_question,
-            "name": user_name,
-            "history": history,
-            "is_first_message": is_first_message,
-            "visa_context": visa_context,
-            "flight_context": flight_context,
-            "flight_question_index": flight_context.get("flight_question_index", 0) if flight_context else 0,
-            "hotel_context": hotel_context,
-            "hotel_question_index": hotel_context.get("hotel_question_index", 0) if hotel_context else 0,
-            "model": model,
-            "flight_username": PUBLIC_TTS_API_USERNAME,
-            "flight_password": PUBLIC_TTS_API_PASSWORD,
-        }
-        result_state = CHAT_GRAPH.invoke(graph_state)
-        answer_text = result_state.get("answer", "Sorry, I could not process that request.")
-        updated_visa_context = result_state.get("visa_context")
-        if result_state.get("visa_context_updated") and updated_visa_context:
-            try:
-                users_collection.update_one(
-                    {"email": user_email},
-                    {"$set": {"visa_context": {
-                        "country": updated_visa_context.get("country"),
-                        "data": updated_visa_context.get("data"),
-                        "fetched_at": datetime.utcnow(),
-                    }}},
-                )
-            except Exception as db_error:
-                return jsonify({
-                    "status": "error",
-                    "message": f"Database error: {db_error}"
-                }), 500
-        
-        updated_flight_context = result_state.get("flight_context")
-        # Save flight_context on every message during flight booking (not just at the end)
-        if updated_flight_context:
-            try:
-                users_collection.update_one(
-                    {"email": user_email},
-                    {"$set": {"flight_context": {
-                        "trip_type": updated_flight_context.get("trip_type"),      # ✅ ADD
-                        "return_date": updated_flight_context.get("return_date"),  # ✅ ADD
-                        "adults": updated_flight_context.get("adults"),
-                        "children": updated_flight_context.get("children"),
-                        "children_ages": updated_flight_context.get("children_ages"),
-                        "departure_date": updated_flight_context.get("departure_date"),
-                        "departure_city": updated_flight_context.get("departure_city"),
-                        "arrival_city": updated_flight_context.get("arrival_city"),
-                        "flight_question_index": result_state.get("flight_question_index", 0),
-                        "results": updated_flight_context.get("results", []),
-                        "fetched_at": datetime.utcnow(),
-                    }}},
-                )
-            except Exception as db_error:
-                return jsonify({
-                    "status": "error",
-                    "message": f"Database error: {db_error}"
-                }), 500
-        else:
-            users_collection.update_one(
-                {"email": user_email},
-                {"$unset": {"flight_context": ""}}
-            )
-        updated_hotel_context = result_state.get("hotel_context")
-
-        if updated_hotel_context:
-            try:
-                users_collection.update_one(
-                    {"email": user_email},
-                    {"$set": {"hotel_context": {
-                        **updated_hotel_context,
-                        "hotel_question_index": result_state.get("hotel_question_index", 0),
-                        "fetched_at": datetime.utcnow(),
-                    }}},
-                )
-            except Exception as db_error:
-                return jsonify({
-                    "status": "error",
-                    "message": f"Database error: {db_error}"
-                }), 500
-        else:
-            users_collection.update_one(
-                {"email": user_email},
-                {"$unset": {"hotel_context": ""}}
-            )
+            return _answer_chat(user_question, user_name, user_email)
+        finally:
+            ADMISSION.release()
+    
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
 
-        try:
-            users_collection.update_one(
-                {"email": user_email},
-                {
-                    "$push": {
-                        "history": {
-                            "$each": [
-                                {
-                                    "role": "user",
-                                    "text": user_question,
-                                    "at": datetime.utcnow(),
-                                },
-                                {
-                                    "role": "assistant",
-                                    "text": answer_text,
-                                    "at": datetime.utcnow(),
-                                },
-                            ],
-                            "$slice": -5,
-                        }
-                    }
-                },
-            )
-        except Exception as db_error:
-            return jsonify({
-                "status": "error",
-                "message": f"Database error: {db_error}"
-            }), 500
-        
+
+@chat_bp.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """
+    Many {question, name, email} items in one call (CRM / WhatsApp bridge bursts).
+    State for all users is loaded with one $in query, conversations run
+    concurrently on a pool with one global concurrency slot per worker
+    (messages of the same user stay in order),
+    and the writes join the persistence queue, which the call waits on before
+    answering. Results keep the input order.
+    """
+    if not GEMINI_API_KEY:
+        return jsonify({
+            "status": "error",
+            "message": "GEMINI_API_KEY environment variable is not set"
+        }), 500
+
+    data = request.get_json(silent=True) or {}
+    items = data.get("items")
+    if not isinstance(items, list) or not items:
+        return jsonify({
+            "status": "error",
+            "message": "Please provide a non-empty 'items' list of {question, name, email}"
+        }), 400
+    if len(items) > CHAT_BATCH_MAX_ITEMS:
+        return jsonify({
+            "status": "error",
+            "message": f"At most {CHAT_BATCH_MAX_ITEMS} items per batch"
+        }), 400
+
+    results: list = [None] * len(items)
+    # (position, question, name, email) of the well-formed items
+    valid = []
+    for position, item in enumerate(items):
+        if not isinstance(item, dict) or not all(key in item for key in ("question", "name", "email")):
+            results[position] = {"status": "error", "message": "Item needs 'question', 'name', and 'email'"}
+            continue
+        name = str(item["name"]).strip()
+        email = str(item["email"]).strip().lower()
+        if not name or not email:
+            results[position] = {"status": "error", "message": "Name and email cannot be empty"}
+            continue
+        valid.append((position, item["question"], name, email))
+
+    if not valid:
         return jsonify({
             "status": "success",
-            "question": user_question,
-            "answer": answer_text
+            "results": results,
         })
-    
-    except Exception as e:
+
+    # One global concurrency slot per pool worker, taken before any user token is spent
+    slots = ADMISSION.acquire_slots(min(CHAT_BATCH_WORKERS, len({email for *_, email in valid})))
+    if not slots:
+        ADMISSIONS.inc(endpoint="chat_batch", outcome="overloaded")
+        return _too_many_requests(Rejection("overloaded", CHAT_OVERLOAD_RETRY_AFTER))
+    try:
+        # email -> [(position, question, name)] in request order
+        conversations: dict = {}
+        for position, question, name, email in valid:
+            retry_after = ADMISSION.take_token(email)
+            if retry_after is not None:
+                ADMISSIONS.inc(endpoint="chat_batch", outcome="rate_limited")
+                results[position] = {"status": "error", "message": "rate_limited", "retry_after": retry_after}
+                continue
+            conversations.setdefault(email, []).append((position, question, name))
+
+        if not conversations:
+            return jsonify({
+                "status": "success",
+                "results": results,
+            })
+        ADMISSIONS.inc(endpoint="chat_batch", outcome="admitted")
+        return _answer_batch(results, conversations, workers=min(slots, len(conversations)))
+    finally:
+        ADMISSION.release(slots)
+
+
+def _answer_batch(results: list, conversations: dict, workers: int):
+    user_repository = get_user_repository()
+    mongo_ready, mongo_error = user_repository.status()
+    if not mongo_ready:
         return jsonify({
             "status": "error",
-            "message": str(e)
-        }), 500
\ No newline at end of file
+            "message": f"MongoDB is not configured or unreachable. Check MONGO_URI. {mongo_error}"
+        }), 500
+
+    try:
+        with span("mongo_read"):
+            user_states = user_repository.load_many(list(conversations))
+    except Exception as db_error:
+        return jsonify({
+            "status": "error",
+            "message": f"Database error: {db_error}"
+        }), 500
+
+    model = get_gemini_model(GEMINI_MODEL)
+    app = current_app._get_current_object()
+
+    def run_conversation(email: str, messages: list) -> list:
+        outcomes = []
+        user_state = user_states.get(email) or {}
+        with app.app_context():
+            for position, question, name in messages:
+                # Cards of a search run earlier in this batch are not saved yet → use the local copy
+                def load_result_cards(user_state=user_state):
+                    if RESULT_CARDS_FIELD in user_state:
+                        return user_state[RESULT_CARDS_FIELD]
+                    return user_repository.load_result_cards(email)
+
+                try:
+                    answer_text, writes, search_job = _run_turn(question, name, user_state, model, load_result_cards)
+                except Exception as exc:
+                    outcomes.append((position, {"status": "error", "question": question, "message": str(exc)}, None))
+                    continue
+                user_state = _apply_turn_locally(user_state, writes)
+                result = {"status": "success", "question": question, "answer": answer_text}
+                if search_job:
+                    result["search_job"] = search_job
+                outcomes.append((position, result, {"email": email, "name": name, **writes}))
+        return outcomes
+
+    turns = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_conversation, email, messages) for email, messages in conversations.items()]
+        for future in futures:
+            for position, result, turn in future.result():
+                results[position] = result
+                if turn is not None:
+                    turns.append(turn)
+
+    try:
+        with span("mongo_write"):
+            saved = user_repository.save_turns(turns)
+    except Exception as db_error:
+        return jsonify({
+            "status": "error",
+            "message": f"Database error: {db_error}",
+            "results": results,
+        }), 500
+
+    # Answered but not persisted (write given up, retried later) → saved: false on that item
+    for email, messages in conversations.items():
+        for position, _, _ in messages:
+            if results[position]["status"] == "success":
+                results[position]["saved"] = saved.get(email, False)
+
+    return jsonify({
+        "status": "success",
+        "results": results,
+    })
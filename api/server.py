@@ -0,0 +1,92 @@
+"""
+Production server for running api.index:app on our own boxes (outside Vercel):
+
+    python -m api.server
+
+Gunicorn master imports the app and loads every static dataset/index
+(airports.json, hotel_city_list.csv lookups, visa country table) *before*
+forking, then freezes those objects out of the GC so the workers share the
+pages copy-on-write instead of each parsing and holding its own copy.
+Workers use threads (gthread) so blocking upstream calls (bdsd, visa2fly,
+Gemini) run concurrently inside one process.
+
+Tuning knobs (environment variables):
+    SERVER_BIND              address:port to listen on                 (0.0.0.0:8000)
+    SERVER_WORKERS           processes; ~1 per CPU core is enough as   (CPU count)
+                             requests are I/O bound
+    SERVER_THREADS           threads per worker = concurrent blocking  (8)
+                             upstream/LLM calls per process; keep it
+                             ≤ MONGO_MAX_POOL_SIZE
+    SERVER_TIMEOUT           worker timeout in seconds; must exceed a  (120)
+                             full flight search (3 attempts × 30s)
+    SERVER_GRACEFUL_TIMEOUT  seconds to finish in-flight requests and  (30)
+                             drain the persistence queue on restart
+    SERVER_KEEPALIVE         keep-alive seconds behind a load balancer (5)
+    SERVER_MAX_REQUESTS      recycle a worker after N requests (0=off) (0)
+"""
+
+import gc
+import os
+
+
+SERVER_BIND = os.getenv("SERVER_BIND", "0.0.0.0:8000")
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1)))
+SERVER_THREADS = int(os.getenv("SERVER_THREADS", "8"))
+SERVER_TIMEOUT = int(os.getenv("SERVER_TIMEOUT", "120"))
+SERVER_GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+SERVER_KEEPALIVE = int(os.getenv("SERVER_KEEPALIVE", "5"))
+SERVER_MAX_REQUESTS = int(os.getenv("SERVER_MAX_REQUESTS", "0"))
+
+
+def _freeze_for_fork() -> None:
+    # Move everything allocated so far into the permanent generation; GC passes in
+    # the workers then never write to those objects' headers, keeping pages shared.
+    gc.collect()
+    gc.freeze()
+
+
+def _post_fork(server, worker) -> None:
+    # Per-process resources (Mongo client, persistence worker thread) are created
+    # lazily and keyed on the pid, so nothing from the master is reused here.
+    worker.log.info("worker %s ready (datasets shared from master)", worker.pid)
+
+
+def main() -> None:
+    from gunicorn.app.base import BaseApplication
+
+    from api.core.warmup import preload_static_data
+    from api.index import app
+
+    preload_static_data()
+    _freeze_for_fork()
+
+    class PreforkApplication(BaseApplication):
+        def __init__(self, application, options: dict):
+            self.application = application
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+    PreforkApplication(app, {
+        "bind": SERVER_BIND,
+        "workers": SERVER_WORKERS,
+        "worker_class": "gthread",
+        "threads": SERVER_THREADS,
+        "timeout": SERVER_TIMEOUT,
+        "graceful_timeout": SERVER_GRACEFUL_TIMEOUT,
+        "keepalive": SERVER_KEEPALIVE,
+        "max_requests": SERVER_MAX_REQUESTS,
+        "max_requests_jitter": SERVER_MAX_REQUESTS // 10,
+        "preload_app": True,
+        "post_fork": _post_fork,
+    }).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Per-turn overhead of the sticky flight/hotel fast path vs CHAT_GRAPH.invoke.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_dispatch --iterations 2000
+"""
+
+import argparse
+import statistics
+import time
+
+from flask import Flask
+
+from api.core.chat_graph import CHAT_GRAPH, run_chat_turn
+
+
+# Mid-dialogue turns that never reach the upstream APIs or the LLM
+SCENARIOS = {
+    "flight_adults": lambda: {
+        "question": "2",
+        "name": "Bench",
+        "history": [],
+        "is_first_message": False,
+        "flight_context": {"trip_type": "one-way", "flight_question_index": 1},
+        "flight_question_index": 1,
+        "hotel_context": None,
+        "hotel_question_index": 0,
+        "model": None,
+    },
+    "hotel_rooms": lambda: {
+        "question": "1",
+        "name": "Bench",
+        "history": [],
+        "is_first_message": False,
+        "flight_context": None,
+        "flight_question_index": 0,
+        "hotel_context": {
+            "active": True,
+            "check_in": "2026-11-20",
+            "check_out": "2026-11-25",
+            "city_name": "Makkah",
+            "city_id": 1,
+            "country_code": "SA",
+        },
+        "hotel_question_index": 3,
+        "model": None,
+    },
+}
+
+COMPARED_KEYS = (
+    "answer", "intent", "flight_context", "flight_question_index",
+    "hotel_context", "hotel_question_index",
+)
+
+
+def _time_path(run, make_state, iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        state = make_state()
+        start = time.perf_counter()
+        run(state)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def _summary(samples: list[float]) -> str:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return (
+        f"mean={statistics.fmean(ordered):8.1f}us "
+        f"p50={statistics.median(ordered):8.1f}us p99={p99:8.1f}us"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    with app.app_context():
+        for name, make_state in SCENARIOS.items():
+            graph_result = CHAT_GRAPH.invoke(make_state())
+            direct_result = run_chat_turn(make_state())
+            mismatched = [
+                key for key in COMPARED_KEYS if graph_result.get(key) != direct_result.get(key)
+            ]
+            if mismatched:
+                raise SystemExit(f"{name}: fast path differs from graph on {mismatched}")
+
+            graph_samples = _time_path(CHAT_GRAPH.invoke, make_state, args.iterations)
+            direct_samples = _time_path(run_chat_turn, make_state, args.iterations)
+            speedup = statistics.median(graph_samples) / statistics.median(direct_samples)
+
+            print(f"{name}")
+            print(f"  graph  {_summary(graph_samples)}")
+            print(f"  direct {_summary(direct_samples)}")
+            print(f"  speedup (p50) x{speedup:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Microbenchmarks for the pure-CPU resolvers and text matchers.
+
+Each function is driven with a corpus of correct, misspelled, transliterated
+and unknown inputs; per-call latency percentiles and allocation per call
+(tracemalloc) are reported, and can be saved as a baseline to compare
+resolver changes against.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_resolvers --save          # write baseline
+    python -m benchmarks.bench_resolvers --compare       # diff against it
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "resolvers.json"
+
+HOTEL_CITIES = {
+    "correct": ["Makkah", "Madinah", "Jeddah", "Dubai", "Istanbul", "Taif"],
+    "misspelled": ["Makah", "Madinha", "Jedah", "Dubaai", "Istambul", "Taiff"],
+    "transliterated": ["Mecca", "Makka", "Medina", "Madina", "Jiddah", "Al Madinah"],
+    "unknown": ["Atlantis", "Gotham City", "zzzz", "Haram hotel please", "Near the mosque"],
+}
+
+AIRPORT_CITIES = {
+    "correct": ["Hyderabad", "Jeddah", "Mumbai", "Lucknow", "Calicut", "JED"],
+    "misspelled": ["Hydrabad", "Jeddha", "Mumbaai", "Lucknw", "Calicutt", "Banglore"],
+    "transliterated": ["Jiddah", "Madinah", "Kozhikode", "Bengaluru", "Bombay", "Makkah"],
+    "unknown": ["Atlantis", "Gotham City", "qqqq", "my home town", "near Haram"],
+}
+
+COUNTRY_QUESTIONS = {
+    "correct": [
+        "Do you provide visa for Dubai?",
+        "What is the price of a Saudi Arabia visa?",
+        "I need a United Kingdom tourist visa",
+    ],
+    "misspelled": [
+        "visa for Dubay please",
+        "Saudia Arabia umrah visa cost",
+        "Untied Kingdom visa documents",
+    ],
+    "transliterated": [
+        "visa for Makkah trip",
+        "Emirates visa price",
+        "KSA visa requirements",
+    ],
+    "unknown": [
+        "What services does Marhaba Haji offer?",
+        "Tell me about your Umrah packages for December",
+        "How do I contact customer care?",
+    ],
+}
+
+FLIGHT_QUESTIONS = {
+    "correct": ["I want to book a flight", "round trip flight to Jeddah", "airfare from Hyderabad"],
+    "misspelled": ["I want to book a flght", "round trip fligt", "air fare to Jeddah"],
+    "transliterated": ["ticket to Jeddah by plane", "hawai jahaz ticket", "plane booking"],
+    "unknown": ["What services do you offer?", "I need a hotel in Makkah", "visa for Dubai"],
+}
+
+
+def _targets() -> dict:
+    from api.data.airports import resolve_city_to_iata, suggest_cities
+    from api.data.hotel_city_resolver import load_hotel_cities, resolve_hotel_city, suggest_hotel_cities
+    from api.handlers.intent_handler import _is_flight_question
+    from api.helpers.visa_helpers import _extract_country
+
+    # Dataset loading is measured by the warmup, not by the per-call numbers
+    load_hotel_cities()
+
+    return {
+        "resolve_hotel_city": (resolve_hotel_city, HOTEL_CITIES),
+        "suggest_hotel_cities": (suggest_hotel_cities, HOTEL_CITIES),
+        "resolve_city_to_iata": (resolve_city_to_iata, AIRPORT_CITIES),
+        "suggest_cities": (suggest_cities, AIRPORT_CITIES),
+        "_extract_country": (_extract_country, COUNTRY_QUESTIONS),
+        "_is_flight_question": (_is_flight_question, FLIGHT_QUESTIONS),
+    }
+
+
+def _measure(fn, inputs: list[str], repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        for text in inputs:
+            start = time.perf_counter_ns()
+            fn(text)
+            samples.append((time.perf_counter_ns() - start) / 1000)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for text in inputs:
+        fn(text)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples.sort()
+    return {
+        "calls": len(samples),
+        "p50_us": round(statistics.median(samples), 2),
+        "p90_us": round(samples[int(len(samples) * 0.90)], 2),
+        "p99_us": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 2),
+        "max_us": round(samples[-1], 2),
+        "peak_kib": round((peak - before) / 1024, 2),
+        "retained_kib": round((after - before) / 1024, 2),
+    }
+
+
+def run(repeat: int) -> dict:
+    results = {}
+    for name, (fn, corpus) in _targets().items():
+        results[name] = {category: _measure(fn, inputs, repeat) for category, inputs in corpus.items()}
+    return results
+
+
+def _print(results: dict, baseline: dict | None) -> None:
+    header = f"{'function':<22}{'corpus':<16}{'p50 us':>10}{'p99 us':>10}{'max us':>10}{'peak KiB':>10}"
+    if baseline:
+        header += f"{'Δp50':>9}{'Δp99':>9}"
+    print(header)
+    for name, categories in results.items():
+        for category, stats in categories.items():
+            line = (
+                f"{name:<22}{category:<16}{stats['p50_us']:>10.1f}{stats['p99_us']:>10.1f}"
+                f"{stats['max_us']:>10.1f}{stats['peak_kib']:>10.1f}"
+            )
+            base = (baseline or {}).get(name, {}).get(category)
+            if base:
+                for key in ("p50_us", "p99_us"):
+                    change = (stats[key] - base[key]) / base[key] * 100 if base[key] else 0.0
+                    line += f"{change:>+8.0f}%"
+            print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="passes over each corpus")
+    parser.add_argument("--save", action="store_true", help=f"write results to {BASELINE_PATH}")
+    parser.add_argument("--compare", action="store_true", help="show change vs the saved baseline")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+
+    baseline = None
+    if args.compare:
+        if not args.baseline.exists():
+            raise SystemExit(f"no baseline at {args.baseline}; run with --save first")
+        baseline = json.loads(args.baseline.read_text())["results"]
+
+    _print(results, baseline)
+
+    if args.save:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+            "results": results,
+        }, indent=2))
+        print(f"\nbaseline saved to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+End-to-end load test for /api/chat with every dependency stubbed locally.
+
+Virtual users run realistic multi-turn conversations (general questions,
+visa lookups, the full flight dialogue and the full hotel dialogue) against
+the real Flask app served over HTTP; Gemini, Mongo and the upstream APIs are
+replaced by benchmarks.stubs. Reports per-conversation latency percentiles
+and overall requests per second.
+
+Usage (from the repo root):
+    python -m benchmarks.load_test --users 50 --duration 30 \\
+        --llm-latency 0.3 --upstream-latency 0.8 --flight-results 500
+"""
+
+import argparse
+import itertools
+import os
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+
+CONVERSATIONS = {
+    "general": [
+        "What services does Marhaba Haji offer?",
+        "Do you arrange ziyarat tours in Madinah?",
+    ],
+    "visa": [
+        "Do you provide visa for Dubai?",
+        "What documents are required for the visa?",
+        "How long is the visa processing time?",
+    ],
+    "flight": [
+        "I want to book a flight",
+        "one way",
+        "2",
+        "0",
+        "2026-11-20",
+        "Hyderabad",
+        "Jeddah",
+    ],
+    "hotel": [
+        "I need a hotel",
+        "2026-11-20",
+        "2026-11-25",
+        "Makkah",
+        "1",
+        "2",
+        "0",
+        "4",
+        "IN",
+    ],
+}
+
+DEFAULT_MIX = "general=4,visa=2,flight=2,hotel=2"
+
+
+def _parse_mix(raw: str) -> list[str]:
+    weighted = []
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in CONVERSATIONS:
+            raise SystemExit(f"unknown conversation {name!r}; choose from {sorted(CONVERSATIONS)}")
+        weighted.extend([name.strip()] * int(weight or 1))
+    return weighted
+
+
+def _percentile(ordered: list[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def _report(samples: dict, errors: dict, elapsed: float) -> None:
+    total = sum(len(v) for v in samples.values())
+    print(f"\n{total} requests in {elapsed:.1f}s → {total / elapsed:.1f} req/s")
+    print(f"{'conversation':<14}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name in sorted(set(samples) | set(errors)):
+        ordered = sorted(samples.get(name, []))
+        print(
+            f"{name:<14}{len(ordered):>7}{errors.get(name, 0):>8}"
+            f"{(statistics.median(ordered) if ordered else 0) * 1000:>10.1f}"
+            f"{_percentile(ordered, 0.90) * 1000:>10.1f}"
+            f"{_percentile(ordered, 0.99) * 1000:>10.1f}"
+            f"{(ordered[-1] if ordered else 0) * 1000:>10.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20, help="seconds to keep starting conversations")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="conversation weights, e.g. general=4,flight=1")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--upstream-latency", type=float, default=0.5)
+    parser.add_argument("--flight-results", type=int, default=200)
+    parser.add_argument("--hotel-results", type=int, default=500)
+    parser.add_argument("--visa-quotes", type=int, default=12)
+    parser.add_argument("--port", type=int, default=0, help="port for the app under test (0 = any)")
+    args = parser.parse_args()
+
+    from benchmarks.stubs import FakeGenerativeModel, StubUpstreamServer
+
+    upstream = StubUpstreamServer(
+        latency=args.upstream_latency,
+        flight_results=args.flight_results,
+        hotel_results=args.hotel_results,
+        visa_quotes=args.visa_quotes,
+    ).start()
+
+    # Module-level settings are read at import time → configure before importing the app
+    os.environ.update({
+        "GEMINI_API_KEY": "load-test",
+        "USER_STATE_BACKEND": "memory",
+        "BDSD_API_BASE_URL": upstream.base_url,
+        "VISA2FLY_API_BASE_URL": upstream.base_url,
+        "PUBLIC_TTS_API_USERNAME": "load-test",
+        "PUBLIC_TTS_API_PASSWORD": "load-test",
+    })
+    # Measure the pipeline, not admission control (export these to load-test shedding)
+    os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "0")
+    os.environ.setdefault("CHAT_MAX_CONCURRENCY", "0")
+    FakeGenerativeModel.latency = args.llm_latency
+
+    import requests
+    from werkzeug.serving import make_server
+
+    from api.index import app
+    from api.routes import chat_routes
+
+    chat_routes.genai.GenerativeModel = FakeGenerativeModel
+
+    server = make_server("127.0.0.1", args.port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    chat_url = f"http://127.0.0.1:{server.server_port}/api/chat"
+
+    mix = _parse_mix(args.mix)
+    samples: dict = defaultdict(list)
+    errors: dict = defaultdict(int)
+    lock = threading.Lock()
+    user_ids = itertools.count()
+    deadline = time.monotonic() + args.duration
+
+    def virtual_user() -> None:
+        session = requests.Session()
+        rng = random.Random()
+        while time.monotonic() < deadline:
+            name = rng.choice(mix)
+            email = f"load-{next(user_ids)}@example.invalid"
+            for question in CONVERSATIONS[name]:
+                start = time.perf_counter()
+                try:
+                    response = session.post(
+                        chat_url,
+                        json={"question": question, "name": "Load Test", "email": email},
+                        timeout=120,
+                    )
+                    ok = response.status_code == 200 and response.json().get("status") == "success"
+                except Exception:
+                    ok = False
+                latency = time.perf_counter() - start
+                with lock:
+                    if ok:
+                        samples[name].append(latency)
+                    else:
+                        errors[name] += 1
+                if not ok:
+                    break
+
+    print(
+        f"users={args.users} duration={args.duration}s mix={args.mix} "
+        f"llm={args.llm_latency}s upstream={args.upstream_latency}s"
+    )
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        for _ in range(args.users):
+            pool.submit(virtual_user)
+    elapsed = time.perf_counter() - started
+
+    server.shutdown()
+    upstream.stop()
+    _report(samples, errors, elapsed)
+
+
+if __name__ == "__main__":
+    main()
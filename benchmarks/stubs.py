@@ -0,0 +1,181 @@
+"""
+Local stand-ins for every external dependency of /api/chat:
+a fake Gemini model and an HTTP server imitating the bdsd flight/hotel
+search and visa2fly visa endpoints, with configurable latency and payload size.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+_QUESTION_RE = re.compile(r"User Question: (.*)")
+_VISA_WORDS = ("visa", "document", "processing", "requirement", "faq")
+
+
+class _FakeResponse:
+    def __init__(self, text: str, prompt: str):
+        self.text = text
+        self.usage_metadata = _FakeUsage(len(prompt) // 4, len(text) // 4)
+
+
+class _FakeUsage:
+    def __init__(self, prompt_tokens: int, output_tokens: int):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+
+
+class FakeGenerativeModel:
+    """Drop-in for genai.GenerativeModel: fixed latency, canned but prompt-aware answers"""
+
+    latency = 0.3
+
+    def __init__(self, model_name: str = "fake", **_kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt: str) -> _FakeResponse:
+        time.sleep(self.latency)
+        match = _QUESTION_RE.search(prompt)
+        question = (match.group(1) if match else "").lower()
+
+        if "Respond with only a JSON object" in prompt:
+            if any(word in question for word in _VISA_WORDS):
+                payload = {"intent": "visa", "answer": ""}
+            else:
+                payload = {"intent": "general", "answer": "Marhaba Haji offers Umrah and Hajj packages."}
+            return _FakeResponse(json.dumps(payload), prompt)
+        if "Respond with only the label" in prompt:
+            label = "visa" if any(word in question for word in _VISA_WORDS) else "general"
+            return _FakeResponse(label, prompt)
+        return _FakeResponse("Here is the information you asked for from our visa data.", prompt)
+
+
+def fake_flight_payload(results: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    itineraries = []
+    for idx in range(results):
+        stops = rng.choice((0, 0, 1, 2))
+        segments = []
+        for seg in range(stops + 1):
+            segments.append({
+                "Airline": {"AirlineName": rng.choice(("Saudia", "IndiGo", "Air India", "Emirates", "flynas"))},
+                "Origin": {"CityCode": "HYD" if seg == 0 else f"X{seg}"},
+                "Destination": {
+                    "CityCode": "JED" if seg == stops else f"X{seg + 1}",
+                    "CityName": "Jeddah" if seg == stops else f"Via {seg + 1}",
+                },
+                "TotalDuration": rng.randint(300, 1200),
+            })
+        fares = []
+        for _ in range(rng.randint(1, 3)):
+            base = rng.randint(15000, 60000)
+            fares.append({
+                "PublishedPrice": base + 4000,
+                "FareType": "Regular",
+                "SeatBaggage": [[{"Cabin": "7 Kg", "CheckIn": "30 Kg"}]],
+                "FareBreakdown": {"ADT": {"PassengerCount": 2, "BaseFare": base, "Tax": 4000}},
+            })
+        itineraries.append({"ResultIndex": idx, "Segments": [segments], "FareList": fares})
+    return {"Result": [itineraries]}
+
+
+def fake_hotel_payload(results: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    hotels = []
+    for idx in range(results):
+        price = round(rng.uniform(3000, 40000), 2)
+        hotels.append({
+            "HotelName": f"Hotel {idx}",
+            "StarRating": rng.randint(1, 5),
+            "HotelAddress": rng.choice(("Ajyad Street, near Haram", "Ibrahim Al Khalil Rd", "Aziziyah")),
+            "HotelPicture": f"https://example.invalid/hotel/{idx}.jpg",
+            "Price": {"OfferedPrice": price, "PublishedPrice": price * 1.1},
+        })
+    return {"Result": hotels}
+
+
+def fake_visa_payload(quotes: int) -> dict:
+    return {
+        "code": "0",
+        "data": {
+            "displayQuotes": [
+                {
+                    "purpose": ("Tourist", "Business", "Transit")[idx % 3],
+                    "entryType": ("Single", "Multiple")[idx % 2],
+                    "stayPeriod": f"{30 * (idx % 3 + 1)} days",
+                    "basePrice": 5000 + 750 * idx,
+                    "currency": "INR",
+                }
+                for idx in range(quotes)
+            ],
+            "documentRequired": {"Mandatory": ["Passport valid for 6 months", "Photograph", "Return ticket"]},
+            "faqs": {"General": [{"question": "What is the processing time?", "answer": "3 to 5 working days"}]},
+            "importantInfo": ["Visa fees are non-refundable."],
+        },
+    }
+
+
+class StubUpstreamServer:
+    """Threaded HTTP server answering the bdsd and visa2fly routes used by the helpers"""
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        flight_results: int = 200,
+        hotel_results: int = 500,
+        visa_quotes: int = 12,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        # Payloads are built once; every request serves the same encoded bytes
+        responses = {
+            "/api/airservice/rest/search": json.dumps(fake_flight_payload(flight_results)).encode(),
+            "/api/hotelservice/rest/search": json.dumps(fake_hotel_payload(hotel_results)).encode(),
+        }
+        visa_body = json.dumps(fake_visa_payload(visa_quotes)).encode()
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, body: bytes):
+                time.sleep(latency)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                body = responses.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                self._send(body)
+
+            def do_GET(self):
+                if not self.path.startswith("/api/b2b/partner/visa/"):
+                    self.send_error(404)
+                    return
+                self._send(visa_body)
+
+            def log_message(self, *_args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubUpstreamServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
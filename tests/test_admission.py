@@ -0,0 +1,37 @@
+import unittest
+
+from api.core.admission import AdmissionController
+
+
+class AdmitTests(unittest.TestCase):
+    def test_overloaded_request_keeps_its_token(self):
+        controller = AdmissionController(per_minute=60, burst=1, max_concurrency=1)
+        self.assertIsNone(controller.admit("a@x.com"))
+
+        rejection = controller.admit("b@x.com")
+        self.assertEqual(rejection.reason, "overloaded")
+        controller.release()
+        self.assertIsNone(controller.admit("b@x.com"))
+
+    def test_rate_limited_request_frees_its_slot(self):
+        controller = AdmissionController(per_minute=1, burst=1, max_concurrency=1)
+        self.assertIsNone(controller.admit("a@x.com"))
+        controller.release()
+
+        self.assertEqual(controller.admit("a@x.com").reason, "rate_limited")
+        self.assertIsNone(controller.admit("b@x.com"))
+
+
+class SlotTests(unittest.TestCase):
+    def test_acquire_slots_takes_what_is_free(self):
+        controller = AdmissionController(max_concurrency=3)
+        self.assertTrue(controller.acquire_slot())
+        self.assertEqual(controller.acquire_slots(8), 2)
+        self.assertEqual(controller.acquire_slots(1), 0)
+
+        controller.release(2)
+        self.assertEqual(controller.acquire_slots(5), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
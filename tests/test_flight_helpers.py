@@ -0,0 +1,49 @@
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+from api.helpers import flight_helpers
+
+
+def _response(price):
+    segment = {
+        "Airline": {"AirlineName": "Saudia"},
+        "Origin": {"CityCode": "HYD"},
+        "Destination": {"CityCode": "JED", "CityName": "Jeddah"},
+        "TotalDuration": 360,
+    }
+    return {"Result": [[{"Segments": [[segment]], "FareList": [{"PublishedPrice": price, "FareType": "Regular"}]}]]}
+
+
+class FlexibleDatesTests(unittest.TestCase):
+    def setUp(self):
+        self.departure = (date.today() + timedelta(days=30)).isoformat()
+
+    def test_every_day_failing_raises_the_real_error(self):
+        with mock.patch.object(flight_helpers, "_search_flights", side_effect=TimeoutError("Flight API timed out")):
+            with self.assertRaisesRegex(TimeoutError, "timed out"):
+                flight_helpers._search_flexible_dates(1, departure_date=self.departure, return_date=None)
+
+    def test_partial_failure_keeps_the_calendar(self):
+        def search(**day_search):
+            if day_search["departure_date"] == self.departure:
+                raise TimeoutError("slow day")
+            return _response(100)
+
+        with mock.patch.object(flight_helpers, "_search_flights", side_effect=search):
+            calendar = flight_helpers._search_flexible_dates(1, departure_date=self.departure, return_date=None)
+        self.assertEqual(len(calendar), 3)
+        self.assertEqual(sum(1 for day in calendar if day["error"] is not None), 1)
+        self.assertIn("unavailable", flight_helpers._format_fare_calendar(calendar, self.departure))
+
+    def test_shift_date_moves_return_with_departure(self):
+        self.assertEqual(flight_helpers._shift_date("2026-12-31", 1), "2027-01-01")
+        self.assertIsNone(flight_helpers._shift_date(None, 1))
+
+    def test_shift_date_rejects_invalid_dates(self):
+        with self.assertRaisesRegex(ValueError, "2026-13-45"):
+            flight_helpers._shift_date("2026-13-45", 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
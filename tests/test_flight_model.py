@@ -0,0 +1,51 @@
+import unittest
+
+import numpy as np
+
+from api.helpers.flight_model import ParsedFlights, parse_flights
+
+
+def _parsed(fares):
+    n = len(fares)
+    return ParsedFlights([[]] * n, [{}] * n, np.asarray(fares, dtype=np.float64),
+                         np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64))
+
+
+class TopKTests(unittest.TestCase):
+    def test_ties_at_the_boundary_keep_response_order(self):
+        self.assertEqual(_parsed([5, 1, 1, 1, 1, 0]).top_k(3).tolist(), [5, 1, 2])
+
+    def test_matches_a_stable_sort(self):
+        rng = np.random.default_rng(7)
+        for _ in range(50):
+            fares = rng.integers(0, 4, size=12)
+            for k in (1, 3, 6, 11):
+                expected = np.argsort(fares, kind="stable")[:k].tolist()
+                self.assertEqual(_parsed(fares).top_k(k).tolist(), expected)
+
+    def test_k_out_of_range(self):
+        self.assertEqual(_parsed([3, 1]).top_k(0).tolist(), [])
+        self.assertEqual(_parsed([3, 1]).top_k(5).tolist(), [1, 0])
+        self.assertEqual(_parsed([]).top_k(3).tolist(), [])
+
+
+class ParseTests(unittest.TestCase):
+    def test_itineraries_without_fares_are_skipped(self):
+        segment = {
+            "Airline": {"AirlineName": "Saudia"},
+            "Origin": {"CityCode": "HYD"},
+            "Destination": {"CityCode": "JED", "CityName": "Jeddah"},
+            "TotalDuration": 360,
+        }
+        response = {"Result": [[
+            {"Segments": [[segment]], "FareList": [{"PublishedPrice": 900}, {"PublishedPrice": 700}]},
+            {"Segments": [[segment]], "FareList": []},
+        ]]}
+        parsed = parse_flights(response)
+        self.assertEqual(len(parsed), 1)
+        self.assertEqual(parsed.min_fare.tolist(), [700])
+        self.assertEqual(parsed.airline(0), "Saudia")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import time
+import unittest
+from unittest import mock
+
+from api.helpers import hotel_helpers
+from api.helpers.hotel_helpers import _format_split_stay_summary, _is_split_stay_request
+
+
+def _response(*prices):
+    return {"Result": [
+        {"HotelName": f"hotel {price}", "StarRating": 4, "Price": {"OfferedPrice": price}} for price in prices
+    ]}
+
+
+def _stay(city, response=None, error=None):
+    return {"city_name": city, "check_in": "2026-11-01", "check_out": "2026-11-05",
+            "response": response, "error": error}
+
+
+class SplitStayRequestTests(unittest.TestCase):
+    def test_both_cities_or_explicit_wording(self):
+        self.assertTrue(_is_split_stay_request("Hotels in Mecca then Medina"))
+        self.assertTrue(_is_split_stay_request("I want a split-stay hotel"))
+        self.assertFalse(_is_split_stay_request("hotel in Makkah near the haram"))
+
+
+class SplitStaySearchTests(unittest.TestCase):
+    def test_order_is_kept_when_one_city_fails(self):
+        def fetch(city_name, **search):
+            if city_name == "Makkah":
+                time.sleep(0.05)
+                return _response(500)
+            raise TimeoutError("Hotel API timed out after 3 attempts")
+
+        stays = [_stay("Makkah"), _stay("Madinah")]
+        with mock.patch.object(hotel_helpers, "_fetch_hotel_data", side_effect=fetch):
+            results = hotel_helpers._search_split_stay(stays, rooms=1)
+
+        self.assertEqual([stay["city_name"] for stay in results], ["Makkah", "Madinah"])
+        self.assertIsNone(results[0]["error"])
+        self.assertIsInstance(results[1]["error"], TimeoutError)
+
+
+class SplitStaySummaryTests(unittest.TestCase):
+    def test_combined_total_of_the_cheapest_hotels(self):
+        summary = _format_split_stay_summary([_stay("Makkah", _response(700, 500)), _stay("Madinah", _response(300))])
+        self.assertIn("Cheapest combined stay: INR 800", summary)
+
+    def test_total_omitted_when_a_city_has_no_priced_hotels(self):
+        unpriced = {"Result": [{"HotelName": "hotel X", "Price": {}}]}
+        summary = _format_split_stay_summary([_stay("Makkah", _response(500)), _stay("Madinah", unpriced)])
+        self.assertIn("No hotels found", summary)
+        self.assertNotIn("combined", summary)
+
+    def test_total_omitted_when_a_city_failed(self):
+        summary = _format_split_stay_summary([_stay("Makkah", error="no answer"), _stay("Madinah", _response(300))])
+        self.assertIn("Search failed", summary)
+        self.assertNotIn("combined", summary)
+
+
+if __name__ == "__main__":
+    unittest.main()
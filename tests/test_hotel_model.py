@@ -0,0 +1,41 @@
+import unittest
+
+from api.helpers.hotel_model import parse_hotels, top_k_hotels
+
+
+def _hotel(name, offered=None, published=None, stars=None):
+    return {"HotelName": name, "Price": {"OfferedPrice": offered, "PublishedPrice": published}, "StarRating": stars}
+
+
+class ParseTests(unittest.TestCase):
+    def test_prices_and_ratings_are_normalized(self):
+        records = parse_hotels({"Result": [
+            _hotel("A", offered=500, stars="4"),
+            _hotel("B", published=450, stars="n/a"),
+            _hotel("C"),
+        ]})
+        self.assertEqual([record.price for record in records[:2]], [500, 450])
+        self.assertEqual([record.rating for record in records], [4.0, None, None])
+        self.assertFalse(records[2].priced)
+
+    def test_empty_responses(self):
+        self.assertEqual(parse_hotels(None), [])
+        self.assertEqual(parse_hotels({"Result": None}), [])
+
+
+class TopKTests(unittest.TestCase):
+    def test_unpriced_last_and_ties_keep_response_order(self):
+        records = parse_hotels({"Result": [
+            _hotel("A"), _hotel("B", offered=300), _hotel("C", offered=200), _hotel("D", offered=300),
+        ]})
+        names = [record.hotel["HotelName"] for record in top_k_hotels(records, 4)]
+        self.assertEqual(names, ["C", "B", "D", "A"])
+
+    def test_k_out_of_range(self):
+        records = parse_hotels({"Result": [_hotel("A", offered=100)]})
+        self.assertEqual(top_k_hotels(records, 0), [])
+        self.assertEqual(len(top_k_hotels(records, 5)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
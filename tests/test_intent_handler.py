@@ -0,0 +1,24 @@
+import unittest
+
+from api.handlers.intent_handler import _parse_intent_payload
+
+
+class ParseIntentPayloadTests(unittest.TestCase):
+    def test_json_general_answer(self):
+        self.assertEqual(
+            _parse_intent_payload('{"intent": "general", "answer": "We are open 9-5."}'),
+            ("general", "We are open 9-5."),
+        )
+
+    def test_json_visa_drops_answer(self):
+        self.assertEqual(_parse_intent_payload('```json\n{"intent": "visa", "answer": "x"}\n```'), ("visa", None))
+
+    def test_bare_label(self):
+        self.assertEqual(_parse_intent_payload("Visa."), ("visa", None))
+
+    def test_prose_mentioning_visa_is_general(self):
+        self.assertEqual(_parse_intent_payload("You don't need a visa for a short stay."), ("general", None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from unittest import mock
+
+from api.db import mongo
+
+
+class IndexedCollection:
+    def __init__(self, indexes):
+        self.indexes = indexes
+        self.calls = 0
+
+    def index_information(self):
+        self.calls += 1
+        return self.indexes
+
+
+UNIQUE_EMAIL = {"_id_": {"key": [("_id", 1)]}, "email_1": {"key": [("email", 1)], "unique": True}}
+
+
+class EmailIndexTests(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.multiple(mongo, _email_index_pid=None, _email_index_missing_at=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_unique_index_is_checked_once(self):
+        collection = IndexedCollection(UNIQUE_EMAIL)
+        self.assertTrue(mongo.users_email_index_ready(collection))
+        self.assertTrue(mongo.users_email_index_ready(collection))
+        self.assertEqual(collection.calls, 1)
+
+    def test_non_unique_index_is_not_enough(self):
+        collection = IndexedCollection({"email_1": {"key": [("email", 1)]}})
+        self.assertFalse(mongo.users_email_index_ready(collection))
+        # Not looked up again until the cooldown passes
+        self.assertFalse(mongo.users_email_index_ready(collection))
+        self.assertEqual(collection.calls, 1)
+
+    def test_missing_index_blocks_writes(self):
+        collection = IndexedCollection({"_id_": {"key": [("_id", 1)]}})
+        with mock.patch.object(mongo, "get_users_collection", return_value=collection):
+            self.assertIsNone(mongo.get_writable_users_collection())
+        with mock.patch.object(mongo, "get_users_collection", return_value=IndexedCollection(UNIQUE_EMAIL)), \
+                mock.patch.object(mongo, "MONGO_RETRY_COOLDOWN_SECONDS", 0):
+            self.assertIsNotNone(mongo.get_writable_users_collection())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+from api.handlers.package_handler import _handle_package
+from api.helpers.package_helpers import _format_package_quote, _package_room_guests, _visa_quote
+
+
+def _quote(purpose, price):
+    return {"purpose": purpose, "entryType": "Single", "stayPeriod": "30 days", "basePrice": price, "currency": "INR"}
+
+
+class VisaQuoteTests(unittest.TestCase):
+    def test_only_umrah_and_tourist_visas_count(self):
+        visa_data = {"displayQuotes": [_quote("Transit", 100), _quote("Tourist", 500), _quote("Umrah", 700)]}
+        quote = _visa_quote(visa_data, travellers=2)
+        self.assertEqual(quote["price"], 1000)
+        self.assertEqual(quote["label"], "INR 500 x 2")
+
+    def test_other_purposes_are_labelled_as_lower_bound(self):
+        quote = _visa_quote({"displayQuotes": [_quote("Business", 900), _quote("Transit", 100)]}, travellers=1)
+        self.assertEqual(quote["price"], 100)
+        self.assertIn("any type", quote["label"])
+
+    def test_no_prices(self):
+        self.assertIsNone(_visa_quote({"displayQuotes": []}, travellers=1))
+
+
+class PackageQuoteTests(unittest.TestCase):
+    CONTEXT = {"adults": 2, "children_ages": [], "origin": "Hyderabad",
+               "departure_date": "2026-11-20", "return_date": "2026-12-01"}
+
+    def test_failure_reasons_are_shown(self):
+        results = {
+            "flight": {"quote": None, "error": ValueError("City not recognized.\nOrigin: Hyd (suggestions: [])")},
+            "hotel": {"quote": None, "error": TimeoutError("hotel did not answer within 20.0s")},
+            "visa": {"quote": {"price": 1000, "currency": "INR", "label": "INR 500 x 2"}, "error": None},
+        }
+        text = _format_package_quote(self.CONTEXT, results)
+        self.assertIn("Return flight: not available (City not recognized.)", text)
+        self.assertIn("Makkah: no answer in time", text)
+        self.assertIn("Estimated total: INR 1000", text)
+
+    def test_empty_search_says_no_offers(self):
+        results = {source: {"quote": None, "error": None} for source in ("flight", "hotel", "visa")}
+        self.assertIn("Return flight: no offers found", _format_package_quote(self.CONTEXT, results))
+
+    def test_room_guests_split_adults(self):
+        self.assertEqual(
+            _package_room_guests(5, [4]),
+            [{"Adult": 3, "Child": 1, "ChildAge": [4]}, {"Adult": 2, "Child": 0, "ChildAge": []}],
+        )
+
+
+class PackageDialogueTests(unittest.TestCase):
+    def _turn(self, question, index, context):
+        return _handle_package({"question": question, "package_question_index": index, "package_context": context})
+
+    def test_unknown_origin_is_asked_again(self):
+        state = self._turn("Qwzxv", 0, {"started": True})
+        self.assertIsNone(state["package_context"]["origin"])
+        self.assertIn("couldn't find an airport", state["answer"])
+
+    def test_known_origin_is_taken(self):
+        state = self._turn("Hyderabad", 0, {"started": True})
+        self.assertEqual(state["package_context"]["origin"], "Hyderabad")
+        self.assertEqual(state["package_question_index"], 1)
+
+    def test_invalid_and_reversed_dates_are_rejected(self):
+        state = self._turn("2026-13-45 to 2026-12-01", 1, {"started": True, "origin": "Hyderabad"})
+        self.assertIn("2026-13-45 is not a valid date", state["answer"])
+
+        state = self._turn("2026-12-01 to 2026-11-20", 1, {"started": True, "origin": "Hyderabad"})
+        self.assertIn("must be after", state["answer"])
+        self.assertIsNone(state["package_context"]["departure_date"])
+
+
+if __name__ == "__main__":
+    unittest.main()
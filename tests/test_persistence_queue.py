@@ -0,0 +1,138 @@
+import threading
+import unittest
+
+from pymongo import errors
+
+from api.db.persistence_queue import PersistenceQueue, QueuedWrite
+from api.db.session_cache import SessionCache
+from api.db.user_repository import MongoUserStateRepository
+
+
+class FailingCollection:
+    """bulk_write fails the item at fail_index once, then writes everything"""
+
+    def __init__(self, fail_index=None):
+        self.fail_index = fail_index
+        self.written = []
+
+    def bulk_write(self, requests, ordered=True):
+        if self.fail_index is not None and self.fail_index < len(requests):
+            idx, self.fail_index = self.fail_index, None
+            self.written.extend(requests[:idx])
+            raise errors.BulkWriteError({"writeErrors": [{"index": idx, "code": 121, "errmsg": "invalid"}]})
+        self.written.extend(requests)
+
+
+class GatedCollection:
+    """The first bulk_write blocks until the gate opens (a slow write held by the worker)"""
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.gate = threading.Event()
+        self.written = []
+
+    def bulk_write(self, requests, ordered=True):
+        if not self.entered.is_set():
+            self.entered.set()
+            self.gate.wait(5)
+        self._write(requests)
+
+    def _write(self, requests):
+        self.written.extend(requests)
+
+
+def _version_matches(expected, current):
+    if isinstance(expected, dict):
+        return current in expected["$in"]
+    return current == expected
+
+
+class VersionedCollection(GatedCollection):
+    """One user's document; a versioned upsert that misses raises 11000 like the unique email index"""
+
+    def __init__(self):
+        super().__init__()
+        self.document = None
+
+    def _write(self, requests):
+        for index, request in enumerate(requests):
+            current = (self.document or {}).get("state_version")
+            if (self.document is not None and "state_version" in request._filter
+                    and not _version_matches(request._filter["state_version"], current)):
+                raise errors.BulkWriteError({"writeErrors": [{"index": index, "code": 11000, "errmsg": "dup"}]})
+            update = request._doc
+            if self.document is None:
+                self.document = dict(update.get("$setOnInsert", {}))
+            self.document.update(update["$set"])
+            if "$push" in update:
+                self.document["history"] = self.document.get("history", []) + update["$push"]["history"]["$each"]
+            self.written.append(request)
+
+
+class OrderingTests(unittest.TestCase):
+    def test_batch_write_waits_behind_queued_write_of_same_user(self):
+        collection = VersionedCollection()
+        repository = MongoUserStateRepository(
+            cache=SessionCache(), persistence_queue=PersistenceQueue(collection_getter=lambda: collection)
+        )
+        repository.save_turn("a@x.com", "N", {"flight_context": {"turn": "A"}}, history_entries=[{"text": "A"}])
+        self.assertTrue(collection.entered.wait(5))
+
+        threading.Timer(0.05, collection.gate.set).start()
+        saved = repository.save_turns([{"email": "a@x.com", "name": "N", "set_fields": {"flight_context": {"turn": "B"}},
+                                        "history_entries": [{"text": "B"}]}])
+
+        self.assertEqual(saved, {"a@x.com": True})
+        self.assertEqual(collection.document["state_version"], 2)
+        self.assertEqual(collection.document["flight_context"], {"turn": "B"})
+        self.assertEqual([item["text"] for item in collection.document["history"]], ["A", "B"])
+
+    def test_full_queue_gives_up_instead_of_writing_inline(self):
+        collection = GatedCollection()
+        queue = PersistenceQueue(collection_getter=lambda: collection, max_size=1)
+        queue.enqueue(QueuedWrite("first"))
+        self.assertTrue(collection.entered.wait(5))
+        queue.enqueue(QueuedWrite("second"))
+
+        outcomes = []
+        queue.enqueue(QueuedWrite("third", on_done=outcomes.append), timeout=0.01)
+        self.assertEqual(outcomes, [False])
+
+        collection.gate.set()
+        self.assertTrue(queue.flush(timeout=5))
+        self.assertEqual(collection.written, ["first", "second"])
+
+
+class WriteNowTests(unittest.TestCase):
+    def test_returns_keys_given_up(self):
+        collection = FailingCollection(fail_index=1)
+        queue = PersistenceQueue(collection_getter=lambda: collection)
+        outcomes = []
+        items = [QueuedWrite(name, on_done=outcomes.append, key=name) for name in ("a", "b", "c")]
+
+        self.assertEqual(queue.write_now(items), ["b"])
+        self.assertEqual(collection.written, ["a", "c"])
+        self.assertEqual(sorted(outcomes), [False, True, True])
+
+    def test_no_collection_fails_every_item(self):
+        queue = PersistenceQueue(collection_getter=lambda: None)
+        self.assertEqual(queue.write_now([QueuedWrite("a", key="a"), None]), ["a"])
+
+
+class SaveTurnsTests(unittest.TestCase):
+    def _turn(self, email):
+        return {"email": email, "name": "N", "set_fields": {}, "history_entries": [{"role": "user", "text": "hi"}]}
+
+    def test_reports_per_user_status(self):
+        cache = SessionCache()
+        repository = MongoUserStateRepository(
+            cache=cache, persistence_queue=PersistenceQueue(collection_getter=lambda: FailingCollection(fail_index=1))
+        )
+        saved = repository.save_turns([self._turn("a@x.com"), self._turn("b@x.com"), self._turn("a@x.com")])
+
+        self.assertEqual(saved, {"a@x.com": True, "b@x.com": False})
+        self.assertEqual(cache.dirty_emails(), ["b@x.com"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+from unittest import mock
+
+from api.handlers import flight_handler, hotel_handler
+from api.handlers.intent_handler import _names_new_place
+from api.handlers.results_handler import _handle_results
+from api.helpers.result_set import (
+    _apply_result_query,
+    _new_result_set,
+    _parse_result_query,
+    _render_result_page,
+)
+
+
+def _flights():
+    columns = {
+        "price": [300, 100, 200, 400],
+        "stops": [0, 1, 0, 2],
+        "airline": ["Saudi Arabian Airlines", "Air India", "IndiGo", "Air India"],
+        "duration": [300, 600, 350, 900],
+    }
+    cards = [f"card {i}" for i in range(4)]
+    return _new_result_set("flight", "Hyderabad → Jeddah", columns, cards)
+
+
+def _hotels():
+    columns = {"price": [500, None, 300], "rating": [5.0, 4.0, 3.0], "near_haram": [True, False, True]}
+    return _new_result_set("hotel", "Hotels in Makkah", columns, ["hotel A", "hotel B", "hotel C"])
+
+
+class ParseQueryTests(unittest.TestCase):
+    def test_explicit_follow_ups(self):
+        flights = _flights()
+        self.assertTrue(_parse_result_query("show more", flights)["more"])
+        self.assertEqual(_parse_result_query("direct only please", flights)["filters"], {"direct": True})
+        self.assertEqual(_parse_result_query("only Air India", flights)["filters"], {"airline": "Air India"})
+        self.assertEqual(_parse_result_query("sort by duration", flights)["sort"], "duration")
+        self.assertEqual(_parse_result_query("cheapest first", flights)["sort"], "price")
+        self.assertTrue(_parse_result_query("clear filters", flights)["reset"])
+
+    def test_hotel_filters_need_explicit_phrasing(self):
+        hotels = _hotels()
+        self.assertEqual(_parse_result_query("only 4 star", hotels)["filters"], {"stars": 4})
+        self.assertEqual(_parse_result_query("near haram only", hotels)["filters"], {"near_haram": True})
+        self.assertIsNone(_parse_result_query("I want a 5 star hotel in Madinah", hotels))
+        self.assertIsNone(_parse_result_query("how far is the haram from jeddah?", hotels))
+
+    def test_unrelated_questions_are_not_follow_ups(self):
+        flights = _flights()
+        for question in (
+            "What documents do I need for Saudi visa?",
+            "Do Indian citizens need a visa for India?",
+            "what is the shortest visa processing time?",
+            "show all visa types",
+        ):
+            self.assertIsNone(_parse_result_query(question, flights), question)
+
+    def test_new_search_parameters_start_a_new_search(self):
+        self.assertIsNone(_parse_result_query("direct flights from Delhi to Jeddah", _flights()))
+
+
+class NewPlaceTests(unittest.TestCase):
+    def test_new_city_or_country_skips_the_shortcut(self):
+        self.assertTrue(_names_new_place("only 5 star hotels in Madinah", _hotels()))
+        self.assertTrue(_names_new_place("only direct flights to Dubai", _flights()))
+        self.assertTrue(_names_new_place("only direct for uae", _flights()))
+
+    def test_same_search_or_airline_is_a_follow_up(self):
+        self.assertFalse(_names_new_place("only 5 star in Makkah", _hotels()))
+        self.assertFalse(_names_new_place("only Saudi Arabian Airlines", _flights()))
+
+
+class ViewTests(unittest.TestCase):
+    def test_filter_sort_and_page(self):
+        flights = _flights()
+        flights = _apply_result_query(flights, _parse_result_query("direct only", flights))
+        page = _render_result_page(flights, flights["cards"])
+        self.assertIn("showing 1–2 of 2 flights (direct only, sorted by price)", page)
+        self.assertLess(page.index("card 2"), page.index("card 0"))
+
+        flights = _apply_result_query(flights, _parse_result_query("show more", flights))
+        self.assertEqual(flights["view"]["page"], 1)
+        self.assertIn("That's all 2 matching flights", _render_result_page(flights, flights["cards"]))
+
+    def test_unpriced_hotels_go_last(self):
+        hotels = _hotels()
+        hotels = _apply_result_query(hotels, _parse_result_query("sort by price", hotels))
+        page = _render_result_page(hotels, hotels["cards"])
+        self.assertLess(page.index("hotel C"), page.index("hotel A"))
+        self.assertLess(page.index("hotel A"), page.index("hotel B"))
+
+
+class HandlerTests(unittest.TestCase):
+    def _stored(self):
+        # As loaded back from Mongo: the cards live in their own field
+        flights = _flights()
+        return flights, flights.pop("cards")
+
+    def test_cards_come_from_the_loader(self):
+        flights, cards = self._stored()
+        state = _handle_results({"question": "direct only", "result_set": flights, "load_result_cards": lambda: cards})
+
+        self.assertTrue(state["result_view_updated"])
+        self.assertFalse(state.get("result_set_updated"))
+        self.assertEqual(state["result_set"]["view"]["filters"], {"direct": True})
+        self.assertIn("card 2", state["answer"])
+
+    def test_missing_cards_clear_the_result_set(self):
+        flights, _ = self._stored()
+        state = _handle_results({"question": "direct only", "result_set": flights, "load_result_cards": lambda: None})
+
+        self.assertIsNone(state["result_set"])
+        self.assertTrue(state["result_set_updated"])
+        self.assertIn("no longer available", state["answer"])
+
+
+class NewSearchTests(unittest.TestCase):
+    def test_job_mode_search_clears_the_previous_results(self):
+        context = {"departure_city": "Hyderabad", "arrival_city": "Jeddah"}
+        with mock.patch.object(flight_handler, "SEARCH_JOBS_ENABLED", True), \
+                mock.patch.object(flight_handler.SEARCH_JOBS, "submit", return_value="job1"):
+            state = flight_handler._finish_flight_search({"result_set": _hotels()}, context)
+
+        self.assertIsNone(state["result_set"])
+        self.assertTrue(state["result_set_updated"])
+        self.assertEqual(state["search_job"]["id"], "job1")
+
+    def test_split_stay_clears_the_previous_results(self):
+        context = {"split_stay": True, "stays": [], "rooms": 1, "room_guests": [], "guest_nationality": "IN",
+                   "min_rating": 1, "max_rating": 5}
+        with mock.patch.object(hotel_handler, "SEARCH_JOBS_ENABLED", False), \
+                mock.patch.object(hotel_handler, "_search_split_stay", return_value=[]), \
+                mock.patch.object(hotel_handler, "_format_split_stay_summary", return_value="summary"):
+            state = hotel_handler._finish_hotel_search({"result_set": _flights()}, context)
+
+        self.assertIsNone(state["result_set"])
+        self.assertTrue(state["result_set_updated"])
+
+
+if __name__ == "__main__":
+    unittest.main()
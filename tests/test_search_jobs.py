@@ -0,0 +1,93 @@
+import threading
+import unittest
+
+from api.core.search_jobs import SearchJobs
+
+
+def _blocked(gate, started):
+    def search():
+        started.set()
+        gate.wait(5)
+        return "late answer"
+    return search
+
+
+class SearchJobsTests(unittest.TestCase):
+    def setUp(self):
+        self.gate, self.started = threading.Event(), threading.Event()
+        # Never leave a worker blocked behind a failed assertion
+        self.addCleanup(self.gate.set)
+
+    def test_job_finishes_with_its_answer(self):
+        jobs = SearchJobs(workers=1)
+        job_id = jobs.submit("flight", lambda route: f"flights {route}", "HYD-JED")
+        jobs._queue.join()
+
+        job = jobs.get(job_id)
+        self.assertEqual((job["status"], job["answer"], job["error"]), ("done", "flights HYD-JED", None))
+        self.assertIsNotNone(job["finished_at"])
+
+    def test_failed_job_keeps_the_error(self):
+        def search():
+            raise TimeoutError("Flight API timed out")
+
+        jobs = SearchJobs(workers=1)
+        job_id = jobs.submit("flight", search)
+        jobs._queue.join()
+
+        job = jobs.get(job_id)
+        self.assertEqual((job["status"], job["answer"]), ("failed", None))
+        self.assertIn("timed out", job["error"])
+
+    def test_queued_then_running(self):
+        jobs = SearchJobs(workers=1)
+        running = jobs.submit("hotel", _blocked(self.gate, self.started))
+        self.assertTrue(self.started.wait(5))
+        queued = jobs.submit("hotel", lambda: "next")
+
+        self.assertEqual(jobs.get(running)["status"], "running")
+        self.assertEqual(jobs.get(queued)["status"], "queued")
+        self.gate.set()
+        jobs._queue.join()
+        self.assertEqual(jobs.get(queued)["status"], "done")
+
+    def test_full_queue_is_rejected(self):
+        jobs = SearchJobs(workers=1, max_size=1)
+        jobs.submit("hotel", _blocked(self.gate, self.started))
+        self.assertTrue(self.started.wait(5))
+        jobs.submit("hotel", lambda: "queued")
+
+        self.assertIsNone(jobs.submit("hotel", lambda: "rejected"))
+        self.assertEqual(len(jobs._jobs), 2)
+
+    def test_unfinished_jobs_are_never_pruned(self):
+        jobs = SearchJobs(workers=1, max_stored=2)
+        running = jobs.submit("hotel", _blocked(self.gate, self.started))
+        self.assertTrue(self.started.wait(5))
+        queued = jobs.submit("hotel", lambda: "b")
+        third = jobs.submit("hotel", lambda: "c")
+
+        self.assertEqual(jobs.get(running)["status"], "running")
+        self.assertIsNotNone(jobs.get(queued))
+        self.gate.set()
+        jobs._queue.join()
+
+        # Over the bound once finished → the oldest go first
+        latest = jobs.submit("hotel", lambda: "d")
+        jobs._queue.join()
+        self.assertIsNone(jobs.get(running))
+        self.assertIsNone(jobs.get(queued))
+        self.assertEqual([jobs.get(third)["answer"], jobs.get(latest)["answer"]], ["c", "d"])
+
+    def test_expired_jobs_are_pruned(self):
+        jobs = SearchJobs(workers=1, ttl_seconds=60)
+        old = jobs.submit("flight", lambda: "old")
+        jobs._queue.join()
+        jobs._jobs[old]["finished_at"] -= 120
+
+        jobs.submit("flight", lambda: "new")
+        self.assertIsNone(jobs.get(old))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import unittest
+from unittest import mock
+
+from pymongo import errors
+
+from api.db import session_cache
+from api.db.persistence_queue import _bulk_write_with_conflicts
+from api.db.session_cache import SessionCache
+
+
+class ScriptedCollection:
+    """bulk_write raises the scripted errors in order, then records the requests"""
+
+    def __init__(self, *failures):
+        self.failures = list(failures)
+        self.written = []
+
+    def bulk_write(self, requests, ordered=True):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.written.extend(requests)
+
+
+def _write_error(code=2):
+    return errors.BulkWriteError({"writeErrors": [{"index": 0, "code": code, "errmsg": "boom"}]})
+
+
+class WriteFailureTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = SessionCache()
+        self.cache.put("a@x.com", {"history": [{"role": "user", "text": "hi"}]}, version=3)
+        self.cache.stage("a@x.com", set_fields={"flight_context": {"trip_type": "one-way"}},
+                         history_entries=[{"role": "bot", "text": "From where?"}])
+
+    def test_failed_write_is_restaged(self):
+        _bulk_write_with_conflicts(ScriptedCollection(_write_error()), [self.cache.take_write("a@x.com")])
+
+        self.assertEqual(self.cache.dirty_emails(), ["a@x.com"])
+        retry = self.cache.take_write("a@x.com")
+        self.assertEqual(retry.request._filter["state_version"], 3)
+        update = retry.request._doc
+        self.assertEqual(update["$set"]["flight_context"], {"trip_type": "one-way"})
+        self.assertEqual(len(update["$set"]["history"]), 2)
+        self.assertNotIn("$push", update)
+
+    def test_newer_staged_change_wins_over_restaged_state(self):
+        write = self.cache.take_write("a@x.com")
+        self.cache.stage("a@x.com", set_fields={"flight_context": {"trip_type": "two-way"}})
+        _bulk_write_with_conflicts(ScriptedCollection(_write_error()), [write])
+
+        update = self.cache.take_write("a@x.com").request._doc
+        self.assertEqual(update["$set"]["flight_context"], {"trip_type": "two-way"})
+
+    def test_exhausted_retries_are_restaged(self):
+        collection = ScriptedCollection(*[errors.AutoReconnect("down")] * 2)
+        with mock.patch("api.db.persistence_queue.time.sleep"):
+            _bulk_write_with_conflicts(collection, [self.cache.take_write("a@x.com")], max_retries=1)
+        self.assertEqual(self.cache.dirty_emails(), ["a@x.com"])
+
+    def test_written_entry_is_clean(self):
+        collection = ScriptedCollection()
+        _bulk_write_with_conflicts(collection, [self.cache.take_write("a@x.com")])
+        self.assertEqual(len(collection.written), 1)
+        self.assertEqual(self.cache.dirty_emails(), [])
+        self.assertEqual(self.cache.versions_to_check(["a@x.com"]), {})
+
+
+class ConflictTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = SessionCache()
+        self.cache.put("a@x.com", {"history": []}, version=1)
+        self.cache.stage("a@x.com", set_fields={"visa_context": {"country": "uae"}})
+        self.write = self.cache.take_write("a@x.com")
+
+    def test_conflict_keeps_changes_staged_meanwhile(self):
+        self.cache.stage("a@x.com", set_fields={"hotel_context": {"active": True}},
+                         history_entries=[{"role": "user", "text": "hotel please"}])
+        collection = ScriptedCollection(_write_error(code=11000))
+        _bulk_write_with_conflicts(collection, [self.write])
+
+        self.assertEqual(collection.written[0]._filter, {"email": "a@x.com"})
+        self.assertIsNone(self.cache.get("a@x.com"))
+        self.assertEqual(self.cache.dirty_emails(), ["a@x.com"])
+
+        # Reload from Mongo (another instance's write) → staged turn replayed on top
+        self.cache.put("a@x.com", {"history": [{"role": "user", "text": "other"}],
+                                   "visa_context": {"country": "oman"}}, version=7)
+        state = self.cache.get("a@x.com")
+        self.assertEqual(state["hotel_context"], {"active": True})
+        self.assertEqual(state["visa_context"], {"country": "oman"})
+        self.assertEqual([item["text"] for item in state["history"]], ["other", "hotel please"])
+        self.assertEqual(self.cache.take_write("a@x.com").request._filter["state_version"], 7)
+
+    def test_conflict_without_staged_changes_reloads(self):
+        _bulk_write_with_conflicts(ScriptedCollection(_write_error(code=11000)), [self.write])
+        self.assertIsNone(self.cache.get("a@x.com"))
+        self.cache.put("a@x.com", {"history": []}, version=4)
+        self.assertIsNone(self.cache.get("a@x.com")["visa_context"])
+
+
+class ResultViewTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = SessionCache()
+        self.result_set = {"kind": "flight", "view": {"filters": {}, "sort": "price", "page": 0}}
+        self.cache.put("a@x.com", {"result_set": self.result_set}, version=1)
+
+    def test_follow_up_sets_only_the_view(self):
+        view = {"filters": {"direct": True}, "sort": "price", "page": 0}
+        self.cache.stage("a@x.com", set_fields={"result_set.view": view})
+
+        update = self.cache.take_write("a@x.com").request._doc
+        self.assertEqual(update["$set"]["result_set.view"], view)
+        self.assertNotIn("result_set", update["$set"])
+        self.assertEqual(self.cache.get("a@x.com")["result_set"]["view"], view)
+        self.assertEqual(self.result_set["view"]["filters"], {})
+
+    def test_view_after_new_search_folds_into_result_set(self):
+        self.cache.stage("a@x.com", set_fields={"result_set": {"kind": "hotel", "view": {"page": 0}},
+                                               "result_cards": ["hotel A"]})
+        self.cache.stage("a@x.com", set_fields={"result_set.view": {"page": 1}})
+
+        update = self.cache.take_write("a@x.com").request._doc
+        self.assertEqual(update["$set"]["result_set"], {"kind": "hotel", "view": {"page": 1}})
+        self.assertNotIn("result_set.view", update["$set"])
+        self.assertNotIn("result_cards", self.cache.get("a@x.com"))
+        self.assertEqual(self.cache.get_lazy("a@x.com", "result_cards"), (True, ["hotel A"]))
+
+    def test_unloaded_cards_are_still_unset(self):
+        self.cache.stage("a@x.com", unset_fields=("result_set", "result_cards"))
+
+        update = self.cache.take_write("a@x.com").request._doc
+        self.assertEqual(set(update["$unset"]), {"result_set", "result_cards"})
+
+
+class RevalidationTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = SessionCache()
+        self.cache.put("a@x.com", {"history": []}, version=2)
+
+    def test_not_due_before_interval(self):
+        self.assertEqual(self.cache.versions_to_check(["a@x.com"]), {})
+
+    def test_moved_version_drops_entry(self):
+        with mock.patch.object(session_cache, "SESSION_CACHE_REVALIDATE_SECONDS", -1):
+            self.assertEqual(self.cache.versions_to_check(["a@x.com"]), {"a@x.com": 2})
+        self.cache.confirm_version("a@x.com", 5)
+        self.assertIsNone(self.cache.get("a@x.com"))
+
+    def test_same_version_keeps_entry(self):
+        self.cache.confirm_version("a@x.com", 2)
+        self.assertIsNotNone(self.cache.get("a@x.com"))
+
+    def test_dirty_entry_is_never_due(self):
+        self.cache.stage("a@x.com", set_fields={"hotel_context": {"active": True}})
+        with mock.patch.object(session_cache, "SESSION_CACHE_REVALIDATE_SECONDS", -1):
+            self.assertEqual(self.cache.versions_to_check(["a@x.com"]), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
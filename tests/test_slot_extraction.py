@@ -0,0 +1,95 @@
+import unittest
+
+from api.helpers.slot_extraction import (
+    _extract_dates,
+    _extract_nationality,
+    _extract_trip_type,
+    _fill_flight_slots,
+    _fill_hotel_slots,
+    _invalid_date_note,
+    _is_airport,
+)
+
+
+def _flight_context(**filled):
+    return {"trip_type": None, "departure_date": None, "return_date": None, "flex_days": None,
+            "adults": None, "children": None, "children_ages": [],
+            "departure_city": None, "arrival_city": None, **filled}
+
+
+def _hotel_context(**filled):
+    return {"check_in": None, "check_out": None, "city_id": None, "rooms": None, "adults": None,
+            "children": None, "children_ages": [], "rating": None, "guest_nationality": None,
+            "split_stay": False, "stays": [], **filled}
+
+
+class DateExtractionTests(unittest.TestCase):
+    def test_only_real_dates_are_taken(self):
+        self.assertEqual(_extract_dates("leaving 2026-13-45, or 2026-11-20"), ["2026-11-20"])
+
+    def test_invalid_date_note(self):
+        self.assertEqual(_invalid_date_note("2026-13-45"), "2026-13-45 is not a valid date.")
+        self.assertIsNone(_invalid_date_note("2026-11-20"))
+
+
+
+class DateOrderTests(unittest.TestCase):
+    def test_return_before_departure_is_refused(self):
+        context = _flight_context()
+        filled, note = _fill_flight_slots(context, "leaving 2026-11-20, back 2026-11-10")
+        self.assertEqual(filled, [])
+        self.assertIn("return date", note)
+        self.assertIsNone(context["departure_date"])
+        self.assertIsNone(context["return_date"])
+
+    def test_only_the_new_date_is_refused(self):
+        context = _flight_context(trip_type="two-way", departure_date="2026-11-20")
+        filled, note = _fill_flight_slots(context, "2026-11-10")
+        self.assertIsNotNone(note)
+        self.assertEqual(context["departure_date"], "2026-11-20")
+        self.assertIsNone(context["return_date"])
+
+    def test_same_day_return_is_allowed(self):
+        context = _flight_context()
+        filled, note = _fill_flight_slots(context, "2026-11-20 and back 2026-11-20")
+        self.assertIsNone(note)
+        self.assertIn("return_date", filled)
+
+    def test_check_out_must_follow_check_in(self):
+        for check_out in ("2026-11-10", "2026-11-20"):
+            context = _hotel_context()
+            filled, note = _fill_hotel_slots(context, f"2026-11-20 to {check_out}")
+            self.assertIn("check-out", note)
+            self.assertIsNone(context["check_in"])
+
+    def test_reversed_split_stay_range_is_refused(self):
+        context = _hotel_context(split_stay=True)
+        filled, note = _fill_hotel_slots(context, "2026-11-05 to 2026-11-01, 2026-11-05 to 2026-11-09")
+        self.assertIsNotNone(note)
+        self.assertEqual([stay["city_name"] for stay in context["stays"]], ["Madinah"])
+
+    def test_malformed_date_note_comes_back_with_other_slots(self):
+        filled, note = _fill_flight_slots(_flight_context(), "2 adults on 2026-13-45")
+        self.assertEqual(filled, ["adults"])
+        self.assertEqual(note, "2026-13-45 is not a valid date.")
+
+
+class SlotWordingTests(unittest.TestCase):
+    def test_nationality_needs_a_code(self):
+        self.assertIsNone(_extract_nationality("my nationality is indian"))
+        self.assertIsNone(_extract_nationality("What nationality is required for a Saudi visa?"))
+        self.assertEqual(_extract_nationality("nationality: pk"), "PK")
+        self.assertEqual(_extract_nationality("my nationality is IN"), "IN")
+        self.assertEqual(_extract_nationality("SA passport"), "SA")
+
+    def test_single_alone_is_not_one_way(self):
+        self.assertIsNone(_extract_trip_type("a single room near the haram"))
+        self.assertEqual(_extract_trip_type("single trip to Jeddah"), "one-way")
+
+    def test_city_names_count_as_airports(self):
+        self.assertTrue(_is_airport("delhi"))
+        self.assertFalse(_is_airport("go"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+from api.db.user_repository import InMemoryUserStateRepository, UserStateRepository
+
+
+class RepositoryContractTests(unittest.TestCase):
+    def test_base_class_is_abstract(self):
+        with self.assertRaises(TypeError):
+            UserStateRepository()
+
+    def test_backend_must_implement_save_turn(self):
+        class LoadOnly(UserStateRepository):
+            def load(self, email):
+                return {}
+
+        with self.assertRaises(TypeError):
+            LoadOnly()
+
+
+class InMemoryRepositoryTests(unittest.TestCase):
+    def test_turns_round_trip(self):
+        repository = InMemoryUserStateRepository()
+        for i in range(7):
+            repository.save_turn("a@x.com", "Aisha", {"visa_context": {"country": "uae"}},
+                                 history_entries=[{"role": "user", "text": str(i)}])
+        repository.save_turn("a@x.com", "Aisha", {}, unset_fields=("visa_context",))
+
+        state = repository.load("a@x.com")
+        self.assertIsNone(state["visa_context"])
+        self.assertEqual([item["text"] for item in state["history"]], ["2", "3", "4", "5", "6"])
+
+    def test_result_cards_are_kept_out_of_the_turn_state(self):
+        repository = InMemoryUserStateRepository()
+        repository.save_turn("a@x.com", "Aisha", {"result_set": {"view": {"page": 0}}, "result_cards": ["card"]})
+        repository.save_turn("a@x.com", "Aisha", {"result_set.view": {"page": 1}})
+
+        self.assertNotIn("result_cards", repository.load("a@x.com"))
+        self.assertEqual(repository.load("a@x.com")["result_set"], {"view": {"page": 1}})
+        self.assertEqual(repository.load_result_cards("a@x.com"), ["card"])
+        self.assertIsNone(repository.load_result_cards("b@x.com"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from api.handlers import visa_handler
+from api.helpers.visa_helpers import _price_answer_mode
+
+
+VISA_DATA = {
+    "displayQuotes": [
+        {"purpose": "Tourist", "entryType": "Single", "stayPeriod": "30 days", "basePrice": 120, "currency": "INR"},
+    ],
+    "documentRequired": {"Passport": "Valid for 6 months"},
+}
+
+
+class PriceAnswerModeTests(unittest.TestCase):
+    def test_plain_price_question_uses_template(self):
+        self.assertEqual(_price_answer_mode("How much is the Saudi visa fee?"), "template")
+
+    def test_price_question_with_reasoning(self):
+        self.assertEqual(_price_answer_mode("Which visa costs less for my family?"), "reasoning")
+
+    def test_non_price_question(self):
+        self.assertIsNone(_price_answer_mode("What documents do I need for Saudi visa?"))
+
+
+class FirstFetchTests(unittest.TestCase):
+    def _run(self, question):
+        state = {"model": object(), "question": question, "resolved_country": "saudi-arabia"}
+        with mock.patch.object(visa_handler, "_fetch_visa_data", return_value=VISA_DATA), \
+                mock.patch.object(visa_handler, "_build_visa_section_index"), \
+                mock.patch.object(visa_handler, "_format_price_with_ai", return_value="AI price") as price_ai, \
+                mock.patch.object(visa_handler, "_generate_content", return_value=SimpleNamespace(text="Docs answer")) as llm:
+            state = visa_handler._handle_visa(state)
+        return state, price_ai, llm
+
+    def test_price_question_gets_template(self):
+        state, price_ai, llm = self._run("What is the price of a Saudi visa?")
+        self.assertIn("INR 120", state["answer"])
+        price_ai.assert_not_called()
+        llm.assert_not_called()
+
+    def test_reasoning_question_uses_price_llm(self):
+        state, price_ai, _ = self._run("Why does the Saudi visa cost more for children?")
+        self.assertEqual(state["answer"], "AI price")
+        price_ai.assert_called_once()
+
+    def test_documents_question_answered_from_data(self):
+        state, price_ai, llm = self._run("What documents do I need for Saudi visa?")
+        self.assertEqual(state["answer"], "Docs answer")
+        price_ai.assert_not_called()
+        self.assertIn("Passport", llm.call_args[0][1])
+        self.assertTrue(state["visa_context_updated"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+from api.helpers import visa_index
+from api.helpers.visa_helpers import _visa_context_snippet
+from api.helpers.visa_index import VisaSectionIndex, _rank_visa_sections
+
+
+VISA_DATA = {
+    "documentRequired": {"mandatory": ["Passport valid for six months", "Passport size photograph"]},
+    "faqs": [
+        {"question": "How long does processing take?", "answer": "Processing takes 3 to 5 working days"},
+        {"question": "Can I extend my stay?", "answer": "Extensions are not allowed"},
+    ],
+    "importantInfo": ["Overstay fines apply per day"],
+    "displayQuotes": [{"purpose": "tourist", "price": 6500}],
+}
+
+
+class RankTests(unittest.TestCase):
+    def test_best_match_first(self):
+        index = VisaSectionIndex(VISA_DATA)
+        order = [index.chunks[idx] for _, idx in index.rank("how long is visa processing")]
+        self.assertEqual(order[0][0], "faqs")
+        self.assertIn("Processing takes", order[0][1])
+
+    def test_rarer_term_outranks_common_one(self):
+        index = VisaSectionIndex(VISA_DATA)
+        ranked = index.rank("passport photograph")
+        self.assertIn("photograph", index.chunks[ranked[0][1]][1])
+        self.assertEqual(len(ranked), 2)
+
+    def test_no_match_or_empty_query_falls_back_to_each_section_head(self):
+        index = VisaSectionIndex(VISA_DATA)
+        for question in ("", "the and of", "zebra"):
+            packed = index.pack(question)
+            self.assertEqual([chunk["section"] for chunk in packed], list(visa_index.VISA_INDEX_SECTIONS))
+
+    def test_first_chunk_is_truncated_to_the_budget(self):
+        index = VisaSectionIndex({"importantInfo": ["fines " * 100]})
+        packed = index.pack("fines", token_budget=10)
+        self.assertEqual(len(packed), 1)
+        self.assertEqual(len(packed[0]["text"]), 40)
+
+    def test_empty_payload(self):
+        self.assertEqual(VisaSectionIndex({}).pack("processing"), [])
+
+
+class SnippetTests(unittest.TestCase):
+    def setUp(self):
+        visa_index.VISA_INDEX_CACHE.clear()
+        self.addCleanup(visa_index.VISA_INDEX_CACHE.clear)
+
+    def test_keyword_picks_a_whole_section(self):
+        self.assertEqual(_visa_context_snippet("what documents do I need", VISA_DATA), {
+            "documentRequired": VISA_DATA["documentRequired"],
+        })
+
+    def test_other_questions_get_ranked_chunks(self):
+        snippet = _visa_context_snippet("can I extend my stay", VISA_DATA, "uae")
+        self.assertIn("Extensions are not allowed", snippet["relevantSections"][0]["text"])
+        self.assertIn("uae", visa_index.VISA_INDEX_CACHE)
+
+    def test_index_is_built_once_per_country(self):
+        first = _rank_visa_sections("processing", VISA_DATA, "uae")
+        cached = visa_index.VISA_INDEX_CACHE["uae"]
+        _rank_visa_sections("processing", VISA_DATA, "uae")
+        self.assertIs(visa_index.VISA_INDEX_CACHE["uae"], cached)
+        self.assertTrue(first)
+
+
+if __name__ == "__main__":
+    unittest.main()